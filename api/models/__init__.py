@@ -2,6 +2,6 @@
 Data models for the social media analytics application.
 """
 
-from . import user, content, ad, moderation, train_models
+from . import user, content, ad, moderation, feature_spec, train_models
 
-__all__ = ['user', 'content', 'ad', 'moderation', 'train_models'] 
\ No newline at end of file
+__all__ = ['user', 'content', 'ad', 'moderation', 'feature_spec', 'train_models'] 
\ No newline at end of file
@@ -0,0 +1,134 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from common.schema import enforce_schema
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 50000
+# Log progress every this many chunks
+PROGRESS_CHUNKS = 10
+
+
+class ColumnBuffers:
+    """
+    Per-column arrays that query chunks are copied into.
+
+    Each column is one array sized for the rows seen so far and grown by
+    doubling, so a result is assembled without keeping every chunk alive
+    for a final concat. Columns with a numpy dtype keep it (promoted if a
+    later chunk needs a wider one, e.g. ints that meet a NULL); other
+    columns are held as objects and cast back to their pandas dtype at the
+    end, categoricals with the categories of every chunk.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.arrays: Dict[str, np.ndarray] = {}
+        self.extension_dtypes: Dict[str, Any] = {}
+
+    @property
+    def capacity(self) -> int:
+        return len(next(iter(self.arrays.values()))) if self.arrays else 0
+
+    def append(self, chunk: pd.DataFrame):
+        n = len(chunk)
+        if not self.arrays:
+            for col, dtype in chunk.dtypes.items():
+                if not isinstance(dtype, np.dtype):
+                    self.extension_dtypes[col] = dtype
+                    dtype = np.dtype(object)
+                self.arrays[col] = np.empty(max(n, 1), dtype=dtype)
+        capacity = self.capacity
+        while capacity < self.rows + n:
+            capacity *= 2
+
+        for col, array in self.arrays.items():
+            series = chunk[col]
+            if isinstance(series.dtype, np.dtype) and array.dtype != object:
+                values = series.to_numpy()
+                storage = np.result_type(array.dtype, values.dtype)
+            else:
+                values = series.to_numpy(dtype=object)
+                storage = np.dtype(object)
+            if storage != array.dtype or capacity > len(array):
+                grown = np.empty(capacity, dtype=storage)
+                grown[:self.rows] = array[:self.rows]
+                self.arrays[col] = array = grown
+            array[self.rows:self.rows + n] = values
+        self.rows += n
+
+    def frame(self) -> pd.DataFrame:
+        columns = {}
+        for col, array in self.arrays.items():
+            values = pd.Series(array[:self.rows], name=col, copy=False)
+            dtype = self.extension_dtypes.get(col)
+            if isinstance(dtype, pd.CategoricalDtype):
+                values = values.astype('category')
+            elif dtype is not None:
+                values = values.astype(dtype)
+            elif values.dtype == object:
+                values = values.infer_objects()
+            columns[col] = values
+        return pd.DataFrame(columns)
+
+
+@contextmanager
+def _connection(connectable):
+    """A streaming connection of its own from an engine; other connectables are used as is"""
+    if hasattr(connectable, 'connect'):
+        with connectable.connect() as conn:
+            yield conn.execution_options(stream_results=True)
+    else:
+        yield connectable
+
+
+def read_sql_chunked(query: str, connectable, params: Optional[Dict[str, Any]] = None,
+                     schema: Optional[Dict[str, str]] = None, name: Optional[str] = None,
+                     chunksize: int = CHUNK_ROWS) -> pd.DataFrame:
+    """Stream a query in chunks into column buffers, casting each chunk to ``schema``"""
+    name = name or 'query'
+    start = time.perf_counter()
+    buffers = ColumnBuffers()
+    with _connection(connectable) as conn:
+        chunks = pd.read_sql(query, conn, params=params, chunksize=chunksize)
+        for i, chunk in enumerate(chunks, 1):
+            if schema:
+                chunk = enforce_schema(chunk, schema)
+            buffers.append(chunk)
+            if i % PROGRESS_CHUNKS == 0:
+                logger.info(f"{name}: {buffers.rows} rows after {time.perf_counter() - start:.1f}s")
+    frame = buffers.frame()
+    if schema:
+        # Integer columns that met a NULL in some chunk settle on float32
+        frame = enforce_schema(frame, schema)
+    logger.info(f"{name}: {len(frame)} rows in {time.perf_counter() - start:.2f}s")
+    return frame
+
+
+def run_concurrently(loaders: Dict[str, Callable[[], pd.DataFrame]],
+                     max_workers: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+    """Run each loader on its own thread; returns frames in the loaders' order"""
+    start = time.perf_counter()
+    timings = {}
+
+    def timed(name, loader):
+        loader_start = time.perf_counter()
+        frame = loader()
+        timings[name] = time.perf_counter() - loader_start
+        return frame
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(loaders)) as pool:
+        futures = {name: pool.submit(timed, name, loader) for name, loader in loaders.items()}
+        frames = {name: future.result() for name, future in futures.items()}
+
+    wall = time.perf_counter() - start
+    logger.info(f"Extracted {len(frames)} result sets in {wall:.2f}s wall time "
+                f"({sum(timings.values()):.2f}s summed; slowest {max(timings, key=timings.get)})")
+    return frames
@@ -0,0 +1,221 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from common.categorical import CategoricalEncoder
+from common.time_features import age_hours, day_of_week, epoch_seconds, hour_of_day, reference_time
+
+# A feature is (name, source[, kind[, key]]), read from record[source]:
+#   numeric      float value, None becomes NaN
+#   flag         1 if the value is truthy else 0
+#   categorical  one-hot block over the fitted vocabulary plus an unknown column
+#   json         value[key], where the value is a dict or a JSON string
+#   length       len(value[key]) for a list inside a dict or JSON string
+#   age_hours    hours from the timestamp to a reference time fixed per batch
+#   hour         hour of the timestamp
+#   day_of_week  weekday of the timestamp, Monday is 0
+# Time features use each timestamp's own wall clock (see common.time_features),
+# as training does; ``now`` should be in the same zone as the timestamps.
+KINDS = ('numeric', 'flag', 'categorical', 'json', 'length', 'age_hours', 'hour', 'day_of_week')
+ENCODER_PREFIX = 'encoder.'
+
+
+def _json_value(value, key):
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value.get(key) if isinstance(value, dict) else None
+
+
+def _float(value):
+    return np.nan if value is None else float(value)
+
+
+def _timestamp(value) -> datetime:
+    """A datetime for a timestamp string or datetime; aware values keep their zone"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _timestamps(column: pd.Series) -> pd.Series:
+    """Datetime column; values with different UTC offsets become their own wall times"""
+    try:
+        return pd.to_datetime(column)
+    except ValueError:
+        return pd.to_datetime(column.map(lambda v: v if pd.isna(v) else _timestamp(v).replace(tzinfo=None)))
+
+
+def _time_feature(kind, seconds, reference):
+    """The same epoch-seconds kernel for a single value and a column"""
+    if kind == 'age_hours':
+        return age_hours(seconds, reference)
+    if kind == 'hour':
+        return hour_of_day(seconds)
+    return day_of_week(seconds)
+
+
+class FeatureSpec:
+    """
+    Compiled mapping from raw records to a model's float32 feature matrix.
+
+    Request dicts are written straight into a preallocated row, so single
+    requests skip building a DataFrame; training uses the vectorised
+    ``transform_frame`` with the same definitions, which keeps the two
+    paths in agreement. Each categorical feature is a one-hot block from a
+    CategoricalEncoder, so the column layout is fixed once the encoders are
+    fitted and does not depend on the categories in a batch.
+    """
+
+    def __init__(self, features: Sequence[tuple]):
+        self.features = []
+        for feature in features:
+            name, source, kind, key = (tuple(feature) + ('numeric', None))[:4]
+            if kind not in KINDS:
+                raise ValueError(f"Unknown feature kind {kind!r} for {name}")
+            self.features.append((name, source, kind, key))
+        self.sources = list(dict.fromkeys(source for _, source, _, _ in self.features))
+        self.encoders = {name: CategoricalEncoder() for name, _, kind, _ in self.features
+                         if kind == 'categorical'}
+        self.names: List[str] = []
+        self.offsets: List[int] = []
+        if not self.encoders:
+            self._build_layout()
+
+    @property
+    def n_features(self) -> int:
+        return len(self.names)
+
+    @property
+    def is_fitted(self) -> bool:
+        return all(encoder.is_fitted for encoder in self.encoders.values())
+
+    def _build_layout(self):
+        """Column offset of every feature; categorical features span their block"""
+        self.names, self.offsets = [], []
+        for name, _, kind, _ in self.features:
+            self.offsets.append(len(self.names))
+            if kind == 'categorical':
+                self.names.extend(self.encoders[name].column_names(name))
+            else:
+                self.names.append(name)
+
+    def fit(self, data: pd.DataFrame) -> 'FeatureSpec':
+        """Fit the encoder of every categorical feature"""
+        self._check_columns(data.columns)
+        for name, source, kind, _ in self.features:
+            if kind == 'categorical':
+                self.encoders[name].fit(data[source].tolist())
+        self._build_layout()
+        return self
+
+    def encoder_arrays(self) -> Dict[str, np.ndarray]:
+        """Vocabularies to save as artifact arrays"""
+        return {ENCODER_PREFIX + name: encoder.vocabulary for name, encoder in self.encoders.items()}
+
+    def restore_encoders(self, arrays: Dict[str, np.ndarray]):
+        """Restore vocabularies saved by ``encoder_arrays``"""
+        missing = {name for name in self.encoders if ENCODER_PREFIX + name not in arrays}
+        if missing:
+            raise ValueError(f"No vocabulary for categorical features: {missing}")
+        self.encoders = {name: CategoricalEncoder(np.array(arrays[ENCODER_PREFIX + name]))
+                         for name in self.encoders}
+        self._build_layout()
+
+    def _check_columns(self, columns):
+        missing = set(self.sources) - set(columns)
+        if missing:
+            raise ValueError(f"Missing required features: {missing}")
+
+    def _check_fitted(self):
+        if not self.is_fitted:
+            raise ValueError("Feature spec has not been fitted")
+
+    def _value(self, kind, key, value, reference):
+        if kind == 'numeric':
+            return _float(value)
+        if kind == 'flag':
+            return 1.0 if value else 0.0
+        if kind == 'json':
+            return _float(_json_value(value, key))
+        if kind == 'length':
+            items = _json_value(value, key)
+            return float(len(items)) if items is not None else 0.0
+        if value is None:
+            return np.nan
+        return float(_time_feature(kind, epoch_seconds(_timestamp(value)), reference))
+
+    def transform_row(self, record: Dict[str, Any], out: Optional[np.ndarray] = None,
+                      now: Optional[datetime] = None) -> np.ndarray:
+        """Write one record's features into ``out`` (a new row if not given).
+
+        Ages are measured to ``now``, the current local time if not given.
+        """
+        self._check_fitted()
+        if out is None:
+            out = np.empty(self.n_features, dtype=np.float32)
+        reference = reference_time(now)
+        row = [0.0] * self.n_features
+        try:
+            for (name, source, kind, key), offset in zip(self.features, self.offsets):
+                if kind == 'categorical':
+                    row[offset + self.encoders[name].code(record[source])] = 1.0
+                else:
+                    row[offset] = self._value(kind, key, record[source], reference)
+        except KeyError as e:
+            raise ValueError(f"Missing required features: {{{e.args[0]!r}}}") from None
+        out[:] = row
+        return out
+
+    def transform_records(self, records: Sequence[Dict[str, Any]], out: Optional[np.ndarray] = None,
+                          now: Optional[datetime] = None) -> np.ndarray:
+        """Features for a batch of records, shape (n_records, n_features)"""
+        if out is None:
+            out = np.empty((len(records), self.n_features), dtype=np.float32)
+        now = now or datetime.now()
+        for i, record in enumerate(records):
+            self.transform_row(record, out[i], now)
+        return out
+
+    def _column(self, kind, key, column: pd.Series, reference: int) -> np.ndarray:
+        if kind == 'numeric':
+            values = pd.to_numeric(column)
+        elif kind == 'flag':
+            values = column.fillna(0).astype(bool)
+        elif kind == 'json':
+            values = pd.to_numeric(column.map(lambda v: _json_value(v, key)))
+        elif kind == 'length':
+            values = column.map(lambda v: len(_json_value(v, key) or ()))
+        else:
+            return _time_feature(kind, epoch_seconds(_timestamps(column)), reference).astype(np.float32)
+        return values.to_numpy(dtype=np.float32, na_value=np.nan)
+
+    def transform_frame(self, data: pd.DataFrame, sparse: bool = False, now: Optional[datetime] = None):
+        """Vectorised features for a DataFrame of records.
+
+        Returns a DataFrame with the spec's columns, or a scipy CSR matrix in
+        the same column order when ``sparse`` is set. Ages are measured to
+        ``now``, the current local time if not given.
+        """
+        self._check_columns(data.columns)
+        self._check_fitted()
+        reference = reference_time(now)
+        if sparse:
+            from scipy import sparse as sp
+            blocks = []
+            for name, source, kind, key in self.features:
+                if kind == 'categorical':
+                    blocks.append(self.encoders[name].transform_sparse(data[source].to_numpy(dtype=object)))
+                else:
+                    blocks.append(sp.csr_matrix(self._column(kind, key, data[source], reference).reshape(-1, 1)))
+            return sp.hstack(blocks, format='csr', dtype=np.float32)
+
+        X = np.empty((len(data), self.n_features), dtype=np.float32)
+        for (name, source, kind, key), offset in zip(self.features, self.offsets):
+            if kind == 'categorical':
+                self.encoders[name].transform(data[source].to_numpy(dtype=object), out=X, offset=offset)
+            else:
+                X[:, offset] = self._column(kind, key, data[source], reference)
+        return pd.DataFrame(X, columns=self.names, index=data.index)
@@ -0,0 +1,217 @@
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import logging
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from common.schema import enforce_schema
+
+from .extraction import read_sql_chunked
+
+logger = logging.getLogger(__name__)
+
+# Every cached query selects this column: when the row (or anything joined
+# into it) last changed
+WATERMARK_COLUMN = 'updated_at'
+MANIFEST = 'manifest.json'
+# Delta parts kept before a table is rewritten as one part
+MAX_PARTS = 8
+# Snapshots are rebuilt in full once this old, picking up columns that
+# change without moving updated_at and rows deleted at the source
+MAX_AGE_HOURS = 24.0
+
+# Every row of each key with a row changed at or after the high-water mark,
+# so queries that return several rows per key are replaced whole. Rows
+# committed later with a timestamp equal to the mark are still picked up;
+# keys already fetched at the mark are dropped again in SnapshotCache
+DELTA_QUERY = """
+WITH base AS ({query})
+SELECT * FROM base
+WHERE {key} IN (SELECT {key} FROM base WHERE {watermark} >= %(since)s)
+"""
+
+
+def _to_columnar(frame: pd.DataFrame) -> pd.DataFrame:
+    """JSON columns become JSON strings and UUIDs plain strings, so Parquet can store them"""
+    for col in frame.columns[frame.dtypes == object]:
+        values = frame[col].dropna()
+        if len(values) == 0:
+            continue
+        if isinstance(values.iloc[0], (dict, list)):
+            frame[col] = frame[col].map(lambda v: json.dumps(v) if isinstance(v, (dict, list)) else v)
+        elif isinstance(values.iloc[0], uuid.UUID):
+            frame[col] = frame[col].map(lambda v: str(v) if v is not None else v)
+    return frame
+
+
+class SnapshotCache:
+    """
+    Local Parquet snapshots of training queries, refreshed by delta.
+
+    Each table is a directory of Parquet parts and a manifest holding the
+    query's hash, its key column and the high-water mark (the largest
+    ``updated_at`` seen). A refresh fetches only the keys changed at or
+    after the mark and appends them as a new part; reads take each key's
+    rows from the newest part that has it. The manifest also counts each
+    key's rows at the mark, so keys re-fetched unchanged are not appended
+    again. Changing a query's text invalidates its snapshot.
+
+    Deltas only see rows whose ``updated_at`` moved. Deleted rows, and
+    columns that change without a timestamp (thread and video counters,
+    user metrics joined into interactions), stay stale until the snapshot
+    is rebuilt in full, which happens once it is ``max_age_hours`` old or
+    after ``clear``.
+    """
+
+    def __init__(self, directory: str, max_age_hours: float = MAX_AGE_HOURS):
+        self.directory = directory
+        self.max_age = timedelta(hours=max_age_hours)
+
+    def _path(self, name: str, *parts: str) -> str:
+        return os.path.join(self.directory, name, *parts)
+
+    def manifest(self, name: str) -> Optional[Dict[str, Any]]:
+        path = self._path(name, MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, name: str, manifest: Dict[str, Any]):
+        fd, tmp_path = tempfile.mkstemp(dir=self._path(name), prefix='.tmp-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self._path(name, MANIFEST))
+
+    def _expired(self, manifest: Dict[str, Any], now: datetime) -> bool:
+        built_at = manifest.get('built_at')
+        return built_at is None or now - datetime.fromisoformat(built_at) > self.max_age
+
+    def clear(self, name: str):
+        shutil.rmtree(self._path(name), ignore_errors=True)
+
+    def refresh(self, name: str, engine, query: str, key: str = 'id',
+                schema: Optional[Dict[str, str]] = None) -> int:
+        """Bring a table's snapshot up to date; returns the number of rows fetched"""
+        digest = hashlib.sha1(query.encode()).hexdigest()
+        now = datetime.now(timezone.utc)
+        manifest = self.manifest(name)
+        if manifest is not None and (manifest['query'] != digest or manifest['key'] != key):
+            logger.info(f"Query for {name} changed, rebuilding its snapshot")
+            manifest = None
+        elif manifest is not None and self._expired(manifest, now):
+            logger.info(f"Snapshot {name} is older than {self.max_age.total_seconds() / 3600:g} hours, rebuilding it")
+            manifest = None
+        if manifest is None:
+            self.clear(name)
+            manifest = {'query': digest, 'key': key, 'watermark': None, 'watermark_keys': {},
+                        'parts': [], 'next_part': 0, 'built_at': now.isoformat()}
+
+        if manifest['watermark'] is None:
+            frame = read_sql_chunked(query, engine, schema=schema, name=name)
+        else:
+            delta_query = DELTA_QUERY.format(query=query.strip().rstrip(';'), key=key, watermark=WATERMARK_COLUMN)
+            since = pd.Timestamp(manifest['watermark']).to_pydatetime()
+            frame = read_sql_chunked(delta_query, engine, params={'since': since}, schema=schema, name=name)
+            frame = self._drop_unchanged(frame, manifest)
+
+        os.makedirs(self._path(name), exist_ok=True)
+        if len(frame):
+            self._append(name, manifest, frame)
+            if len(manifest['parts']) > MAX_PARTS:
+                self._compact(name, manifest)
+        self._write_manifest(name, manifest)
+        logger.info(f"Snapshot {name}: fetched {len(frame)} rows, watermark {manifest['watermark']}, "
+                    f"{len(manifest['parts'])} parts")
+        return len(frame)
+
+    def _append(self, name: str, manifest: Dict[str, Any], frame: pd.DataFrame):
+        part = f"part-{manifest['next_part']:05d}.parquet"
+        fd, tmp_path = tempfile.mkstemp(dir=self._path(name), prefix='.tmp-')
+        os.close(fd)
+        _to_columnar(frame).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self._path(name, part))
+        manifest['parts'].append(part)
+        manifest['next_part'] += 1
+        if WATERMARK_COLUMN in frame.columns and frame[WATERMARK_COLUMN].notna().any():
+            updated_at = pd.to_datetime(frame[WATERMARK_COLUMN])
+            latest = updated_at.max()
+            if manifest['watermark'] is None or latest > pd.Timestamp(manifest['watermark']):
+                manifest['watermark'] = latest.isoformat()
+                manifest['watermark_keys'] = {}
+            # Rows per key at the mark, replacing the counts of re-fetched keys
+            watermark = pd.Timestamp(manifest['watermark'])
+            keys = frame[manifest['key']].astype(str)
+            at_mark = keys[(updated_at == watermark).to_numpy()].value_counts()
+            fetched = set(keys)
+            watermark_keys = {k: n for k, n in manifest.get('watermark_keys', {}).items() if k not in fetched}
+            watermark_keys.update({k: int(n) for k, n in at_mark.items()})
+            manifest['watermark_keys'] = watermark_keys
+
+    def _drop_unchanged(self, frame: pd.DataFrame, manifest: Dict[str, Any]) -> pd.DataFrame:
+        """Drop keys a delta fetched again with the same rows at the mark and none newer"""
+        if not len(frame) or WATERMARK_COLUMN not in frame.columns:
+            return frame
+        watermark = pd.Timestamp(manifest['watermark'])
+        updated_at = pd.to_datetime(frame[WATERMARK_COLUMN])
+        keys = frame[manifest['key']].astype(str)
+        by_key = pd.DataFrame({'newer': (updated_at > watermark).to_numpy(),
+                               'at_mark': (updated_at == watermark).to_numpy()}).groupby(keys.to_numpy()).sum()
+        seen = pd.Series(manifest.get('watermark_keys', {}), dtype=np.int64).reindex(by_key.index)
+        unchanged = by_key.index[(by_key['newer'] == 0) & (by_key['at_mark'] == seen)]
+        return frame[~keys.isin(unchanged).to_numpy()].reset_index(drop=True)
+
+    def _compact(self, name: str, manifest: Dict[str, Any]):
+        """Rewrite every part as one"""
+        frame = self.read(name, manifest=manifest)
+        old_parts, manifest['parts'] = manifest['parts'], []
+        self._append(name, manifest, frame)
+        # Parts are only removed once the manifest no longer lists them
+        self._write_manifest(name, manifest)
+        for part in old_parts:
+            os.remove(self._path(name, part))
+
+    def read(self, name: str, columns: Optional[Sequence[str]] = None,
+             manifest: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """The current snapshot, reading only ``columns`` (those it has) if given"""
+        import pyarrow.parquet as pq
+
+        manifest = manifest or self.manifest(name)
+        if manifest is None:
+            raise ValueError(f"No snapshot for {name} in {self.directory}")
+        if not manifest['parts']:
+            return pd.DataFrame(columns=list(columns or []))
+        key = manifest['key']
+
+        paths = [self._path(name, part) for part in manifest['parts']]
+        read_columns = None
+        if columns is not None:
+            available = set(pq.read_schema(paths[-1]).names)
+            read_columns = [col for col in dict.fromkeys(list(columns) + [key]) if col in available]
+        frames = [pd.read_parquet(path, columns=read_columns) for path in paths]
+        frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+        # Each key's rows come from the newest part that has it
+        if len(frames) > 1:
+            part = np.repeat(np.arange(len(frames)), [len(f) for f in frames])
+            newest = pd.Series(part).groupby(frame[key].to_numpy()).transform('max').to_numpy()
+            frame = frame[part == newest].reset_index(drop=True)
+
+        if columns is not None and key not in columns:
+            frame = frame.drop(columns=[key])
+        return frame
+
+    def load(self, name: str, engine, query: str, key: str = 'id',
+             columns: Optional[Sequence[str]] = None, schema: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+        """Refresh a table's snapshot and read it, cast to ``schema`` if given"""
+        self.refresh(name, engine, query, key, schema)
+        frame = self.read(name, columns)
+        # Parts with different category sets concatenate as objects
+        return enforce_schema(frame, schema) if schema else frame
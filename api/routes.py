@@ -1,68 +1,148 @@
 from flask import Blueprint, request, jsonify
 from api.models.train_models import ContentInteractionModel, FeedRankingModel, CTRModel
+from common.registry import ModelRegistry, ServingModel
+from api.utils.error_handlers import ModelUnavailableError, ValidationError
+from api.utils.model_loader import LazyModel, start_warmup
 import json
+import os
+import numpy as np
 from datetime import datetime, timedelta
 from database import db
 
 api = Blueprint('api', __name__)
 
-# Load models
-content_model = ContentInteractionModel()
-content_model.load_model("models")
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR")
+# Load every model in a background thread at startup instead of on first request
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "0") == "1"
+WARMUP_ROWS = 8
 
-feed_model = FeedRankingModel()
-feed_model.load_model("models")
+def registry_loader(model_class):
+    """Build a registry loader that restores one version of model_class"""
+    def load(version_dir, metadata):
+        model = model_class()
+        model.load_model(version_dir)
+        return model
+    return load
 
-ctr_model = CTRModel()
-ctr_model.load_model("models")
+def serve_model(model_class):
+    """Hot-reloading registry handle if a registry is configured, else a static model"""
+    if MODEL_REGISTRY_DIR:
+        return ServingModel(
+            ModelRegistry(MODEL_REGISTRY_DIR), model_class().name, registry_loader(model_class)
+        ).start()
+    model = model_class()
+    model.load_model(MODEL_DIR)
+    return model
+
+def select_model(handle, routing_key=None):
+    """Return (version, model) for a request; version is None for a static model"""
+    if isinstance(handle, ServingModel):
+        try:
+            return handle.select(routing_key)
+        except RuntimeError as e:
+            raise ModelUnavailableError(str(e))
+    return None, handle
+
+def warmup_model(handle):
+    """Run a synthetic batch through the model so the first request pays no first-call costs"""
+    _, model = select_model(handle)
+    model.predict_matrix(np.zeros((WARMUP_ROWS, model.spec.n_features), dtype=np.float32))
+
+def lazy_model(model_class):
+    return LazyModel(model_class().name, lambda: serve_model(model_class), warmup_model)
+
+# Models are loaded on first use, or by the warmup thread when enabled
+content_models = lazy_model(ContentInteractionModel)
+feed_models = lazy_model(FeedRankingModel)
+ctr_models = lazy_model(CTRModel)
+MODELS = [content_models, feed_models, ctr_models]
+
+if MODEL_WARMUP:
+    start_warmup(MODELS)
+
+def build_features(model, records):
+    """Map request dicts straight into the model's float32 feature rows"""
+    try:
+        return model.spec.transform_records(records)
+    except (ValueError, TypeError) as e:
+        raise ValidationError(str(e))
+
+@api.errorhandler(ValidationError)
+@api.errorhandler(ModelUnavailableError)
+def handle_api_error(error):
+    response = jsonify(error.to_dict())
+    response.status_code = error.status_code
+    return response
+
+def model_ready(lazy):
+    """Loaded, and for a registry handle, serving a deployed version"""
+    if not lazy.is_ready:
+        return False
+    handle = lazy.get()
+    return not isinstance(handle, ServingModel) or handle.is_loaded
+
+@api.route('/ready', methods=['GET'])
+def ready():
+    """Per-model load state; 503 until every model is loaded"""
+    models = {model.name: dict(model.status(), ready=model_ready(model)) for model in MODELS}
+    all_ready = all(status['ready'] for status in models.values())
+    return jsonify({
+        'ready': all_ready,
+        'models': models,
+        'timestamp': datetime.now().isoformat()
+    }), 200 if all_ready else 503
 
 @api.route('/predict/content-interaction', methods=['POST'])
 def predict_content_interaction():
     data = request.json
+    model_version, content_model = select_model(content_models.get(), data.get('user_id'))
     
     # Prepare features
-    features = content_model.prepare_features(pd.DataFrame([data]))
-    features_scaled = content_model.scaler.transform(features)
+    features = build_features(content_model, [data])
     
     # Get prediction
-    prediction = content_model.model.predict_proba(features_scaled)[0]
+    probability = content_model.predict_matrix(features)[0]
     
     return jsonify({
-        'interaction_probability': float(prediction[1]),
-        'confidence_score': float(max(prediction)),
+        'interaction_probability': float(probability),
+        'confidence_score': float(max(probability, 1 - probability)),
+        'model_version': model_version,
         'timestamp': datetime.now().isoformat()
     })
 
 @api.route('/predict/feed-ranking', methods=['POST'])
 def predict_feed_ranking():
     data = request.json
+    model_version, feed_model = select_model(feed_models.get(), data.get('user_id'))
     
     # Prepare features
-    features = feed_model.prepare_features(pd.DataFrame([data]))
-    features_scaled = feed_model.scaler.transform(features)
+    features = build_features(feed_model, [data])
     
     # Get prediction
-    score = feed_model.model.predict(features_scaled)[0]
+    score = feed_model.predict_matrix(features)[0]
     
     return jsonify({
         'engagement_score': float(score),
+        'model_version': model_version,
         'timestamp': datetime.now().isoformat()
     })
 
 @api.route('/predict/ctr', methods=['POST'])
 def predict_ctr():
     data = request.json
+    model_version, ctr_model = select_model(ctr_models.get(), data.get('user_id'))
     
     # Prepare features
-    features = ctr_model.prepare_features(pd.DataFrame([data]))
-    features_scaled = ctr_model.scaler.transform(features)
+    features = build_features(ctr_model, [data])
     
     # Get prediction
-    prediction = ctr_model.model.predict_proba(features_scaled)[0]
+    probability = ctr_model.predict_matrix(features)[0]
     
     return jsonify({
-        'click_probability': float(prediction[1]),
-        'confidence_score': float(max(prediction)),
+        'click_probability': float(probability),
+        'confidence_score': float(max(probability, 1 - probability)),
+        'model_version': model_version,
         'timestamp': datetime.now().isoformat()
     })
 
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The API image copies models/common in as ``common``; from a checkout it is
+# imported from the models directory next to the API
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODELS_DIR = os.path.join(API_DIR, '..', 'models')
+sys.path.insert(0, API_DIR)
+if os.path.isdir(os.path.join(MODELS_DIR, 'common')):
+    sys.path.insert(0, os.path.abspath(MODELS_DIR))
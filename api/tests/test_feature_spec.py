@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.feature_spec import FeatureSpec
+
+
+def test_categorical_read_back_as_float_matches_int_requests():
+    # ad_category is a nullable integer column, so training sees floats
+    training = pd.DataFrame({'ad_category': pd.Series([1, 2, None, 10], dtype='float64')})
+    spec = FeatureSpec([('ad_category', 'ad_category', 'categorical')]).fit(training)
+
+    row = spec.transform_row({'ad_category': 2})
+    assert spec.names[int(row.argmax())] == 'ad_category_2'
+
+    records = [{'ad_category': 2}, {'ad_category': None}, {'ad_category': 10}, {'ad_category': 7}]
+    rows = spec.transform_records(records)
+    frame = spec.transform_frame(pd.DataFrame({'ad_category': [2.0, np.nan, 10.0, 7.0]}))
+    np.testing.assert_array_equal(rows, frame.to_numpy())
+    assert frame['ad_category_unknown'].tolist() == [0.0, 1.0, 0.0, 1.0]
+
+
+EVERY_KIND = [
+    ('likes', 'likes'),
+    ('is_sponsored', 'is_sponsored', 'flag'),
+    ('region', 'region', 'categorical'),
+    ('duration', 'metadata', 'json', 'duration'),
+    ('tag_count', 'metadata', 'length', 'tags'),
+    ('age_hours', 'created_at', 'age_hours'),
+    ('hour', 'created_at', 'hour'),
+    ('day_of_week', 'created_at', 'day_of_week'),
+]
+
+
+def test_row_and_frame_agree_on_every_kind():
+    now = datetime(2024, 3, 4, 12, 30)
+    records = [
+        {'likes': 3, 'is_sponsored': True, 'region': 'eu', 'metadata': {'duration': 12.5, 'tags': ['a', 'b']},
+         'created_at': datetime(2024, 3, 1, 23, 15)},
+        {'likes': None, 'is_sponsored': None, 'region': None, 'metadata': '{"duration": 3, "tags": []}',
+         'created_at': '2024-03-03T08:00:00'},
+        {'likes': 0.5, 'is_sponsored': False, 'region': 'apac', 'metadata': None, 'created_at': None},
+        {'likes': 7, 'is_sponsored': 1, 'region': 'us', 'metadata': '{"tags": ["x"]}',
+         'created_at': pd.Timestamp('2024-03-04 11:00')},
+    ]
+    training = pd.DataFrame({'likes': [1.0, 2.0], 'is_sponsored': [True, False], 'region': ['eu', 'us'],
+                             'metadata': [None, None], 'created_at': [now, now]})
+    spec = FeatureSpec(EVERY_KIND).fit(training)
+
+    rows = spec.transform_records(records, now=now)
+    frame = spec.transform_frame(pd.DataFrame(records), now=now)
+    assert frame.columns.tolist() == spec.names
+    np.testing.assert_array_equal(rows, frame.to_numpy())
+    np.testing.assert_array_equal(rows, spec.transform_frame(pd.DataFrame(records), sparse=True, now=now).toarray())
+
+    first = dict(zip(spec.names, rows[0]))
+    assert first['age_hours'] == pytest.approx(61.25)
+    assert (first['hour'], first['day_of_week']) == (23, 4)
+    assert (first['duration'], first['tag_count'], first['is_sponsored']) == (12.5, 2, 1)
+    # The unseen region and the missing one both fall in the unknown column
+    assert rows[:, spec.names.index('region_unknown')].tolist() == [0, 1, 1, 0]
+    assert np.isnan(rows[2, spec.names.index('hour')])
+
+
+def test_timezone_aware_timestamps_keep_their_wall_clock():
+    spec = FeatureSpec([('hour', 'created_at', 'hour'), ('day_of_week', 'created_at', 'day_of_week')])
+    records = [
+        {'created_at': '2024-03-04T23:30:00+02:00'},
+        {'created_at': datetime.fromisoformat('2024-03-04T01:00:00-05:00')},
+        {'created_at': '2024-03-04T09:00:00'},
+    ]
+    rows = spec.transform_records(records)
+    np.testing.assert_array_equal(rows, [[23, 0], [1, 0], [9, 0]])
+    # Mixed offsets cannot share a pandas timezone; each keeps its own
+    np.testing.assert_array_equal(spec.transform_frame(pd.DataFrame(records)).to_numpy(), rows)
+    same_zone = pd.DataFrame({'created_at': pd.to_datetime(['2024-03-04T23:30:00+02:00'] * 2)})
+    np.testing.assert_array_equal(spec.transform_frame(same_zone).to_numpy(), [[23, 0], [23, 0]])
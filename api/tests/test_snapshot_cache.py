@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+from models import snapshot_cache
+from models.snapshot_cache import SnapshotCache
+
+QUERY = "SELECT id, clicks, updated_at FROM ads"
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    # sqlite takes named parameters as :name
+    monkeypatch.setattr(snapshot_cache, 'DELTA_QUERY', snapshot_cache.DELTA_QUERY.replace('%(since)s', ':since'))
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE ads (id INTEGER PRIMARY KEY, clicks INTEGER, updated_at TEXT)")
+    conn.executemany("INSERT INTO ads VALUES (?, ?, ?)", [
+        (1, 10, '2024-01-01 10:00:00'),
+        (2, 20, '2024-01-01 11:00:00'),
+    ])
+    yield conn
+    conn.close()
+
+
+def snapshot(cache, conn):
+    frame = cache.load('ads', conn, QUERY)
+    return dict(zip(frame['id'], frame['clicks']))
+
+
+def test_delta_picks_up_changed_rows(tmp_path, conn):
+    cache = SnapshotCache(str(tmp_path))
+    assert snapshot(cache, conn) == {1: 10, 2: 20}
+
+    conn.execute("UPDATE ads SET clicks = 11, updated_at = '2024-01-01 12:00:00' WHERE id = 1")
+    conn.execute("INSERT INTO ads VALUES (3, 30, '2024-01-01 12:30:00')")
+    assert snapshot(cache, conn) == {1: 11, 2: 20, 3: 30}
+    assert cache.manifest('ads')['watermark'] == '2024-01-01T12:30:00'
+
+
+def test_row_at_the_watermark_committed_after_a_refresh(tmp_path, conn):
+    cache = SnapshotCache(str(tmp_path))
+    snapshot(cache, conn)
+
+    # Committed later but stamped with the same time as the high-water mark
+    conn.execute("INSERT INTO ads VALUES (3, 30, '2024-01-01 11:00:00')")
+    assert snapshot(cache, conn) == {1: 10, 2: 20, 3: 30}
+
+    conn.execute("UPDATE ads SET clicks = 21 WHERE id = 2")
+    conn.execute("UPDATE ads SET clicks = 31 WHERE id = 3")
+    assert snapshot(cache, conn) == {1: 10, 2: 20, 3: 30}  # no newer timestamp, so not seen
+
+
+def test_unchanged_keys_at_the_watermark_are_not_appended(tmp_path, conn):
+    cache = SnapshotCache(str(tmp_path))
+    snapshot(cache, conn)
+    parts = cache.manifest('ads')['parts']
+
+    assert cache.refresh('ads', conn, QUERY) == 0
+    assert cache.refresh('ads', conn, QUERY) == 0
+    assert cache.manifest('ads')['parts'] == parts
+    assert snapshot(cache, conn) == {1: 10, 2: 20}
+
+
+def test_changed_query_rebuilds_the_snapshot(tmp_path, conn):
+    cache = SnapshotCache(str(tmp_path))
+    snapshot(cache, conn)
+    frame = cache.load('ads', conn, QUERY + " WHERE clicks > 15")
+    assert frame['id'].tolist() == [2]
+    assert len(cache.manifest('ads')['parts']) == 1
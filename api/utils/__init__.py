@@ -12,6 +12,7 @@ from .validation import (
     validate_report_data,
     validate_moderation_action_data
 )
+from .model_loader import LazyModel, start_warmup
 
 __all__ = [
     'validate_uuid',
@@ -21,5 +22,7 @@ __all__ = [
     'validate_content_data',
     'validate_ad_data',
     'validate_report_data',
-    'validate_moderation_action_data'
+    'validate_moderation_action_data',
+    'LazyModel',
+    'start_warmup'
 ]
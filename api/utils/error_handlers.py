@@ -46,6 +46,11 @@ class DatabaseError(APIError):
     def __init__(self, message, payload=None):
         super().__init__(message, status_code=500, payload=payload)
 
+class ModelUnavailableError(APIError):
+    """Raised when a model cannot be loaded to serve a request"""
+    def __init__(self, message, payload=None):
+        super().__init__(message, status_code=503, payload=payload)
+
 def register_error_handlers(app):
     """
     Register error handlers for the Flask application
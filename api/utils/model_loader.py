@@ -0,0 +1,96 @@
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .error_handlers import ModelUnavailableError
+
+logger = logging.getLogger(__name__)
+
+NOT_LOADED = 'not_loaded'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+class LazyModel:
+    """
+    Model that is loaded on first use.
+    
+    The first caller of ``get`` loads the model while concurrent callers wait
+    on the same lock, so each model is loaded once. A failed load is
+    reported as ModelUnavailableError and retried on the next call, so one
+    missing artifact does not take down the other models.
+    """
+    
+    def __init__(self, name: str, loader: Callable[[], Any],
+                 warmup: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self._loader = loader
+        self._warmup = warmup
+        self._lock = threading.Lock()
+        self._model = None
+        self.state = NOT_LOADED
+        self.error = None
+        self.load_ms = None
+        self.warmup_ms = None
+        
+    @property
+    def is_ready(self) -> bool:
+        return self.state == READY
+        
+    def get(self) -> Any:
+        """Return the loaded model, loading it first if needed"""
+        model = self._model
+        if model is not None:
+            return model
+        with self._lock:
+            if self._model is None:
+                self._load()
+            return self._model
+            
+    def _load(self):
+        self.state = LOADING
+        start = time.perf_counter()
+        try:
+            model = self._loader()
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e)
+            logger.error(f"Loading model {self.name} failed: {e}")
+            raise ModelUnavailableError(f"Model {self.name} is not available") from e
+        self.load_ms = (time.perf_counter() - start) * 1000
+        self.error = None
+        self._model = model
+        self.state = READY
+        logger.info(f"Loaded model {self.name} in {self.load_ms:.1f} ms")
+        
+    def warm(self):
+        """Load the model and run the warmup batch through it"""
+        model = self.get()
+        if self._warmup is not None:
+            start = time.perf_counter()
+            self._warmup(model)
+            self.warmup_ms = (time.perf_counter() - start) * 1000
+            
+    def status(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'load_ms': self.load_ms,
+            'warmup_ms': self.warmup_ms,
+            'error': self.error
+        }
+
+def start_warmup(models: Iterable[LazyModel]) -> threading.Thread:
+    """Load and warm models one after another on a background thread"""
+    models = list(models)
+    
+    def run():
+        for model in models:
+            try:
+                model.warm()
+            except Exception as e:
+                logger.error(f"Warmup of model {model.name} failed: {e}")
+                
+    thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,129 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+import numpy as np
+
+# Latencies kept for the rolling percentile
+WINDOW = 2048
+# Requests recorded between p99 recomputations
+REFRESH_EVERY = 64
+# Below this many recent samples every request is admitted
+MIN_SAMPLES = 32
+# Samples older than this no longer count towards the p99
+MAX_AGE_S = 30.0
+# The p99 is also recomputed this often when nothing is recorded, so it
+# decays while every request is being degraded
+REFRESH_INTERVAL_S = 1.0
+
+
+class LatencyTracker:
+    """Rolling window of recent request latencies with a periodically refreshed p99.
+
+    Samples expire after ``max_age_s``. Degraded requests record nothing, so
+    without expiry a latency spike would hold the p99 over budget for good;
+    once the spike's samples age out too few remain and requests are
+    admitted again to measure the current latency.
+    """
+
+    def __init__(self, window: int = WINDOW, refresh_every: int = REFRESH_EVERY,
+                 max_age_s: float = MAX_AGE_S, clock: Callable[[], float] = time.monotonic):
+        self._samples = np.zeros(window)
+        self._times = np.full(window, -np.inf)
+        self._count = 0
+        self._recent = 0
+        self._refresh_every = refresh_every
+        self._max_age_s = max_age_s
+        self._clock = clock
+        self._p99 = 0.0
+        self._refreshed_at = clock()
+        self._lock = threading.Lock()
+
+    def _refresh(self, now: float):
+        recent = self._samples[self._times > now - self._max_age_s]
+        self._recent = len(recent)
+        self._p99 = float(np.percentile(recent, 99)) if len(recent) else 0.0
+        self._refreshed_at = now
+
+    def _refresh_if_stale(self):
+        now = self._clock()
+        if now - self._refreshed_at >= REFRESH_INTERVAL_S:
+            with self._lock:
+                self._refresh(now)
+
+    def record(self, latency_ms: float):
+        now = self._clock()
+        with self._lock:
+            slot = self._count % len(self._samples)
+            self._samples[slot] = latency_ms
+            self._times[slot] = now
+            self._count += 1
+            # Refresh on every sample until the window has some history
+            if self._count < self._refresh_every or self._count % self._refresh_every == 0:
+                self._refresh(now)
+            else:
+                self._recent = min(self._recent + 1, len(self._samples))
+
+    @property
+    def p99_ms(self) -> float:
+        self._refresh_if_stale()
+        return self._p99
+
+    @property
+    def count(self) -> int:
+        """Samples recorded within the last ``max_age_s`` seconds"""
+        self._refresh_if_stale()
+        return self._recent
+
+
+class AdmissionController:
+    """Decides whether a request can be scored within the latency budget.
+
+    The expected latency of a new request is the rolling p99 stretched by
+    the work already in flight ahead of it. Requests that would exceed the
+    budget are answered from the CTR priors instead and counted as degraded.
+    """
+
+    def __init__(self, budget_ms: float, concurrency: int = 1):
+        self.budget_ms = budget_ms
+        self.concurrency = max(concurrency, 1)
+        self.latency = LatencyTracker()
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._counters = {'admitted': 0, 'degraded': 0}
+
+    def expected_latency_ms(self) -> float:
+        return self.latency.p99_ms * (1 + self.in_flight / self.concurrency)
+
+    def admit(self) -> bool:
+        """Return True if the request should run the model, False to serve the prior"""
+        admitted = self.latency.count < MIN_SAMPLES or self.expected_latency_ms() <= self.budget_ms
+        with self._lock:
+            self._counters['admitted' if admitted else 'degraded'] += 1
+        return admitted
+
+    @contextmanager
+    def track(self):
+        """Count the request as in flight and record its latency"""
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latency.record((time.perf_counter() - start) * 1000)
+            with self._lock:
+                self.in_flight -= 1
+
+    def metrics(self) -> Dict[str, float]:
+        total = self._counters['admitted'] + self._counters['degraded']
+        return {
+            'requests_total': total,
+            'requests_admitted': self._counters['admitted'],
+            'requests_degraded': self._counters['degraded'],
+            'degraded_ratio': self._counters['degraded'] / total if total else 0.0,
+            'in_flight': self.in_flight,
+            'latency_p99_ms': self.latency.p99_ms,
+            'latency_budget_ms': self.budget_ms,
+        }
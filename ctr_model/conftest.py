@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The service image copies models/common in as ``common``; from a checkout
+# it is imported from the models directory
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+if os.path.isdir(os.path.join(MODELS_DIR, 'common')):
+    sys.path.insert(0, os.path.abspath(MODELS_DIR))
@@ -1,22 +1,137 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import joblib
+import os
 import numpy as np
 from typing import Optional
 from datetime import datetime
 
+from common import packed_batch
+from common.registry import ModelRegistry, ServingModel
+from common.shared_weights import attach_or_publish, release_shared
+from common.quantize import QuantizedEnsemble
+from common.tree_ensemble import TreeEnsemble
+from common.artifact import is_artifact
+from common.feature_store import FeatureStore
+from admission import AdmissionController
+from ctr_priors import SegmentPriors
+
 app = FastAPI(
     title="CTR Prediction API",
     description="API for predicting click-through rates for ads",
     version="1.0.0"
 )
 
-# Load the model
-try:
-    model = joblib.load("model.pkl")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    model = None
+MODEL_NAME = "ctr_lgbm"
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR")
+MODEL_POLL_SECONDS = float(os.getenv("MODEL_POLL_SECONDS", "5"))
+# Map compiled weights from one shared file instead of a private copy per worker
+SHARED_WEIGHTS = os.getenv("MODEL_SHARED_WEIGHTS", "1") == "1"
+# Serve the quantized artifact (model.q.npz) when one was written
+QUANTIZED = os.getenv("MODEL_QUANTIZED", "0") == "1"
+# Requests expected to take longer than this are answered from the CTR priors
+LATENCY_BUDGET_MS = float(os.getenv("CTR_LATENCY_BUDGET_MS", "50"))
+SCORING_CONCURRENCY = int(os.getenv("CTR_SCORING_CONCURRENCY", str(os.cpu_count() or 1)))
+PRIORS_PATH = os.getenv("CTR_PRIORS_PATH", "ctr_priors.npz")
+# User feature snapshot written by common.feature_store, used to fill in persona_id
+USER_FEATURES_DIR = os.getenv("CTR_USER_FEATURES_DIR", "features/users")
+
+def compiled_path(directory: str) -> str:
+    """Pick the compiled artifact to serve from a model directory"""
+    quantized_path = os.path.join(directory, "model.q.npz")
+    if QUANTIZED and os.path.exists(quantized_path):
+        return quantized_path
+    return os.path.join(directory, "model.npz")
+
+def load_compiled(name: str, path: str):
+    """Load compiled or quantized trees, through shared memory when enabled"""
+    if path.endswith(".q.npz"):
+        name, loader = f"{name}-q", QuantizedEnsemble.load
+    else:
+        loader = TreeEnsemble.load
+    if SHARED_WEIGHTS:
+        return attach_or_publish(name, path, loader)
+    return loader(path)
+
+def load_registry_version(version_dir: str, metadata: dict):
+    """Load one registry version of the CTR model"""
+    return load_compiled(f"{MODEL_NAME}-{metadata['version']}", compiled_path(version_dir))
+
+def unload_registry_version(version: str):
+    """Unlink the shared weights of a version that is no longer served"""
+    if SHARED_WEIGHTS:
+        release_shared(f"{MODEL_NAME}-{version}")
+        release_shared(f"{MODEL_NAME}-{version}-q")
+
+# With a registry configured, versions are hot-reloaded in the background;
+# otherwise load the local model once, preferring the compiled tree arrays
+serving_model = None
+model = None
+if MODEL_REGISTRY_DIR:
+    serving_model = ServingModel(
+        ModelRegistry(MODEL_REGISTRY_DIR), MODEL_NAME, load_registry_version,
+        poll_interval=MODEL_POLL_SECONDS, unloader=unload_registry_version
+    ).start()
+else:
+    try:
+        if os.path.exists(compiled_path(".")):
+            model = load_compiled(MODEL_NAME, compiled_path("."))
+        else:
+            model = joblib.load("model.pkl")
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        model = None
+
+# Without a priors table there is nothing to degrade to, so every request is scored
+admission = AdmissionController(LATENCY_BUDGET_MS, SCORING_CONCURRENCY)
+priors = None
+if os.path.exists(PRIORS_PATH):
+    try:
+        priors = SegmentPriors.load(PRIORS_PATH)
+    except Exception as e:
+        print(f"Error loading CTR priors: {e}")
+
+user_features = None
+if is_artifact(USER_FEATURES_DIR):
+    try:
+        user_features = FeatureStore.load(USER_FEATURES_DIR)
+    except Exception as e:
+        print(f"Error loading user features: {e}")
+
+def user_persona(user_id: str, persona_id: Optional[int]) -> Optional[int]:
+    """The request's persona, else the one recorded in the user feature store"""
+    if persona_id is not None or user_features is None:
+        return persona_id
+    features = user_features.get(user_id)
+    if features is None or np.isnan(features['persona_id']):
+        return None
+    return int(features['persona_id'])
+
+def should_degrade() -> bool:
+    """True when the request should be answered from the priors to meet the latency budget"""
+    return priors is not None and not admission.admit()
+
+def select_model(routing_key: Optional[str] = None):
+    """Return (version, model) for a request; version is None for a local model"""
+    if serving_model is not None:
+        if not serving_model.is_loaded:
+            return None, None
+        return serving_model.select(routing_key)
+    return None, model
+
+def predict_click_probability(active_model, features: np.ndarray) -> np.ndarray:
+    """Score a feature matrix with whichever model representation is loaded"""
+    if isinstance(active_model, (TreeEnsemble, QuantizedEnsemble)) or not hasattr(active_model, "predict_proba"):
+        return active_model.predict(features)
+    return active_model.predict_proba(features)[:, 1]
+
+def model_feature_names(active_model) -> Optional[list]:
+    """Feature order the model was trained with, if it recorded one"""
+    names = getattr(active_model, "feature_names", None)
+    if names is None:
+        names = getattr(active_model, "feature_names_in_", None)
+    return list(names) if names is not None else None
 
 class CTRPredictionRequest(BaseModel):
     ad_id: str
@@ -24,6 +139,8 @@ class CTRPredictionRequest(BaseModel):
     feed_position: int
     feed_type: str
     timestamp: Optional[datetime] = None
+    persona_id: Optional[int] = None
+    ad_category: Optional[int] = None
 
 class CTRPredictionResponse(BaseModel):
     ad_id: str
@@ -33,12 +150,33 @@ class CTRPredictionResponse(BaseModel):
     predicted_ctr: float
     confidence: float
     timestamp: datetime
+    model_version: Optional[str] = None
+    degraded: bool = False
 
 @app.post("/api/ads/predict/ctr", response_model=CTRPredictionResponse)
 async def predict_ctr(data: CTRPredictionRequest):
-    if model is None:
+    # Resolve the model once so a concurrent reload cannot change it mid-request
+    model_version, active_model = select_model(data.user_id)
+    if active_model is None:
         raise HTTPException(status_code=500, detail="Model not loaded")
     
+    timestamp = data.timestamp or datetime.now()
+    if should_degrade():
+        # Over budget: answer from the segment priors instead of queueing
+        persona_id = user_persona(data.user_id, data.persona_id)
+        prob = priors.lookup(persona_id, data.ad_category, data.feed_position, timestamp.hour)
+        return CTRPredictionResponse(
+            ad_id=data.ad_id,
+            user_id=data.user_id,
+            feed_position=data.feed_position,
+            feed_type=data.feed_type,
+            predicted_ctr=float(round(prob, 4)),
+            confidence=0.5,
+            timestamp=timestamp,
+            model_version=model_version,
+            degraded=True
+        )
+
     try:
         # Extract features from the request
         features = np.array([[
@@ -46,11 +184,13 @@ async def predict_ctr(data: CTRPredictionRequest):
             hash(data.user_id) % 1000,  # Simple hash for user_id
             data.feed_position,
             hash(data.feed_type) % 10,  # Simple hash for feed_type
-            data.timestamp.hour if data.timestamp else datetime.now().hour
+            timestamp.hour
         ]])
         
-        # Get prediction and confidence
-        prob = model.predict_proba(features)[0][1]  # Probability of click
+        # Get prediction and confidence; scoring runs off the event loop so
+        # queued requests show up as in-flight work
+        with admission.track():
+            prob = (await run_in_threadpool(predict_click_probability, active_model, features))[0]  # Probability of click
         confidence = 0.8  # Mock confidence score
         
         return CTRPredictionResponse(
@@ -60,11 +200,65 @@ async def predict_ctr(data: CTRPredictionRequest):
             feed_type=data.feed_type,
             predicted_ctr=float(round(prob, 4)),
             confidence=float(round(confidence, 4)),
-            timestamp=data.timestamp or datetime.now()
+            timestamp=timestamp,
+            model_version=model_version
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/ads/predict/ctr/batch")
+async def predict_ctr_batch(request: Request):
+    """Score a packed feature matrix and return packed float32 CTRs.
+
+    The body uses the format in common.packed_batch; columns are matched to
+    the model's feature schema by name. The optional X-Routing-Key header
+    selects the canary bucket like user_id does for the JSON endpoint.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type != packed_batch.CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Expected {packed_batch.CONTENT_TYPE}")
+
+    model_version, active_model = select_model(request.headers.get("x-routing-key"))
+    if active_model is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+
+    body = await request.body()
+    try:
+        feature_names, packed = packed_batch.decode_matrix(body)
+        features = packed_batch.align_columns(feature_names, packed, model_feature_names(active_model))
+    except packed_batch.PackedFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    degraded = should_degrade()
+    try:
+        if degraded:
+            scores = priors.lookup_columns(feature_names, packed)
+        else:
+            with admission.track():
+                scores = await run_in_threadpool(predict_click_probability, active_model, features)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return Response(
+        content=packed_batch.encode_scores(scores),
+        media_type=packed_batch.SCORES_CONTENT_TYPE,
+        headers={"X-Model-Version": model_version or "", "X-Degraded": "1" if degraded else "0"}
+    )
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "model_loaded": model is not None}
+    model_version, active_model = select_model()
+    return {
+        "status": "healthy",
+        "model_loaded": active_model is not None,
+        "model_version": model_version
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Admission counters and the latency the budget is judged against"""
+    return {
+        **admission.metrics(),
+        "priors_loaded": priors is not None,
+        "user_features": len(user_features) if user_features is not None else 0
+    }
@@ -0,0 +1,40 @@
+from admission import MAX_AGE_S, MIN_SAMPLES, AdmissionController, LatencyTracker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_admission_recovers_after_latency_spike():
+    clock = FakeClock()
+    controller = AdmissionController(budget_ms=50)
+    controller.latency = LatencyTracker(clock=clock)
+
+    for latency_ms in [10.0] * 100 + [200.0] * 64:
+        controller.latency.record(latency_ms)
+    assert controller.latency.p99_ms > controller.budget_ms
+    assert not any(controller.admit() for _ in range(10000))
+
+    # The spike ages out and requests are admitted to measure latency again
+    clock.now += MAX_AGE_S + 1
+    assert controller.latency.count == 0
+    assert controller.admit()
+
+    for _ in range(MIN_SAMPLES):
+        controller.latency.record(10.0)
+    assert controller.latency.p99_ms == 10.0
+    assert controller.admit()
+
+
+def test_recent_samples_keep_counting():
+    clock = FakeClock()
+    tracker = LatencyTracker(clock=clock)
+    for _ in range(100):
+        tracker.record(20.0)
+        clock.now += 0.1
+    assert tracker.count == 100
+    assert tracker.p99_ms == 20.0
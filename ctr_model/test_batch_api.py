@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import GradientBoostingClassifier
+
+import ctr_api
+from common import packed_batch
+from common.tree_ensemble import compile_ensemble
+
+FEATURES = ['ad_id', 'user_id', 'feed_position', 'feed_type', 'hour']
+HEADERS = {'content-type': packed_batch.CONTENT_TYPE}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.random((200, len(FEATURES))).astype(np.float32), columns=FEATURES)
+    model = compile_ensemble(GradientBoostingClassifier(n_estimators=5).fit(X, X['hour'] > 0.5))
+    monkeypatch.setattr(ctr_api, 'serving_model', None)
+    monkeypatch.setattr(ctr_api, 'model', model)
+    monkeypatch.setattr(ctr_api, 'priors', None)
+    return TestClient(ctr_api.app), model
+
+
+def test_scores_columns_matched_by_name(client):
+    client, model = client
+    X = np.random.default_rng(1).random((3, len(FEATURES))).astype(np.float32)
+    reordered = FEATURES[::-1]
+    body = packed_batch.encode_matrix(X[:, ::-1], reordered)
+    response = client.post('/api/ads/predict/ctr/batch', content=body, headers=HEADERS)
+    assert response.status_code == 200
+    assert response.headers['content-type'] == packed_batch.SCORES_CONTENT_TYPE
+    np.testing.assert_allclose(packed_batch.decode_scores(response.content), model.predict(X), rtol=1e-6)
+
+
+def test_wrong_content_type_is_415(client):
+    client, _ = client
+    body = packed_batch.encode_matrix(np.zeros((1, len(FEATURES)), dtype=np.float32), FEATURES)
+    response = client.post('/api/ads/predict/ctr/batch', content=body,
+                           headers={'content-type': 'application/json'})
+    assert response.status_code == 415
+
+
+@pytest.mark.parametrize('body', [
+    b'PKFM',
+    b'XXXX' + packed_batch.encode_matrix(np.zeros((1, 5), dtype=np.float32), FEATURES)[4:],
+    packed_batch.encode_matrix(np.zeros((2, 5), dtype=np.float32), FEATURES)[:-4],
+    packed_batch.encode_matrix(np.zeros((1, 4), dtype=np.float32), FEATURES[:4]),
+], ids=['short', 'bad-magic', 'truncated', 'missing-column'])
+def test_malformed_body_is_400(client, body):
+    client, _ = client
+    response = client.post('/api/ads/predict/ctr/batch', content=body, headers=HEADERS)
+    assert response.status_code == 400
@@ -2,8 +2,14 @@ import pandas as pd
 import numpy as np
 import lightgbm as lgb
 import joblib
+import os
+import tempfile
 from datetime import datetime, timedelta
 
+from common.registry import ModelRegistry
+from common.quantize import QuantizedEnsemble, quantization_report
+from common.tree_ensemble import compile_ensemble
+
 personas = [
     {"name": "Teen Gamer", "category": 0, "night": 1, "mobile": 1, "boost": 0.15},
     {"name": "Political Boomer", "category": 1, "night": 0, "mobile": 0, "boost": 0.12},
@@ -179,7 +185,21 @@ def generate(n=10000):
         "has_active_flags", "flag_score", "report_count", "moderation_status"
     ]), y
 
-def train():
+def publish(model, feature_schema, metrics, trained_at, registry_dir):
+    """Publish model.pkl, model.npz and model.q.npz as a new registry version"""
+    with tempfile.TemporaryDirectory() as staging:
+        joblib.dump(model, os.path.join(staging, "model.pkl"))
+        ensemble = compile_ensemble(model)
+        ensemble.save(os.path.join(staging, "model.npz"))
+        QuantizedEnsemble.from_ensemble(ensemble).save(os.path.join(staging, "model.q.npz"))
+        version = ModelRegistry(registry_dir).publish(
+            "ctr_lgbm", staging, feature_schema, metrics=metrics, trained_at=trained_at
+        )
+    print(f"Published ctr_lgbm {version} to {registry_dir}")
+    return version
+
+def train(registry_dir=os.getenv("MODEL_REGISTRY_DIR")):
+    trained_at = datetime.now()
     X, y = generate()
     model = lgb.LGBMRegressor(
         n_estimators=100,
@@ -193,6 +213,17 @@ def train():
     model.fit(X, y)
     joblib.dump(model, "model.pkl")
     print("Saved model.pkl")
+    ensemble = compile_ensemble(model)
+    ensemble.save("model.npz")
+    print("Saved model.npz")
+    quantized = QuantizedEnsemble.from_ensemble(ensemble)
+    quantized.save("model.q.npz")
+    print(f"Saved model.q.npz: {quantization_report(ensemble, quantized, X.values, 'model.pkl')}")
+
+    if registry_dir:
+        X_val, y_val = generate(2000)
+        rmse = float(np.sqrt(np.mean((model.predict(X_val) - np.array(y_val)) ** 2)))
+        publish(model, list(X.columns), {"rmse": rmse}, trained_at, registry_dir)
 
 if __name__ == "__main__":
     train()
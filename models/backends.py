@@ -0,0 +1,133 @@
+import os
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+import numpy as np
+from sklearn.ensemble import (
+    GradientBoostingClassifier,
+    GradientBoostingRegressor,
+    HistGradientBoostingClassifier,
+    HistGradientBoostingRegressor,
+    RandomForestClassifier,
+    RandomForestRegressor
+)
+from sklearn.exceptions import NotFittedError
+from sklearn.utils.validation import check_is_fitted
+
+try:
+    import lightgbm
+except ImportError:
+    lightgbm = None
+
+logger = logging.getLogger(__name__)
+
+# Estimator backends a model can be trained with:
+#   sklearn   - GradientBoosting / RandomForest (forests use n_jobs threads)
+#   hist      - HistGradientBoosting, OpenMP threads limited to n_jobs
+#   lightgbm  - LGBM gbdt, or rf mode for forest models, with n_jobs threads
+BACKENDS = ('sklearn', 'hist', 'lightgbm')
+DEFAULT_BACKEND = os.getenv("MODEL_BACKEND", "sklearn")
+
+# Row and feature subsampling LightGBM needs to grow a random forest
+LIGHTGBM_RF_BAGGING = {'bagging_fraction': 0.632, 'bagging_freq': 1, 'feature_fraction': 0.8}
+
+
+def check_backend(backend: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    if backend == 'lightgbm' and lightgbm is None:
+        raise ImportError("The lightgbm backend requires the lightgbm package")
+    return backend
+
+
+def build_estimator(backend: str, task: str, kind: str, params: Dict[str, Any],
+                    n_jobs: Optional[int] = None):
+    """Create an unfitted estimator.
+
+    ``task`` is 'classification' or 'regression', ``kind`` is 'boosting' or
+    'forest', and ``params`` holds n_estimators, max_depth, random_state and,
+    for boosting, learning_rate.
+    """
+    check_backend(backend)
+    classification = task == 'classification'
+    n_estimators = params['n_estimators']
+    max_depth = params['max_depth']
+    random_state = params.get('random_state')
+    learning_rate = params.get('learning_rate', 0.1)
+
+    if backend == 'sklearn':
+        if kind == 'forest':
+            cls = RandomForestClassifier if classification else RandomForestRegressor
+            return cls(n_estimators=n_estimators, max_depth=max_depth,
+                       random_state=random_state, n_jobs=n_jobs)
+        cls = GradientBoostingClassifier if classification else GradientBoostingRegressor
+        return cls(n_estimators=n_estimators, learning_rate=learning_rate,
+                   max_depth=max_depth, random_state=random_state)
+
+    if backend == 'hist':
+        # sklearn has no histogram forest, so forests become boosted trees of the same depth
+        cls = HistGradientBoostingClassifier if classification else HistGradientBoostingRegressor
+        return cls(max_iter=n_estimators, learning_rate=learning_rate, max_depth=max_depth,
+                   early_stopping=False, random_state=random_state)
+
+    cls = lightgbm.LGBMClassifier if classification else lightgbm.LGBMRegressor
+    extra = dict(boosting_type='rf', **LIGHTGBM_RF_BAGGING) if kind == 'forest' else {}
+    return cls(n_estimators=n_estimators, learning_rate=learning_rate, max_depth=max_depth,
+               num_leaves=2 ** max_depth, random_state=random_state,
+               n_jobs=n_jobs if n_jobs is not None else -1, verbose=-1, **extra)
+
+
+def extend_estimator(backend: str, estimator, X: np.ndarray, y: np.ndarray, n_estimators: int):
+    """Add ``n_estimators`` trees fitted on (X, y) to a fitted estimator and return it.
+
+    Boosting continues from the current ensemble's predictions on the new rows;
+    forests gain trees grown on the new rows only. Existing trees are kept.
+    """
+    check_backend(backend)
+    if backend == 'lightgbm':
+        if estimator.get_params().get('boosting_type') == 'rf':
+            raise ValueError("LightGBM random forests cannot be trained incrementally")
+        booster = estimator.booster_
+        estimator.set_params(n_estimators=n_estimators)
+        estimator.fit(X, y, init_model=booster)
+        # Keep n_estimators describing the whole ensemble
+        estimator.set_params(n_estimators=booster.current_iteration() + n_estimators)
+        return estimator
+
+    size_param = 'max_iter' if backend == 'hist' else 'n_estimators'
+    current = estimator.get_params()[size_param]
+    estimator.set_params(warm_start=True, **{size_param: current + n_estimators})
+    estimator.fit(X, y)
+    return estimator
+
+
+@contextmanager
+def thread_limit(backend: str, n_jobs: Optional[int] = None):
+    """Limit OpenMP threads for backends that take no n_jobs argument"""
+    if backend != 'hist' or n_jobs is None or n_jobs < 1:
+        yield
+        return
+    from threadpoolctl import threadpool_limits
+    with threadpool_limits(limits=n_jobs, user_api='openmp'):
+        yield
+
+
+def feature_importances(estimator) -> np.ndarray:
+    """Normalised importances for any backend's fitted estimator"""
+    try:
+        check_is_fitted(estimator)
+    except NotFittedError:
+        raise ValueError("Estimator is not fitted; load the model with load_estimator=True "
+                         "to get feature importances") from None
+    if hasattr(estimator, 'feature_importances_'):
+        importance = np.asarray(estimator.feature_importances_, dtype=np.float64)
+    else:
+        # HistGradientBoosting exposes no importances; sum split gains per feature instead
+        importance = np.zeros(estimator.n_features_in_)
+        for predictors in estimator._predictors:
+            for predictor in predictors:
+                splits = predictor.nodes[~predictor.nodes['is_leaf'].astype(bool)]
+                np.add.at(importance, splits['feature_idx'], splits['gain'])
+    total = importance.sum()
+    return importance / total if total > 0 else importance
@@ -0,0 +1,114 @@
+"""
+Benchmark the estimator backends for every model.
+
+For each model and backend this reports training time, predict latency for a
+single row and a 1,000-row batch, the model's evaluation metrics and how far
+they drift from the sklearn backend.
+
+    python benchmark_backends.py --rows 50000 --n-jobs 4
+    python benchmark_backends.py --data features.parquet --backends sklearn hist
+"""
+import argparse
+import logging
+import time
+from typing import Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+from backends import BACKENDS, lightgbm
+from content_interaction import ContentInteractionModel
+from feed_ranking import FeedRankingModel
+from ctr_model import CTRModel
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+MODELS = {
+    'ctr': (CTRModel, 'click'),
+    'content': (ContentInteractionModel, 'engagement_score'),
+    'feed': (FeedRankingModel, 'ranking_score')
+}
+
+def synthetic_data(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Random features for every model with targets that depend on a few of them"""
+    rng = np.random.default_rng(seed)
+    columns = sorted({col for model_cls, _ in MODELS.values() for col in model_cls().feature_columns})
+    data = pd.DataFrame(rng.normal(size=(n_rows, len(columns))), columns=columns)
+    signal = data['user_engagement_score'] + 0.5 * data['content_engagement_score'] - 0.3 * data['feed_position']
+    data['click'] = (signal + rng.normal(size=n_rows) > 1.0).astype(int)
+    data['engagement_score'] = signal + 0.2 * data['content_length'] + rng.normal(scale=0.5, size=n_rows)
+    # Ranking scores must be non-negative for NDCG
+    ranking = data['predicted_ctr'] + data['predicted_engagement'] + rng.normal(scale=0.5, size=n_rows)
+    data['ranking_score'] = 1.0 / (1.0 + np.exp(-ranking))
+    return data
+
+def load_data(path: str) -> pd.DataFrame:
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+def time_call(func, repeat: int) -> float:
+    """Median wall time of ``func`` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+def benchmark_model(name: str, backend: str, train: pd.DataFrame, test: pd.DataFrame,
+                    n_jobs: int) -> Dict[str, Any]:
+    model_cls, _ = MODELS[name]
+    model = model_cls(backend=backend, n_jobs=n_jobs)
+
+    start = time.perf_counter()
+    model.train(train)
+    train_seconds = time.perf_counter() - start
+
+    batch = test.iloc[:1000]
+    row = test.iloc[:1]
+    result = {
+        'model': name,
+        'backend': backend,
+        'train_s': round(train_seconds, 3),
+        'predict_1_ms': round(time_call(lambda: model.predict(row), 50), 3),
+        'predict_1000_ms': round(time_call(lambda: model.predict(batch), 20), 3),
+    }
+    result.update({key: round(float(value), 5) for key, value in model.evaluate(test).items()})
+    result['predictions'] = model.predict(test)
+    return result
+
+def run(data: pd.DataFrame, backends: List[str], n_jobs: int) -> pd.DataFrame:
+    split = int(len(data) * 0.8)
+    train, test = data.iloc[:split], data.iloc[split:]
+
+    rows = []
+    for name in MODELS:
+        reference = None
+        for backend in backends:
+            result = benchmark_model(name, backend, train, test, n_jobs)
+            predictions = result.pop('predictions')
+            if reference is None:
+                reference = predictions
+            # Agreement with the first backend's predictions
+            result['pred_corr'] = round(float(np.corrcoef(reference, predictions)[0, 1]), 4)
+            rows.append(result)
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', help="CSV or parquet file with every model's features and targets")
+    parser.add_argument('--rows', type=int, default=20000, help="Rows of synthetic data when --data is not given")
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS,
+                        default=[b for b in BACKENDS if b != 'lightgbm' or lightgbm is not None])
+    parser.add_argument('--n-jobs', type=int, default=None, help="Threads per backend (default: all cores)")
+    args = parser.parse_args()
+
+    data = load_data(args.data) if args.data else synthetic_data(args.rows)
+    report = run(data, args.backends, args.n_jobs)
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(report.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Serving-side building blocks shared by the models, ctr_model and api services.
+"""
+
+from .affine import AffineTransform
+from .categorical import CategoricalEncoder
+from .feature_store import FeatureStore
+from .interest_store import InterestStore
+from .tree_ensemble import TreeEnsemble, compile_ensemble
+from .quantize import QuantizedEnsemble, quantization_report
+from .registry import ModelRegistry, ServingModel
+from .schema import COLUMN_TYPES, enforce_schema, memory_report
+from .shared_weights import attach_or_publish, attach_ensemble, publish_ensemble, release_shared
+
+__all__ = [
+    'AffineTransform',
+    'CategoricalEncoder',
+    'FeatureStore',
+    'InterestStore',
+    'TreeEnsemble',
+    'compile_ensemble',
+    'QuantizedEnsemble',
+    'quantization_report',
+    'ModelRegistry',
+    'ServingModel',
+    'COLUMN_TYPES',
+    'enforce_schema',
+    'memory_report',
+    'attach_or_publish',
+    'attach_ensemble',
+    'publish_ensemble',
+    'release_shared'
+]
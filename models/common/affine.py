@@ -0,0 +1,41 @@
+from typing import Optional
+
+import numpy as np
+
+
+class AffineTransform:
+    """Per-column ``x * scale + offset`` with coefficients fixed at fit time.
+
+    Built from a fitted StandardScaler so serving never touches the scaler:
+    ``(x - mean) / std`` is folded into one multiply and one add, applied in
+    place on a float32 matrix.
+    """
+
+    def __init__(self, scale: np.ndarray, offset: np.ndarray, dtype: str = 'float32'):
+        self.dtype = np.dtype(dtype)
+        self.scale = np.ascontiguousarray(scale, dtype=self.dtype)
+        self.offset = np.ascontiguousarray(offset, dtype=self.dtype)
+
+    @classmethod
+    def from_scaler(cls, scaler, dtype: str = 'float32') -> 'AffineTransform':
+        """Fuse a fitted StandardScaler's mean and scale into an affine transform"""
+        n_features = scaler.n_features_in_
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+        std = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+        scale = 1.0 / std
+        return cls(scale, -mean * scale, dtype)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.scale)
+
+    def transform(self, X: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Apply the transform; pass ``out=X`` to transform a float32 matrix in place"""
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got shape {X.shape}")
+        if out is None:
+            out = np.empty(X.shape, dtype=self.dtype)
+        np.multiply(X, self.scale, out=out)
+        np.add(out, self.offset, out=out)
+        return out
@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import tempfile
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .affine import AffineTransform
+from .shared_weights import ENSEMBLE_KINDS, Ensemble
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+# Optional pickled estimator, needed only to keep training (update, importances)
+ESTIMATOR_FILE = 'estimator.joblib'
+
+# Artifact layout::
+#
+#   <dir>/manifest.json          format version, metadata, array index
+#   <dir>/<array name>.<version>.npy
+#                                raw arrays (scaler stats, encoders, trees)
+#   <dir>/estimator.joblib       optional, training only
+#
+# Arrays are plain .npy files written with allow_pickle=False, so serving
+# maps them read-only and never unpickles anything. Each save writes its
+# arrays under a new version, so files a manifest points to never change.
+
+
+def save_artifact(directory: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+    """Write arrays and metadata as a manifest plus one .npy file per array.
+
+    Arrays go to files named for this save's version and the manifest is
+    replaced last, so a reader sees either the old or the new artifact.
+    The previous version's arrays are removed once the manifest no longer
+    lists them.
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = uuid.uuid4().hex[:12]
+    index = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        filename = f"{name}.{version}.npy"
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, array, allow_pickle=False)
+        os.replace(tmp_path, os.path.join(directory, filename))
+        index[name] = {'file': filename, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+
+    manifest = {'format_version': FORMAT_VERSION, 'meta': meta, 'arrays': index}
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+
+    # Open memory maps keep removed files readable
+    current = {spec['file'] for spec in index.values()}
+    for filename in os.listdir(directory):
+        if filename.endswith('.npy') and filename not in current:
+            os.remove(os.path.join(directory, filename))
+    logger.info(f"Saved artifact with {len(arrays)} arrays to {directory}")
+
+
+def load_artifact(directory: str, mmap: bool = True) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Read an artifact, memory-mapping its arrays read-only by default"""
+    try:
+        return _load_artifact(directory, mmap)
+    except FileNotFoundError:
+        # A save removed the arrays of the manifest just read; the new one
+        # lists the arrays that replaced them
+        return _load_artifact(directory, mmap)
+
+
+def _load_artifact(directory: str, mmap: bool) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {manifest.get('format_version')} in {directory}")
+
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        path = os.path.join(directory, spec['file'])
+        # Zero-size arrays cannot be memory-mapped
+        mmap_mode = 'r' if mmap and int(np.prod(spec['shape'])) > 0 else None
+        arrays[name] = np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+    return manifest['meta'], arrays
+
+
+def is_artifact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def ensemble_arrays(ensemble: Ensemble, prefix: str = 'trees') -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Split a compiled or quantized ensemble into prefixed arrays and metadata"""
+    meta = ensemble.metadata()
+    meta['kind'] = next(kind for kind, cls in ENSEMBLE_KINDS.items() if isinstance(ensemble, cls))
+    arrays = {f"{prefix}.{name}": getattr(ensemble, name) for name in ensemble.ARRAY_FIELDS}
+    return arrays, meta
+
+
+def ensemble_from_arrays(arrays: Dict[str, np.ndarray], meta: Dict[str, Any],
+                         prefix: str = 'trees') -> Ensemble:
+    meta = dict(meta)
+    cls = ENSEMBLE_KINDS[meta.pop('kind', 'tree')]
+    return cls(**{name: arrays[f"{prefix}.{name}"] for name in cls.ARRAY_FIELDS}, **meta)
+
+
+def save_model_artifact(directory: str, meta: Dict[str, Any], transform: AffineTransform,
+                        ensemble: Ensemble, scaler=None, estimator=None,
+                        extra_arrays: Optional[Dict[str, np.ndarray]] = None):
+    """Save a scaled tree model: scaler stats, the fused transform and the compiled trees.
+
+    ``estimator`` is written to a separate joblib file that loading skips
+    unless asked for, so serving needs only the manifest and .npy files.
+    """
+    arrays, trees_meta = ensemble_arrays(ensemble)
+    arrays['transform.scale'] = transform.scale
+    arrays['transform.offset'] = transform.offset
+    if scaler is not None:
+        n_features = transform.n_features
+        arrays['scaler.mean'] = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+        arrays['scaler.scale'] = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+    arrays.update(extra_arrays or {})
+
+    estimator_path = os.path.join(directory, ESTIMATOR_FILE)
+    if estimator is not None:
+        import joblib
+        os.makedirs(directory, exist_ok=True)
+        # Written beside the target and renamed, so a crash cannot leave a
+        # truncated estimator behind
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            joblib.dump(estimator, f)
+        os.replace(tmp_path, estimator_path)
+    elif os.path.exists(estimator_path):
+        os.remove(estimator_path)
+
+    save_artifact(directory, arrays, dict(meta, trees=trees_meta))
+
+
+def load_model_artifact(directory: str, load_estimator: bool = False, mmap: bool = True) -> Dict[str, Any]:
+    """Load a model saved by save_model_artifact.
+
+    Returns a dict with ``meta``, ``arrays``, ``transform``, ``ensemble`` and
+    ``estimator`` (None unless requested and present).
+    """
+    meta, arrays = load_artifact(directory, mmap=mmap)
+    transform = AffineTransform(arrays['transform.scale'], arrays['transform.offset'])
+    ensemble = ensemble_from_arrays(arrays, meta['trees'])
+
+    estimator = None
+    estimator_path = os.path.join(directory, ESTIMATOR_FILE)
+    if load_estimator and os.path.exists(estimator_path):
+        import joblib
+        estimator = joblib.load(estimator_path)
+
+    return {'meta': meta, 'arrays': arrays, 'transform': transform, 'ensemble': ensemble, 'estimator': estimator}
+
+
+def restore_scaler(scaler, arrays: Dict[str, np.ndarray]):
+    """Set a StandardScaler's fitted statistics from artifact arrays"""
+    if 'scaler.mean' in arrays:
+        scaler.mean_ = np.array(arrays['scaler.mean'])
+        scaler.scale_ = np.array(arrays['scaler.scale'])
+        scaler.var_ = scaler.scale_ ** 2
+        scaler.n_features_in_ = len(scaler.mean_)
+    return scaler
@@ -0,0 +1,109 @@
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+UNKNOWN_LABEL = 'unknown'
+
+
+def _key(value) -> Optional[str]:
+    """Lookup key of a category; missing values have none.
+
+    Integral floats key as ints, so a category column that was read back as
+    float (an integer column with NULLs) matches integer request values.
+    """
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, (float, np.floating)):
+        if np.isnan(value):
+            return None
+        if float(value).is_integer():
+            value = int(value)
+    return str(value)
+
+
+class CategoricalEncoder:
+    """Label and one-hot encoder with a frozen vocabulary and an unknown code.
+
+    The vocabulary is sorted on the original values and fixed when the
+    encoder is fitted, so codes match LabelEncoder's (numbers in numeric
+    order) and a one-hot block always has ``n_columns`` columns in the same
+    order regardless of which categories appear in a batch. A vocabulary
+    passed in keeps its order. Unseen and missing values get
+    ``unknown_code``, the last column, instead of raising. Values are
+    compared by key, their string with integral floats written as ints;
+    single values are looked up in a dict and batches are factorized so
+    only distinct values are looked up.
+    """
+
+    def __init__(self, vocabulary: Optional[Sequence[str]] = None):
+        self.vocabulary = None
+        self._index = {}
+        if vocabulary is not None:
+            self._set_vocabulary(vocabulary)
+
+    def _set_vocabulary(self, vocabulary: Iterable[str]):
+        keys = dict.fromkeys(_key(value) for value in vocabulary)
+        self.vocabulary = np.array([key for key in keys if key is not None], dtype=str)
+        self._index = {value: i for i, value in enumerate(self.vocabulary.tolist())}
+
+    def fit(self, values: Iterable) -> 'CategoricalEncoder':
+        """Freeze the vocabulary to the distinct non-missing values in sorted order"""
+        distinct = pd.Series(values, dtype=object).dropna().unique()
+        try:
+            distinct = sorted(distinct)
+        except TypeError:
+            # Mixed types have no common order
+            distinct = sorted(distinct, key=str)
+        self._set_vocabulary(distinct)
+        return self
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.vocabulary is not None
+
+    @property
+    def n_columns(self) -> int:
+        return len(self.vocabulary) + 1
+
+    @property
+    def unknown_code(self) -> int:
+        return len(self.vocabulary)
+
+    def column_names(self, prefix: str) -> List[str]:
+        return [f"{prefix}_{value}" for value in self.vocabulary.tolist()] + [f"{prefix}_{UNKNOWN_LABEL}"]
+
+    def code(self, value) -> int:
+        """Column of a single value within the block"""
+        return self._index.get(_key(value), self.unknown_code)
+
+    def codes(self, values) -> np.ndarray:
+        """Codes of many values; a pandas Categorical maps only its categories"""
+        if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+            values = pd.Series(values)
+            category_codes = np.append(self.codes(values.cat.categories.to_numpy(dtype=object)), self.unknown_code)
+            return category_codes[values.cat.codes.to_numpy()].astype(np.int32)
+        # Hash the batch once, then look up each distinct value
+        positions, uniques = pd.factorize(pd.Series(values, dtype=object))
+        lookup = np.array([self.code(value) for value in uniques] + [self.unknown_code], dtype=np.int32)
+        return lookup[positions]
+
+    def transform(self, values, out: Optional[np.ndarray] = None, offset: int = 0) -> np.ndarray:
+        """Dense one-hot block, written into ``out[:, offset:offset + n_columns]`` if given"""
+        codes = self.codes(values)
+        if out is None:
+            out = np.zeros((len(codes), self.n_columns), dtype=np.float32)
+        else:
+            out[:, offset:offset + self.n_columns] = 0
+        out[np.arange(len(codes)), offset + codes] = 1
+        return out
+
+    def transform_sparse(self, values, offset: int = 0, n_columns: Optional[int] = None):
+        """CSR one-hot block placed at ``offset`` in a matrix ``n_columns`` wide"""
+        from scipy import sparse
+        codes = self.codes(values)
+        n_columns = n_columns if n_columns is not None else offset + self.n_columns
+        return sparse.csr_matrix(
+            (np.ones(len(codes), dtype=np.float32), offset + codes, np.arange(len(codes) + 1)),
+            shape=(len(codes), n_columns)
+        )
@@ -0,0 +1,257 @@
+import os
+import logging
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+WORD_BITS = 64
+
+
+def _grow(array: np.ndarray, rows: int, cols: Optional[int] = None) -> np.ndarray:
+    """Zero-padded copy of ``array`` with at least ``rows`` rows (and ``cols`` columns)"""
+    shape = (max(rows, array.shape[0]),) + ((max(cols, array.shape[1]),) if cols is not None else ())
+    if shape == array.shape:
+        return array
+    grown = np.zeros(shape, dtype=array.dtype)
+    grown[tuple(slice(0, n) for n in array.shape)] = array
+    return grown
+
+
+def _min_max(values: np.ndarray, lo: float, hi: float) -> np.ndarray:
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (values - lo) / (hi - lo)
+
+
+def _lookup(values, keys: List[str]) -> np.ndarray:
+    """Positions of ``values`` in ``keys``; -1 for missing or unknown values"""
+    values = pd.Series(values, dtype=object)
+    codes = pd.Index(keys).get_indexer(values.astype(str))
+    codes[values.isna().to_numpy()] = -1
+    return codes
+
+
+class InterestStore:
+    """
+    Running per-user, per-topic engagement aggregates.
+
+    Holds the state behind FeatureEngineer's user_interest_score and
+    content_diversity_score so both can be maintained from new interactions
+    instead of regrouping the whole history:
+
+    - engagement sum and count per (user, topic), plus each topic's sum of
+      per-user means and number of users, for the interest score
+    - a bitset of topics seen per user, its popcount and a histogram of the
+      popcounts, for the diversity score and its min-max range
+
+    ``update`` costs O(new rows + topics) and the scores are lookups, so the
+    store can be queried online. Scores match a batch computation over every
+    interaction applied so far.
+    """
+
+    def __init__(self, initial_users: int = 1024):
+        self.user_index: Dict[str, int] = {}
+        self.topic_index: Dict[str, int] = {}
+        self.users: List[str] = []
+        self.topics: List[str] = []
+        self.watermark = None
+
+        self.engagement_sum = np.zeros((initial_users, 8), dtype=np.float64)
+        self.engagement_count = np.zeros((initial_users, 8), dtype=np.int64)
+        self.topic_bits = np.zeros((initial_users, 1), dtype=np.uint64)
+        self.topic_count = np.zeros(initial_users, dtype=np.int64)
+        # Number of users with each distinct-topic count
+        self.count_histogram = np.zeros(9, dtype=np.int64)
+
+        self.topic_mean_sum = np.zeros(8, dtype=np.float64)
+        self.topic_users = np.zeros(8, dtype=np.int64)
+
+    @property
+    def n_users(self) -> int:
+        return len(self.users)
+
+    @property
+    def n_topics(self) -> int:
+        return len(self.topics)
+
+    def _index(self, values, index: Dict[str, int], keys: List[str]) -> np.ndarray:
+        """Codes for ``values``, registering unseen keys; -1 for missing values"""
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        lookup = np.empty(len(uniques), dtype=np.int64)
+        for i, value in enumerate(uniques):
+            value = str(value)
+            code = index.get(value)
+            if code is None:
+                code = index[value] = len(keys)
+                keys.append(value)
+            lookup[i] = code
+        return np.where(codes >= 0, lookup[codes] if len(lookup) else -1, -1)
+
+    def _reserve(self):
+        """Grow the arrays to fit every registered user and topic"""
+        users = self.engagement_sum.shape[0]
+        while users < self.n_users:
+            users *= 2
+        topics = self.engagement_sum.shape[1]
+        while topics < self.n_topics:
+            topics *= 2
+        words = -(-topics // WORD_BITS)
+
+        new_users = self.n_users - int(self.count_histogram.sum())
+        self.engagement_sum = _grow(self.engagement_sum, users, topics)
+        self.engagement_count = _grow(self.engagement_count, users, topics)
+        self.topic_bits = _grow(self.topic_bits, users, words)
+        self.topic_count = _grow(self.topic_count, users)
+        self.count_histogram = _grow(self.count_histogram, topics + 1)
+        self.topic_mean_sum = _grow(self.topic_mean_sum, topics)
+        self.topic_users = _grow(self.topic_users, topics)
+        # Users start with no topics
+        self.count_histogram[0] += new_users
+
+    def update(self, user_ids, topics, engagement, timestamp=None) -> int:
+        """Apply new interactions; returns the number of rows applied.
+
+        Rows without a user are skipped. Rows without a topic register the
+        user only, and rows with missing engagement count toward diversity
+        but not interest, as in the batch computation.
+        """
+        users = self._index(user_ids, self.user_index, self.users)
+        topic_codes = self._index(topics, self.topic_index, self.topics)
+        engagement = np.asarray(engagement, dtype=np.float64)
+        self._reserve()
+
+        known = users >= 0
+        width = self.engagement_sum.shape[1]
+        pairs = users * width + topic_codes
+        has_topic = known & (topic_codes >= 0)
+
+        # Interest: running sums, and each topic's sum of per-user means
+        rated = has_topic & ~np.isnan(engagement)
+        pair_ids, pair_rows = np.unique(pairs[rated], return_inverse=True)
+        if len(pair_ids):
+            u, t = pair_ids // width, pair_ids % width
+            old_count = self.engagement_count[u, t]
+            old_mean = np.where(old_count > 0, self.engagement_sum[u, t] / np.maximum(old_count, 1), 0.0)
+            self.engagement_sum[u, t] += np.bincount(pair_rows, weights=engagement[rated])
+            self.engagement_count[u, t] += np.bincount(pair_rows)
+            new_mean = self.engagement_sum[u, t] / self.engagement_count[u, t]
+            np.add.at(self.topic_mean_sum, t, new_mean - old_mean)
+            np.add.at(self.topic_users, t, old_count == 0)
+
+        # Diversity: set each user's topic bits and move changed users in the histogram
+        pair_ids = np.unique(pairs[has_topic])
+        if len(pair_ids):
+            u, t = pair_ids // width, pair_ids % width
+            words, bits = t // WORD_BITS, (t % WORD_BITS).astype(np.uint64)
+            masks = np.left_shift(np.uint64(1), bits)
+            new = (self.topic_bits[u, words] & masks) == 0
+            u, words, masks = u[new], words[new], masks[new]
+            if len(u):
+                np.bitwise_or.at(self.topic_bits, (u, words), masks)
+                changed, added = np.unique(u, return_counts=True)
+                np.subtract.at(self.count_histogram, self.topic_count[changed], 1)
+                self.topic_count[changed] += added
+                np.add.at(self.count_histogram, self.topic_count[changed], 1)
+
+        if timestamp is not None and len(timestamp):
+            latest = pd.to_datetime(timestamp).max()
+            self.watermark = latest if self.watermark is None else max(self.watermark, latest)
+        applied = int(known.sum())
+        logger.debug(f"Applied {applied} interactions; {self.n_users} users, {self.n_topics} topics")
+        return applied
+
+    def topic_interest(self) -> np.ndarray:
+        """Min-max scaled average of per-user mean engagement, one value per topic"""
+        n = self.n_topics
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = self.topic_mean_sum[:n] / self.topic_users[:n]
+        if not np.any(self.topic_users[:n]):
+            return np.full(n, np.nan)
+        return _min_max(means, np.nanmin(means), np.nanmax(means))
+
+    def interest_scores(self, topics) -> np.ndarray:
+        """user_interest_score for each topic; NaN for missing or unseen topics"""
+        scores = np.append(self.topic_interest(), np.nan)
+        return scores[_lookup(topics, self.topics)]
+
+    def diversity_scores(self, user_ids) -> np.ndarray:
+        """content_diversity_score for each user; NaN for missing or unseen users"""
+        present = np.flatnonzero(self.count_histogram)
+        if len(present) == 0:
+            return np.full(len(user_ids), np.nan)
+        scores = np.append(_min_max(self.topic_count[:self.n_users].astype(np.float64),
+                                    present[0], present[-1]), np.nan)
+        return scores[_lookup(user_ids, self.users)]
+
+    def user_topics(self, user_id) -> List[str]:
+        """Topics a user has interacted with"""
+        code = self.user_index.get(str(user_id))
+        if code is None:
+            return []
+        bits = np.unpackbits(self.topic_bits[code].view(np.uint8), bitorder='little')
+        return [self.topics[t] for t in np.flatnonzero(bits[:self.n_topics])]
+
+    def save(self, path: str):
+        """Write the store to an uncompressed .npz, replacing any previous file atomically"""
+        n_users, n_topics = self.n_users, self.n_topics
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(
+                f,
+                users=np.array(self.users, dtype=str),
+                topics=np.array(self.topics, dtype=str),
+                engagement_sum=self.engagement_sum[:n_users, :n_topics],
+                engagement_count=self.engagement_count[:n_users, :n_topics],
+                topic_bits=self.topic_bits[:n_users],
+                watermark=np.array(str(self.watermark) if self.watermark is not None else '')
+            )
+        os.replace(tmp_path, path)
+        logger.info(f"Interest store ({n_users} users, {n_topics} topics) saved to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> 'InterestStore':
+        """Load a store written by save, rebuilding the derived aggregates"""
+        with np.load(path, allow_pickle=False) as data:
+            store = cls()
+            store.users = data['users'].tolist()
+            store.topics = data['topics'].tolist()
+            engagement_sum = data['engagement_sum']
+            engagement_count = data['engagement_count']
+            topic_bits = data['topic_bits']
+            watermark = str(data['watermark'])
+        store.user_index = {user: i for i, user in enumerate(store.users)}
+        store.topic_index = {topic: i for i, topic in enumerate(store.topics)}
+        store.watermark = pd.Timestamp(watermark) if watermark else None
+        store._reserve()
+        store._rebuild(engagement_sum, engagement_count, topic_bits)
+        return store
+
+    def _rebuild(self, engagement_sum: np.ndarray, engagement_count: np.ndarray, topic_bits: np.ndarray):
+        """Recompute the derived aggregates from saved sums, counts and topic bits"""
+        n_users, n_topics = engagement_sum.shape
+        self.engagement_sum[:n_users, :n_topics] = engagement_sum
+        self.engagement_count[:n_users, :n_topics] = engagement_count
+
+        rated = engagement_count > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(rated, engagement_sum / np.maximum(engagement_count, 1), 0.0)
+        self.topic_mean_sum[:n_topics] = means.sum(axis=0)
+        self.topic_users[:n_topics] = rated.sum(axis=0)
+
+        self.topic_bits[:n_users, :topic_bits.shape[1]] = topic_bits
+        self.topic_count[:n_users] = np.unpackbits(
+            np.ascontiguousarray(topic_bits).view(np.uint8), axis=1).sum(axis=1)
+        self.count_histogram[:] = 0
+        np.add.at(self.count_histogram, self.topic_count[:n_users], 1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'users': self.n_users,
+            'topics': self.n_topics,
+            'watermark': str(self.watermark) if self.watermark is not None else None,
+            'bytes': sum(a.nbytes for a in (self.engagement_sum, self.engagement_count, self.topic_bits,
+                                            self.topic_count, self.count_histogram))
+        }
@@ -0,0 +1,106 @@
+import struct
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Packed feature matrix wire format (all little-endian):
+#
+#   magic      4s   b'PKFM'
+#   version    B    1
+#   dtype      B    1 = float32, 2 = float64, 3 = int32
+#   reserved   H
+#   n_rows     I
+#   n_cols     I
+#   schema_len I    byte length of the schema that follows
+#   schema          UTF-8 feature names joined by ','
+#   padding         zero bytes up to an 8-byte boundary
+#   payload         n_rows * n_cols values, row-major
+#
+# Scores come back as a bare little-endian float32 array, one per row.
+
+CONTENT_TYPE = 'application/x-packed-features'
+SCORES_CONTENT_TYPE = 'application/x-packed-scores'
+
+MAGIC = b'PKFM'
+VERSION = 1
+_HEADER = struct.Struct('<4sBBHIII')
+
+DTYPE_CODES = {
+    1: np.dtype('<f4'),
+    2: np.dtype('<f8'),
+    3: np.dtype('<i4'),
+}
+_CODES_BY_DTYPE = {dtype: code for code, dtype in DTYPE_CODES.items()}
+
+
+class PackedFormatError(ValueError):
+    """Raised when a packed request body is malformed"""
+
+
+def _payload_offset(schema_len: int) -> int:
+    return (_HEADER.size + schema_len + 7) // 8 * 8
+
+
+def encode_matrix(X: np.ndarray, feature_names: Sequence[str]) -> bytes:
+    """Encode a 2-D matrix and its column names into the packed format"""
+    X = np.asarray(X)
+    dtype = X.dtype.newbyteorder('<')
+    if dtype not in _CODES_BY_DTYPE:
+        raise PackedFormatError(f"Unsupported dtype {X.dtype}")
+    if X.ndim != 2 or X.shape[1] != len(feature_names):
+        raise PackedFormatError("Matrix shape does not match the feature names")
+
+    schema = ','.join(feature_names).encode('utf-8')
+    header = _HEADER.pack(MAGIC, VERSION, _CODES_BY_DTYPE[dtype], 0, X.shape[0], X.shape[1], len(schema))
+    padding = b'\0' * (_payload_offset(len(schema)) - _HEADER.size - len(schema))
+    return header + schema + padding + np.ascontiguousarray(X, dtype=dtype).tobytes()
+
+
+def decode_matrix(body: bytes) -> Tuple[List[str], np.ndarray]:
+    """Decode a packed body into (feature_names, matrix) without copying the payload.
+
+    The returned matrix is a read-only view over ``body``.
+    """
+    if len(body) < _HEADER.size:
+        raise PackedFormatError("Body is shorter than the packed header")
+    magic, version, dtype_code, _, n_rows, n_cols, schema_len = _HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise PackedFormatError("Bad magic bytes")
+    if version != VERSION:
+        raise PackedFormatError(f"Unsupported format version {version}")
+    if dtype_code not in DTYPE_CODES:
+        raise PackedFormatError(f"Unknown dtype code {dtype_code}")
+
+    schema = bytes(body[_HEADER.size:_HEADER.size + schema_len]).decode('utf-8')
+    feature_names = schema.split(',') if schema else []
+    if len(feature_names) != n_cols:
+        raise PackedFormatError("Schema does not name every column")
+
+    dtype = DTYPE_CODES[dtype_code]
+    offset = _payload_offset(schema_len)
+    if len(body) != offset + n_rows * n_cols * dtype.itemsize:
+        raise PackedFormatError("Payload size does not match the header")
+
+    X = np.frombuffer(body, dtype=dtype, count=n_rows * n_cols, offset=offset)
+    return feature_names, X.reshape(n_rows, n_cols)
+
+
+def align_columns(feature_names: List[str], X: np.ndarray,
+                  expected: Optional[Sequence[str]]) -> np.ndarray:
+    """Reorder columns to the model's feature order; a no-op when they already match"""
+    if expected is None or list(expected) == feature_names:
+        return X
+    positions = {name: i for i, name in enumerate(feature_names)}
+    missing = [name for name in expected if name not in positions]
+    if missing:
+        raise PackedFormatError(f"Missing required features: {missing}")
+    return X[:, [positions[name] for name in expected]]
+
+
+def encode_scores(scores: np.ndarray) -> bytes:
+    """Encode scores as a little-endian float32 array"""
+    return np.asarray(scores, dtype='<f4').tobytes()
+
+
+def decode_scores(body: bytes) -> np.ndarray:
+    return np.frombuffer(body, dtype='<f4')
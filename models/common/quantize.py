@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .tree_ensemble import BLOCK_ROWS, LINK_LOGISTIC, TreeEnsemble
+
+logger = logging.getLogger(__name__)
+
+
+class QuantizedEnsemble:
+    """Compact TreeEnsemble that compares bin codes instead of raw thresholds.
+
+    Each feature's distinct split thresholds form a sorted lookup table. An
+    input is binned to the number of thresholds strictly below it, so
+    ``x <= threshold[k]`` becomes ``code <= k`` and the split decisions are
+    exactly those of the original ensemble. Codes are uint8 when every
+    feature has fewer than 255 thresholds and uint16 otherwise; the largest
+    code marks a missing value. Leaf values are stored as float32, which is
+    the only source of error against the original.
+    """
+
+    ARRAY_FIELDS = ('feature', 'threshold_code', 'left', 'right', 'default_left', 'value', 'roots',
+                    'bin_edges', 'bin_offsets')
+
+    def __init__(self, feature: np.ndarray, threshold_code: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, default_left: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, bin_edges: np.ndarray, bin_offsets: np.ndarray,
+                 max_depth: int, n_features: int, base_score: float = 0.0,
+                 link: str = 'identity', feature_names: Optional[List[str]] = None):
+        self.feature = feature
+        self.threshold_code = threshold_code
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.bin_edges = bin_edges
+        self.bin_offsets = bin_offsets
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.base_score = float(base_score)
+        self.link = link
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.missing_code = np.iinfo(threshold_code.dtype).max
+
+    @classmethod
+    def from_ensemble(cls, ensemble: TreeEnsemble) -> 'QuantizedEnsemble':
+        """Quantize a compiled TreeEnsemble"""
+        is_split = ensemble.left != np.arange(ensemble.n_nodes)
+        split_features = ensemble.feature[is_split]
+        split_thresholds = ensemble.threshold[is_split]
+
+        edges = [np.unique(split_thresholds[split_features == f]) for f in range(ensemble.n_features)]
+        bin_offsets = np.cumsum([0] + [len(e) for e in edges]).astype(np.int64)
+        largest = max((len(e) for e in edges), default=0)
+        if largest < np.iinfo(np.uint8).max:
+            code_dtype = np.uint8
+        elif largest < np.iinfo(np.uint16).max:
+            code_dtype = np.uint16
+        else:
+            raise ValueError(f"A feature has {largest} distinct thresholds; at most 65534 can be quantized")
+
+        threshold_code = np.zeros(ensemble.n_nodes, dtype=code_dtype)
+        for f in range(ensemble.n_features):
+            nodes = np.flatnonzero(is_split & (ensemble.feature == f))
+            threshold_code[nodes] = np.searchsorted(edges[f], ensemble.threshold[nodes])
+
+        feature_dtype = np.uint16 if ensemble.n_features <= np.iinfo(np.uint16).max else np.int32
+        return cls(
+            feature=ensemble.feature.astype(feature_dtype),
+            threshold_code=threshold_code,
+            left=ensemble.left.astype(np.int32),
+            right=ensemble.right.astype(np.int32),
+            default_left=ensemble.default_left.astype(bool),
+            value=ensemble.value.astype(np.float32),
+            roots=ensemble.roots.astype(np.int32),
+            bin_edges=np.concatenate(edges) if edges else np.zeros(0),
+            bin_offsets=bin_offsets,
+            max_depth=ensemble.max_depth,
+            n_features=ensemble.n_features,
+            base_score=ensemble.base_score,
+            link=ensemble.link,
+            feature_names=ensemble.feature_names,
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.ARRAY_FIELDS)
+
+    def bin(self, X: np.ndarray) -> np.ndarray:
+        """Bin raw features into per-feature codes, shape (n_samples, n_features)"""
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+
+        codes = np.empty(X.shape, dtype=self.threshold_code.dtype)
+        for f in range(self.n_features):
+            edges = self.bin_edges[self.bin_offsets[f]:self.bin_offsets[f + 1]]
+            column = X[:, f]
+            codes[:, f] = np.searchsorted(edges, column, side='left')
+            missing = np.isnan(column)
+            if missing.any():
+                codes[missing, f] = self.missing_code
+        return codes
+
+    def _traverse(self, codes: np.ndarray) -> np.ndarray:
+        n_rows, n_cols = codes.shape
+        flat = np.ascontiguousarray(codes).reshape(-1)
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_cols)[:, None]
+        has_missing = (flat == self.missing_code).any()
+        nodes = np.repeat(self.roots[None, :], n_rows, axis=0)
+        for _ in range(self.max_depth):
+            code = flat.take(row_offsets + self.feature.take(nodes))
+            # The missing code is above every threshold code, so missing values go right here
+            go_left = code <= self.threshold_code.take(nodes)
+            if has_missing:
+                go_left |= (code == self.missing_code) & self.default_left.take(nodes)
+            nodes = np.where(go_left, self.left.take(nodes), self.right.take(nodes))
+        return nodes
+
+    def predict_binned(self, codes: np.ndarray) -> np.ndarray:
+        """Predict from codes produced by ``bin``"""
+        raw = np.empty(codes.shape[0], dtype=np.float64)
+        for start in range(0, codes.shape[0], BLOCK_ROWS):
+            block = codes[start:start + BLOCK_ROWS]
+            raw[start:start + len(block)] = self.value.take(self._traverse(block)).sum(axis=1, dtype=np.float64)
+        raw += self.base_score
+        if self.link == LINK_LOGISTIC:
+            return 1.0 / (1.0 + np.exp(-raw))
+        return raw
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Bin raw features and predict"""
+        return self.predict_binned(self.bin(X))
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            'max_depth': self.max_depth,
+            'n_features': self.n_features,
+            'base_score': self.base_score,
+            'link': self.link,
+            'feature_names': self.feature_names,
+        }
+
+    def save(self, path: str):
+        """Save the packed arrays to an uncompressed .npz file"""
+        arrays = {name: getattr(self, name) for name in self.ARRAY_FIELDS}
+        np.savez(path, meta=np.array(json.dumps(self.metadata())), **arrays)
+        logger.info(f"Quantized ensemble ({self.n_trees} trees, {self.nbytes} bytes) saved to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> 'QuantizedEnsemble':
+        """Load an ensemble written by save"""
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {name: data[name] for name in cls.ARRAY_FIELDS}
+        return cls(**arrays, **meta)
+
+
+def quantization_report(ensemble: TreeEnsemble, quantized: QuantizedEnsemble, X: np.ndarray,
+                        original_path: Optional[str] = None) -> Dict[str, float]:
+    """Compare a quantized ensemble against the original on sample inputs"""
+    expected = ensemble.predict(X)
+    error = np.abs(quantized.predict(X) - expected)
+    report = {
+        'compiled_bytes': ensemble.nbytes,
+        'quantized_bytes': quantized.nbytes,
+        'compression': ensemble.nbytes / max(quantized.nbytes, 1),
+        'max_abs_error': float(error.max()) if len(error) else 0.0,
+        'mean_abs_error': float(error.mean()) if len(error) else 0.0,
+        'code_bits': quantized.threshold_code.dtype.itemsize * 8,
+    }
+    if original_path is not None and os.path.exists(original_path):
+        report['original_file_bytes'] = os.path.getsize(original_path)
+    return report
@@ -0,0 +1,260 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILE = 'metadata.json'
+ROUTING_FILE = 'routing.json'
+VERSION_PREFIX = 'v'
+
+
+def _write_json_atomic(path: str, payload: Dict[str, Any]):
+    """Write JSON next to the target and rename it into place"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(payload, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def _version_number(version: str) -> Optional[int]:
+    """Number of a version id like 'v0042', None for other names"""
+    number = version[len(VERSION_PREFIX):]
+    return int(number) if version.startswith(VERSION_PREFIX) and number.isdigit() else None
+
+
+class ModelRegistry:
+    """Directory of versioned model artifacts.
+
+    Layout::
+
+        <root>/<model_name>/v0001/metadata.json
+        <root>/<model_name>/v0001/<artifact files>
+        <root>/<model_name>/routing.json
+
+    Versions are staged in a hidden directory and renamed into place, so a
+    reader never sees a half-written version. ``routing.json`` selects the
+    stable version, an optional canary with its traffic percentage, or a
+    pinned version that overrides both.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _model_dir(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def version_dir(self, name: str, version: str) -> str:
+        return os.path.join(self._model_dir(name), version)
+
+    def list_versions(self, name: str) -> List[str]:
+        """Published versions of a model, oldest first.
+
+        Versions sort by number, so v10000 comes after v9999 once the ids
+        outgrow their zero padding.
+        """
+        model_dir = self._model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted(
+            (entry for entry in os.listdir(model_dir)
+             if _version_number(entry) is not None
+             and os.path.isfile(os.path.join(model_dir, entry, METADATA_FILE))),
+            key=_version_number
+        )
+
+    def latest_version(self, name: str) -> Optional[str]:
+        versions = self.list_versions(name)
+        return versions[-1] if versions else None
+
+    def get_metadata(self, name: str, version: str) -> Dict[str, Any]:
+        with open(os.path.join(self.version_dir(name, version), METADATA_FILE)) as f:
+            return json.load(f)
+
+    def publish(self, name: str, source_dir: str, feature_schema: List[str],
+                metrics: Optional[Dict[str, float]] = None,
+                trained_at: Optional[datetime] = None,
+                extra: Optional[Dict[str, Any]] = None) -> str:
+        """Copy the artifacts in source_dir into a new version and return its id"""
+        model_dir = self._model_dir(name)
+        os.makedirs(model_dir, exist_ok=True)
+
+        staging = tempfile.mkdtemp(dir=model_dir, prefix='.staging-')
+        shutil.copytree(source_dir, staging, dirs_exist_ok=True)
+
+        while True:
+            latest = self.latest_version(name)
+            number = _version_number(latest) + 1 if latest else 1
+            version = f"{VERSION_PREFIX}{number:04d}"
+            metadata = {
+                'model_name': name,
+                'version': version,
+                'trained_at': (trained_at or datetime.now()).isoformat(),
+                'published_at': datetime.now().isoformat(),
+                'feature_schema': list(feature_schema),
+                'metrics': {key: float(value) for key, value in (metrics or {}).items()},
+            }
+            metadata.update(extra or {})
+            _write_json_atomic(os.path.join(staging, METADATA_FILE), metadata)
+            try:
+                os.rename(staging, self.version_dir(name, version))
+                break
+            except OSError:
+                # Another publisher claimed this version number first
+                if not os.path.exists(self.version_dir(name, version)):
+                    raise
+
+        logger.info(f"Published {name} {version} to {self.root}")
+        return version
+
+    def get_routing(self, name: str) -> Dict[str, Any]:
+        """Routing config, defaulting to the latest version with no canary"""
+        routing = {'stable': None, 'canary': None, 'canary_percent': 0.0, 'pinned': None}
+        path = os.path.join(self._model_dir(name), ROUTING_FILE)
+        if os.path.exists(path):
+            with open(path) as f:
+                routing.update(json.load(f))
+        if routing['stable'] is None:
+            routing['stable'] = self.latest_version(name)
+        return routing
+
+    def set_routing(self, name: str, stable: Optional[str] = None, canary: Optional[str] = None,
+                    canary_percent: float = 0.0, pinned: Optional[str] = None):
+        """Atomically replace the routing config for a model"""
+        if not 0.0 <= canary_percent <= 100.0:
+            raise ValueError("canary_percent must be between 0 and 100")
+        for version in (stable, canary, pinned):
+            if version is not None and version not in self.list_versions(name):
+                raise ValueError(f"Unknown version {version} for model {name}")
+        os.makedirs(self._model_dir(name), exist_ok=True)
+        _write_json_atomic(os.path.join(self._model_dir(name), ROUTING_FILE), {
+            'stable': stable,
+            'canary': canary,
+            'canary_percent': canary_percent,
+            'pinned': pinned,
+        })
+
+    def state_token(self, name: str) -> Tuple:
+        """Cheap fingerprint that changes whenever versions or routing change"""
+        path = os.path.join(self._model_dir(name), ROUTING_FILE)
+        routing_mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        return tuple(self.list_versions(name)), routing_mtime
+
+
+class _Deployment:
+    """Immutable snapshot of the loaded models; replaced wholesale on reload"""
+
+    def __init__(self, stable: Tuple[str, Any], canary: Optional[Tuple[str, Any]] = None,
+                 canary_percent: float = 0.0):
+        self.stable = stable
+        self.canary = canary
+        self.canary_percent = canary_percent
+
+
+class ServingModel:
+    """Registry-backed model handle for a serving process.
+
+    A background thread polls the registry and loads new versions off the
+    request path. The new deployment is swapped in with a single reference
+    assignment, so in-flight requests finish on the model they started with.
+    ``unloader`` is called with each version that stops being routed, e.g.
+    to release resources the loader shared with other processes.
+    """
+
+    def __init__(self, registry: ModelRegistry, name: str,
+                 loader: Callable[[str, Dict[str, Any]], Any], poll_interval: float = 5.0,
+                 unloader: Optional[Callable[[str], None]] = None):
+        self.registry = registry
+        self.name = name
+        self.loader = loader
+        self.unloader = unloader
+        self.poll_interval = poll_interval
+        self._deployment: Optional[_Deployment] = None
+        self._loaded: Dict[str, Any] = {}
+        self._token = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load(self, version: str) -> Any:
+        if version not in self._loaded:
+            version_dir = self.registry.version_dir(self.name, version)
+            metadata = self.registry.get_metadata(self.name, version)
+            self._loaded[version] = self.loader(version_dir, metadata)
+            logger.info(f"Loaded {self.name} {version}")
+        return self._loaded[version]
+
+    def refresh(self) -> bool:
+        """Reload if the registry changed; returns True when a new deployment was swapped in"""
+        token = self.registry.state_token(self.name)
+        if token == self._token:
+            return False
+
+        routing = self.registry.get_routing(self.name)
+        stable_version = routing['pinned'] or routing['stable']
+        if stable_version is None:
+            return False
+
+        stable = (stable_version, self._load(stable_version))
+        canary = None
+        if routing['canary'] and not routing['pinned'] and routing['canary_percent'] > 0:
+            canary = (routing['canary'], self._load(routing['canary']))
+
+        self._deployment = _Deployment(stable, canary, float(routing['canary_percent']))
+        self._token = token
+
+        # Drop versions that are no longer routed so their memory can be freed
+        active = {stable_version, canary[0] if canary else None}
+        dropped = [version for version in self._loaded if version not in active]
+        self._loaded = {version: model for version, model in self._loaded.items() if version in active}
+        for version in dropped:
+            if self.unloader is not None:
+                try:
+                    self.unloader(version)
+                except Exception as e:
+                    logger.error(f"Unloading {self.name} {version} failed: {e}")
+        return True
+
+    def select(self, routing_key: Optional[str] = None) -> Tuple[str, Any]:
+        """Return (version, model) for a request, sending a stable share of keys to the canary"""
+        deployment = self._deployment
+        if deployment is None:
+            raise RuntimeError(f"No version of {self.name} is loaded")
+        if deployment.canary is not None and routing_key is not None:
+            bucket = zlib.crc32(str(routing_key).encode('utf-8')) % 10000
+            if bucket < deployment.canary_percent * 100:
+                return deployment.canary
+        return deployment.stable
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._deployment is not None
+
+    def start(self) -> 'ServingModel':
+        """Load the current deployment and start watching for changes"""
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Initial load of {self.name} failed: {e}")
+        self._thread = threading.Thread(target=self._watch, name=f"registry-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the current deployment if a new version fails to load
+                logger.error(f"Reloading {self.name} failed: {e}")
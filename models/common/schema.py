@@ -0,0 +1,188 @@
+import logging
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CATEGORY = 'category'
+
+# Storage type of every known training column. Low-cardinality strings are
+# categoricals, counts and small codes are the narrowest integer that holds
+# them and every other numeric is float32. Integer columns that turn out to
+# have missing or fractional values are stored as float32 instead.
+COLUMN_TYPES: Dict[str, str] = {
+    # Categoricals
+    'region': CATEGORY,
+    'user_region': CATEGORY,
+    'device': CATEGORY,
+    'user_device': CATEGORY,
+    'gender': CATEGORY,
+    'status': CATEGORY,
+    'content_type': CATEGORY,
+    'ad_content_type': CATEGORY,
+    'content_topic': CATEGORY,
+    'topic': CATEGORY,
+    'feed_type': CATEGORY,
+    'interaction_type': CATEGORY,
+    'moderation_status': CATEGORY,
+    'political_leaning': CATEGORY,
+
+    # Users
+    'age': 'int8',
+    'user_age': 'int8',
+    'weight': 'int16',
+    'persona_id': 'int16',
+    'satisfaction_score': 'float32',
+    'user_satisfaction': 'float32',
+    'follower_count': 'int32',
+    'following_count': 'int32',
+    'user_follower_count': 'int32',
+    'user_following_count': 'int32',
+    'engagement_rate': 'float32',
+    'user_engagement_rate': 'float32',
+    'network_density': 'float32',
+    'user_network_density': 'float32',
+    'influence_score': 'float32',
+    'user_influence_score': 'float32',
+
+    # Content and engagement
+    'likes': 'int32',
+    'comments': 'int32',
+    'shares': 'int32',
+    'bookmarks': 'int32',
+    'content_likes': 'int32',
+    'content_comments': 'int32',
+    'content_shares': 'int32',
+    'content_bookmarks': 'int32',
+    'reply_count': 'int32',
+    'retweet_count': 'int32',
+    'quote_count': 'int32',
+    'duration_seconds': 'int32',
+    'completion_rate': 'float32',
+    'watch_time_seconds': 'int32',
+    'report_count': 'int32',
+    'content_report_count': 'int32',
+    'flag_score': 'float32',
+    'content_flag_score': 'float32',
+    'has_active_flags': 'int8',
+    'content_engagement_rate': 'float32',
+
+    # Interactions, feed and sessions
+    'time_spent_seconds': 'int32',
+    'scroll_position': 'int32',
+    'position': 'int16',
+    'feed_position': 'int16',
+    'session_length_seconds': 'int32',
+    'avg_scroll_depth': 'float32',
+    'avg_watch_time': 'float32',
+
+    # Ads
+    'ad_category': 'int16',
+    'budget': 'float32',
+    'ad_budget': 'float32',
+    'predicted_ctr': 'float32',
+    'actual_click': 'int8',
+
+    # Time features
+    'hour': 'int8',
+    'day': 'int8',
+    'month': 'int8',
+    'year': 'int16',
+    'dayofweek': 'int8',
+    'is_weekend': 'int8',
+    'hour_of_day': 'int8',
+    'day_of_week': 'int8',
+
+    # FeatureEngineer outputs
+    'user_region_encoded': 'int32',
+    'user_device_encoded': 'int32',
+    'content_type_encoded': 'int32',
+    'content_topic_encoded': 'int32',
+    'user_engagement_score': 'float32',
+    'content_engagement_score': 'float32',
+    'user_satisfaction_score': 'float32',
+    'content_quality_score': 'float32',
+    'user_interest_score': 'float32',
+    'content_diversity_score': 'float32'
+}
+CATEGORICAL_COLUMNS = [col for col, dtype in COLUMN_TYPES.items() if dtype == CATEGORY]
+INTEGER_TYPES = ['int8', 'int16', 'int32', 'int64']
+
+
+def integer_type(dtype: str, low, high) -> str:
+    """``dtype``, or the narrowest wider integer type that holds ``low``..``high``"""
+    candidates = INTEGER_TYPES[INTEGER_TYPES.index(dtype):] if dtype in INTEGER_TYPES else [dtype]
+    for candidate in candidates:
+        info = np.iinfo(candidate)
+        if info.min <= low and high <= info.max:
+            return candidate
+    return candidates[-1]
+
+
+def _storage_type(column: pd.Series, dtype: str):
+    """The schema type, float32 for an integer column with missing or fractional
+    values, or a wider integer type when the values do not fit"""
+    if dtype == CATEGORY or not np.issubdtype(np.dtype(dtype), np.integer):
+        return dtype
+    if column.isna().any():
+        return 'float32'
+    if column.dtype.kind == 'f' and (column.to_numpy() % 1 != 0).any():
+        return 'float32'
+    if column.dtype.kind in 'iuf' and len(column):
+        storage = integer_type(dtype, column.min(), column.max())
+        if storage != dtype:
+            logger.warning(f"{column.name} values [{column.min()}, {column.max()}] do not fit {dtype}, "
+                           f"storing as {storage}")
+        return storage
+    return dtype
+
+
+def enforce_schema(data: pd.DataFrame, schema: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Cast every schema column present in ``data`` in place and return it"""
+    schema = COLUMN_TYPES if schema is None else schema
+    for col in data.columns.intersection(list(schema)):
+        dtype = _storage_type(data[col], schema[col])
+        if data[col].dtype == dtype:
+            continue
+        if isinstance(data[col].dtype, pd.CategoricalDtype) and dtype != CATEGORY:
+            data[col] = data[col].astype(object)
+        data[col] = data[col].astype(dtype)
+    return data
+
+
+def schema_dtypes(columns: Iterable[str], schema: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Schema types of the given columns, e.g. as a dtype map for a reader"""
+    schema = COLUMN_TYPES if schema is None else schema
+    return {col: schema[col] for col in columns if col in schema}
+
+
+def memory_report(data: pd.DataFrame, rows: Optional[int] = None,
+                  schema: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Deep memory per column before and after enforcing the schema.
+
+    Byte counts are measured on ``data`` and scaled to ``rows`` if given,
+    so a sample can stand in for a full training frame. The last row holds
+    the totals.
+    """
+    scale = (rows / len(data)) if rows is not None and len(data) else 1.0
+    before = data.memory_usage(index=False, deep=True)
+    after_frame = enforce_schema(data.copy(), schema)
+    after = after_frame.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({
+        'column': data.columns,
+        'dtype_before': [str(dtype) for dtype in data.dtypes],
+        'dtype_after': [str(dtype) for dtype in after_frame.dtypes],
+        'bytes_before': (before.to_numpy() * scale).astype(np.int64),
+        'bytes_after': (after.to_numpy() * scale).astype(np.int64)
+    })
+    total = {
+        'column': 'total', 'dtype_before': '', 'dtype_after': '',
+        'bytes_before': int(report['bytes_before'].sum()), 'bytes_after': int(report['bytes_after'].sum())
+    }
+    report = pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+    report['reduction'] = 1 - report['bytes_after'] / report['bytes_before'].where(report['bytes_before'] > 0)
+    logger.info(f"Schema memory for {rows if rows is not None else len(data)} rows: "
+                f"{total['bytes_before'] / 2**20:.1f} MiB -> {total['bytes_after'] / 2**20:.1f} MiB")
+    return report
@@ -0,0 +1,166 @@
+import fcntl
+import json
+import logging
+import os
+import struct
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Tuple, Union
+
+import numpy as np
+
+from .quantize import QuantizedEnsemble
+from .tree_ensemble import TreeEnsemble
+
+logger = logging.getLogger(__name__)
+
+# Ensemble classes that can be shared, keyed by the 'kind' stored in the header
+ENSEMBLE_KINDS = {
+    'tree': TreeEnsemble,
+    'quantized': QuantizedEnsemble,
+}
+Ensemble = Union[TreeEnsemble, QuantizedEnsemble]
+
+MAGIC = b'SMWT'
+ALIGNMENT = 64
+_PREFIX = struct.Struct('<4sI')
+
+# tmpfs keeps the weights in RAM; every worker maps the same physical pages
+SHARED_DIR = os.getenv('MODEL_SHM_DIR', '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir())
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_shared_arrays(path: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+    """Pack arrays into one file: magic, header length, JSON layout header, aligned blobs.
+
+    The file is written beside the target and renamed into place so workers
+    never map a partially written file.
+    """
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        offset = _align(offset)
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    header = json.dumps({'meta': meta, 'arrays': layout}).encode('utf-8')
+    data_start = _align(_PREFIX.size + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote {len(arrays)} shared arrays to {path}")
+
+
+def map_shared_arrays(path: str) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Map a packed weights file read-only and return (meta, arrays)"""
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    magic, header_len = _PREFIX.unpack(bytes(buffer[:_PREFIX.size]))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a shared weights file")
+    header = json.loads(bytes(buffer[_PREFIX.size:_PREFIX.size + header_len]).decode('utf-8'))
+    data_start = _align(_PREFIX.size + header_len)
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        start = data_start + spec['offset']
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+    return header['meta'], arrays
+
+
+def publish_ensemble(ensemble: Ensemble, path: str, source: str = None):
+    """Write a compiled or quantized ensemble to a shared weights file"""
+    meta = ensemble.metadata()
+    meta['kind'] = next(kind for kind, cls in ENSEMBLE_KINDS.items() if isinstance(ensemble, cls))
+    if source is not None:
+        meta['source'] = os.path.abspath(source)
+        meta['source_mtime_ns'] = os.stat(source).st_mtime_ns
+    write_shared_arrays(path, {name: getattr(ensemble, name) for name in ensemble.ARRAY_FIELDS}, meta)
+
+
+def attach_ensemble(path: str) -> Ensemble:
+    """Build an ensemble whose arrays are read-only views of a shared weights file"""
+    meta, arrays = map_shared_arrays(path)
+    cls = ENSEMBLE_KINDS[meta.get('kind', 'tree')]
+    meta = {key: value for key, value in meta.items() if key not in ('source', 'source_mtime_ns', 'kind')}
+    return cls(**arrays, **meta)
+
+
+def _is_current(path: str, source: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    try:
+        meta, _ = map_shared_arrays(path)
+    except (ValueError, OSError):
+        return False
+    return meta.get('source_mtime_ns') == os.stat(source).st_mtime_ns
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Hold an exclusive lock on ``path.lock``; yields the lock file's path.
+
+    A lock file may be unlinked by its holder (see release_shared), so after
+    taking the lock it is checked to still be the file at that path, and
+    taken again on a new file otherwise.
+    """
+    lock_path = path + '.lock'
+    while True:
+        lock = open(lock_path, 'w')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if os.path.samestat(os.fstat(lock.fileno()), os.stat(lock_path)):
+                break
+        except FileNotFoundError:
+            pass
+        lock.close()
+    try:
+        yield lock_path
+    finally:
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        lock.close()
+
+
+def attach_or_publish(name: str, source: str, loader: Callable[[str], Ensemble],
+                      shared_dir: str = SHARED_DIR) -> Ensemble:
+    """Map the shared copy of a model, publishing it first if it is missing or stale.
+
+    Call this in a pre-fork parent (e.g. a gunicorn ``on_starting`` hook) to
+    load once before workers exist; when workers start independently the
+    first one to take the lock publishes and the rest attach.
+    """
+    path = os.path.join(shared_dir, f"{name}.weights")
+    with _file_lock(path):
+        if not _is_current(path, source):
+            publish_ensemble(loader(source), path, source=source)
+    return attach_ensemble(path)
+
+
+def release_shared(name: str, shared_dir: str = SHARED_DIR) -> bool:
+    """Unlink a model's shared weights file; returns False if there was none.
+
+    Processes that still map it keep their pages, and tmpfs frees the memory
+    once the last of them drops its mapping. The lock file is removed too.
+    A process that later asks for the same model publishes it again.
+    """
+    path = os.path.join(shared_dir, f"{name}.weights")
+    with _file_lock(path) as lock_path:
+        # Unlinked while held, so waiting processes lock a new file instead
+        os.remove(lock_path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+    logger.info(f"Released shared weights {path}")
+    return True
@@ -0,0 +1,85 @@
+"""
+Time features from int64 epoch seconds.
+
+Timestamps are reduced once to wall-clock seconds since 1970-01-01 (missing
+values become ``NAT``), and every feature is integer arithmetic on those
+seconds, so a batch and a single serving row go through the same code.
+Timezone-aware values keep the wall time of their own zone rather than
+being converted to UTC or to the server's zone, so an event at 09:00+02:00
+has hour 9. Ages are measured against a reference time fixed by the caller
+for the whole batch. Features of missing timestamps are NaN.
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# numpy's NaT viewed as int64
+NAT = np.iinfo(np.int64).min
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+# Days from 0000-03-01 to 1970-01-01 in the proleptic Gregorian calendar
+EPOCH_SHIFT_DAYS = 719468
+DAYS_PER_ERA = 146097
+
+
+def epoch_seconds(values) -> np.ndarray:
+    """Wall-clock seconds since the epoch as int64, ``NAT`` where missing.
+
+    Accepts a datetime, a datetime64 array or a pandas datetime column;
+    timezone-aware values keep the wall time of their own zone.
+    """
+    if isinstance(values, datetime) and values.tzinfo is not None:
+        values = values.replace(tzinfo=None)
+    elif isinstance(getattr(values, 'dtype', None), pd.DatetimeTZDtype):
+        values = pd.DatetimeIndex(values).tz_localize(None)
+    return np.asarray(values, dtype='datetime64[s]').view(np.int64)
+
+
+def reference_time(now: Optional[datetime] = None) -> int:
+    """Epoch seconds of ``now`` (local wall clock if not given), fixed for a batch"""
+    return int(epoch_seconds(now or datetime.now()))
+
+
+def _with_missing(values: np.ndarray, seconds: np.ndarray) -> np.ndarray:
+    missing = seconds == NAT
+    return np.where(missing, np.nan, values) if missing.any() else values
+
+
+def hour_of_day(seconds: np.ndarray) -> np.ndarray:
+    seconds = np.asarray(seconds, dtype=np.int64)
+    return _with_missing(seconds // SECONDS_PER_HOUR % 24, seconds)
+
+
+def day_of_week(seconds: np.ndarray) -> np.ndarray:
+    """Monday is 0; 1970-01-01 was a Thursday"""
+    seconds = np.asarray(seconds, dtype=np.int64)
+    return _with_missing((seconds // SECONDS_PER_DAY + 3) % 7, seconds)
+
+
+def is_weekend(seconds: np.ndarray) -> np.ndarray:
+    """1 on Saturday and Sunday, 0 otherwise and for missing timestamps"""
+    seconds = np.asarray(seconds, dtype=np.int64)
+    return (((seconds // SECONDS_PER_DAY + 3) % 7 >= 5) & (seconds != NAT)).astype(np.int8)
+
+
+def civil_date(seconds: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Year, month and day, counting years from March so leap days fall last"""
+    seconds = np.asarray(seconds, dtype=np.int64)
+    days = seconds // SECONDS_PER_DAY + EPOCH_SHIFT_DAYS
+    era = days // DAYS_PER_ERA
+    day_of_era = days - era * DAYS_PER_ERA
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    month_index = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month_index + 2) // 5 + 1
+    month = np.where(month_index < 10, month_index + 3, month_index - 9)
+    year = year_of_era + era * 400 + (month <= 2)
+    return (_with_missing(year, seconds), _with_missing(month, seconds), _with_missing(day, seconds))
+
+
+def age_hours(seconds: np.ndarray, reference: int) -> np.ndarray:
+    """Hours from each timestamp to the reference time"""
+    seconds = np.asarray(seconds, dtype=np.int64)
+    return _with_missing((reference - seconds.astype(np.float64)) / SECONDS_PER_HOUR, seconds)
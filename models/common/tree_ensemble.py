@@ -0,0 +1,355 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LINK_IDENTITY = 'identity'
+LINK_LOGISTIC = 'logistic'
+
+# Rows evaluated per traversal block; keeps the (rows, trees) node matrix in cache
+BLOCK_ROWS = 4096
+
+
+class TreeEnsemble:
+    """Tree ensemble packed into flat node arrays.
+
+    All trees share one set of node arrays; ``roots`` holds the index of each
+    tree's root node. Leaves point back to themselves, so every sample can be
+    advanced for exactly ``max_depth`` levels without checking for leaves.
+    Leaf values are pre-scaled (learning rate, averaging) so the raw score is
+    always ``base_score + sum(leaf values)``.
+    """
+
+    ARRAY_FIELDS = ('feature', 'threshold', 'left', 'right', 'default_left', 'value', 'roots')
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, default_left: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, max_depth: int, n_features: int,
+                 base_score: float = 0.0, link: str = LINK_IDENTITY,
+                 input_dtype: str = 'float64', feature_names: Optional[List[str]] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.base_score = float(base_score)
+        self.link = link
+        self.input_dtype = input_dtype
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.ARRAY_FIELDS)
+
+    def _check_input(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=self.input_dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        return X
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Return the leaf node index reached in every tree, shape (n_samples, n_trees)"""
+        X = self._check_input(X)
+        leaves = np.empty((X.shape[0], self.n_trees), dtype=np.int32)
+        for start in range(0, X.shape[0], BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            leaves[start:start + len(block)] = self._traverse(block)
+        return leaves
+
+    def _traverse(self, X: np.ndarray) -> np.ndarray:
+        # Every sample starts at every root and moves down one level per step;
+        # features are gathered from the flattened block with np.take, which
+        # is much cheaper than 2-D fancy indexing
+        n_rows, n_cols = X.shape
+        flat = np.ascontiguousarray(X).reshape(-1)
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_cols)[:, None]
+        has_missing = np.isnan(flat).any()
+        nodes = np.repeat(self.roots[None, :], n_rows, axis=0)
+        for _ in range(self.max_depth):
+            x = flat.take(row_offsets + self.feature.take(nodes))
+            go_left = x <= self.threshold.take(nodes)
+            if has_missing:
+                go_left |= np.isnan(x) & self.default_left.take(nodes)
+            nodes = np.where(go_left, self.left.take(nodes), self.right.take(nodes))
+        return nodes
+
+    def predict_raw(self, X: np.ndarray) -> np.ndarray:
+        """Sum of leaf values plus the base score, before the link function"""
+        X = self._check_input(X)
+        raw = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            raw[start:start + len(block)] = self.value.take(self._traverse(block)).sum(axis=1)
+        raw += self.base_score
+        return raw
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict regression values or positive-class probabilities"""
+        raw = self.predict_raw(X)
+        if self.link == LINK_LOGISTIC:
+            return 1.0 / (1.0 + np.exp(-raw))
+        return raw
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            'max_depth': self.max_depth,
+            'n_features': self.n_features,
+            'base_score': self.base_score,
+            'link': self.link,
+            'input_dtype': self.input_dtype,
+            'feature_names': self.feature_names,
+        }
+
+    def save(self, path: str):
+        """Save the packed arrays to an uncompressed .npz file"""
+        arrays = {name: getattr(self, name) for name in self.ARRAY_FIELDS}
+        np.savez(path, meta=np.array(json.dumps(self.metadata())), **arrays)
+        logger.info(f"Compiled ensemble ({self.n_trees} trees, {self.nbytes} bytes) saved to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> 'TreeEnsemble':
+        """Load an ensemble written by save"""
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {name: data[name] for name in cls.ARRAY_FIELDS}
+        return cls(**arrays, **meta)
+
+
+def _pack(trees: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Concatenate per-tree node arrays, offsetting child indices"""
+    offsets = np.cumsum([0] + [len(tree['feature']) for tree in trees[:-1]])
+    return {
+        'feature': np.concatenate([tree['feature'] for tree in trees]).astype(np.int32),
+        'threshold': np.concatenate([tree['threshold'] for tree in trees]).astype(np.float64),
+        'left': np.concatenate([tree['left'] + off for tree, off in zip(trees, offsets)]).astype(np.int32),
+        'right': np.concatenate([tree['right'] + off for tree, off in zip(trees, offsets)]).astype(np.int32),
+        'default_left': np.concatenate([tree['default_left'] for tree in trees]).astype(bool),
+        'value': np.concatenate([tree['value'] for tree in trees]).astype(np.float64),
+        'roots': offsets.astype(np.int32),
+    }
+
+
+def _sklearn_tree_nodes(tree, leaf_values: np.ndarray) -> Dict[str, np.ndarray]:
+    """Convert a fitted sklearn ``Tree`` into self-looping node arrays"""
+    node_ids = np.arange(tree.node_count)
+    is_leaf = tree.children_left == -1
+    missing_left = getattr(tree, 'missing_go_to_left', None)
+    return {
+        'feature': np.where(is_leaf, 0, tree.feature),
+        'threshold': np.where(is_leaf, np.inf, tree.threshold),
+        'left': np.where(is_leaf, node_ids, tree.children_left),
+        'right': np.where(is_leaf, node_ids, tree.children_right),
+        'default_left': np.zeros(tree.node_count, dtype=bool) if missing_left is None else missing_left.astype(bool),
+        'value': np.where(is_leaf, leaf_values, 0.0),
+    }
+
+
+def _compile_sklearn_gradient_boosting(model) -> TreeEnsemble:
+    if model.estimators_.shape[1] != 1:
+        raise ValueError("Only binary classification and regression ensembles can be compiled")
+
+    trees = [
+        _sklearn_tree_nodes(est.tree_, est.tree_.value[:, 0, 0] * model.learning_rate)
+        for est in model.estimators_[:, 0]
+    ]
+    base_score = float(model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0, 0])
+
+    link = LINK_IDENTITY
+    if hasattr(model, 'classes_'):
+        link = LINK_LOGISTIC
+        if getattr(model, 'loss', None) == 'exponential':
+            # Exponential loss maps raw scores through sigmoid(2 * raw)
+            trees = [dict(tree, value=tree['value'] * 2.0) for tree in trees]
+            base_score *= 2.0
+
+    return TreeEnsemble(
+        **_pack(trees),
+        max_depth=max(est.tree_.max_depth for est in model.estimators_[:, 0]),
+        n_features=model.n_features_in_,
+        base_score=base_score,
+        link=link,
+        input_dtype='float32',
+        feature_names=getattr(model, 'feature_names_in_', None),
+    )
+
+
+def _compile_sklearn_hist_gradient_boosting(model) -> TreeEnsemble:
+    if any(len(predictors) != 1 for predictors in model._predictors):
+        raise ValueError("Only binary classification and regression ensembles can be compiled")
+
+    is_classifier = hasattr(model, 'classes_')
+    if not is_classifier and model.loss not in ('squared_error', 'absolute_error', 'quantile'):
+        raise ValueError(f"HistGradientBoosting loss {model.loss!r} is not supported")
+
+    trees = []
+    for (predictor,) in model._predictors:
+        nodes = predictor.nodes
+        if nodes['is_categorical'].any():
+            raise ValueError("Categorical HistGradientBoosting splits are not supported")
+        node_ids = np.arange(len(nodes))
+        is_leaf = nodes['is_leaf'].astype(bool)
+        trees.append({
+            'feature': np.where(is_leaf, 0, nodes['feature_idx']),
+            'threshold': np.where(is_leaf, np.inf, nodes['num_threshold']),
+            'left': np.where(is_leaf, node_ids, nodes['left']),
+            'right': np.where(is_leaf, node_ids, nodes['right']),
+            'default_left': nodes['missing_go_to_left'].astype(bool),
+            # Leaf values already include the learning rate
+            'value': np.where(is_leaf, nodes['value'], 0.0),
+        })
+
+    return TreeEnsemble(
+        **_pack(trees),
+        max_depth=max(int(predictor.nodes['depth'].max()) for (predictor,) in model._predictors),
+        n_features=model.n_features_in_,
+        base_score=float(np.ravel(model._baseline_prediction)[0]),
+        link=LINK_LOGISTIC if is_classifier else LINK_IDENTITY,
+        input_dtype='float64',
+        feature_names=getattr(model, 'feature_names_in_', None),
+    )
+
+
+def _compile_sklearn_forest(model) -> TreeEnsemble:
+    n_trees = len(model.estimators_)
+    is_classifier = hasattr(model, 'classes_')
+    if is_classifier and len(model.classes_) != 2:
+        raise ValueError("Only binary classification and regression ensembles can be compiled")
+
+    trees = []
+    for est in model.estimators_:
+        values = est.tree_.value[:, 0, :]
+        if is_classifier:
+            # Class counts or fractions depending on sklearn version; normalise either way
+            leaf_values = values[:, 1] / np.maximum(values.sum(axis=1), 1e-12)
+        else:
+            leaf_values = values[:, 0]
+        trees.append(_sklearn_tree_nodes(est.tree_, leaf_values / n_trees))
+
+    return TreeEnsemble(
+        **_pack(trees),
+        max_depth=max(est.tree_.max_depth for est in model.estimators_),
+        n_features=model.n_features_in_,
+        link=LINK_IDENTITY,
+        input_dtype='float32',
+        feature_names=getattr(model, 'feature_names_in_', None),
+    )
+
+
+def _lightgbm_tree_nodes(structure: Dict[str, Any], scale: float) -> Dict[str, np.ndarray]:
+    """Flatten one LightGBM ``tree_structure`` dict into self-looping node arrays"""
+    feature, threshold, left, right, default_left, value = [], [], [], [], [], []
+
+    def new_node() -> int:
+        for column in (feature, threshold, left, right, default_left, value):
+            column.append(0)
+        return len(feature) - 1
+
+    stack = [(structure, new_node())]
+    while stack:
+        node, idx = stack.pop()
+        if 'leaf_value' in node:
+            feature[idx], threshold[idx] = 0, np.inf
+            left[idx] = right[idx] = idx
+            value[idx] = node['leaf_value'] * scale
+            continue
+
+        if node['decision_type'] != '<=':
+            raise ValueError("Categorical LightGBM splits are not supported")
+        if node['missing_type'] == 'Zero':
+            raise ValueError("zero_as_missing LightGBM splits are not supported")
+
+        feature[idx] = node['split_feature']
+        threshold[idx] = node['threshold']
+        if node['missing_type'] == 'NaN':
+            default_left[idx] = bool(node['default_left'])
+        else:
+            # Without a missing type LightGBM evaluates NaN as 0.0
+            default_left[idx] = 0.0 <= node['threshold']
+
+        left[idx], right[idx] = new_node(), new_node()
+        stack.append((node['left_child'], left[idx]))
+        stack.append((node['right_child'], right[idx]))
+
+    return {
+        'feature': np.array(feature),
+        'threshold': np.array(threshold, dtype=np.float64),
+        'left': np.array(left),
+        'right': np.array(right),
+        'default_left': np.array(default_left, dtype=bool),
+        'value': np.array(value, dtype=np.float64),
+    }
+
+
+def _compile_lightgbm(booster) -> TreeEnsemble:
+    dump = booster.dump_model()
+    if dump.get('num_tree_per_iteration', 1) != 1:
+        raise ValueError("Only binary classification and regression ensembles can be compiled")
+
+    tree_info = dump['tree_info']
+    scale = 1.0 / len(tree_info) if dump.get('average_output') else 1.0
+
+    objective = dump.get('objective', '')
+    link = LINK_IDENTITY
+    if objective.startswith(('binary', 'cross_entropy')):
+        link = LINK_LOGISTIC
+        for token in objective.split():
+            if token.startswith('sigmoid:'):
+                # Fold the sigmoid slope into the leaves so the link stays a plain logistic
+                scale *= float(token.split(':')[1])
+
+    trees = [_lightgbm_tree_nodes(info['tree_structure'], scale) for info in tree_info]
+    return TreeEnsemble(
+        **_pack(trees),
+        max_depth=max(_lightgbm_depth(info['tree_structure']) for info in tree_info),
+        n_features=dump['max_feature_idx'] + 1,
+        link=link,
+        input_dtype='float64',
+        feature_names=dump.get('feature_names'),
+    )
+
+
+def _lightgbm_depth(node: Dict[str, Any]) -> int:
+    if 'leaf_value' in node:
+        return 0
+    return 1 + max(_lightgbm_depth(node['left_child']), _lightgbm_depth(node['right_child']))
+
+
+def compile_ensemble(model) -> TreeEnsemble:
+    """Compile a fitted tree ensemble into a TreeEnsemble.
+
+    Supports sklearn GradientBoosting, HistGradientBoosting and
+    RandomForest/ExtraTrees estimators, LightGBM sklearn-API models and raw
+    LightGBM Boosters.
+    """
+    if hasattr(model, 'booster_'):
+        return _compile_lightgbm(model.booster_)
+    if hasattr(model, 'dump_model'):
+        return _compile_lightgbm(model)
+
+    from sklearn import ensemble
+    if isinstance(model, (ensemble.GradientBoostingClassifier, ensemble.GradientBoostingRegressor)):
+        return _compile_sklearn_gradient_boosting(model)
+    if isinstance(model, (ensemble.HistGradientBoostingClassifier, ensemble.HistGradientBoostingRegressor)):
+        return _compile_sklearn_hist_gradient_boosting(model)
+    if isinstance(model, (ensemble.RandomForestClassifier, ensemble.RandomForestRegressor,
+                          ensemble.ExtraTreesClassifier, ensemble.ExtraTreesRegressor)):
+        return _compile_sklearn_forest(model)
+
+    raise TypeError(f"Cannot compile model of type {type(model).__name__}")
@@ -1,22 +1,32 @@
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import GradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler
-import joblib
 import logging
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Optional
+
+from backends import DEFAULT_BACKEND, build_estimator, extend_estimator, feature_importances, thread_limit
+from common.affine import AffineTransform
+from common.artifact import load_model_artifact, restore_scaler, save_model_artifact
+from common.quantize import QuantizedEnsemble, quantization_report
+from common.tree_ensemble import compile_ensemble
 
 logger = logging.getLogger(__name__)
 
 class CTRModel:
-    def __init__(self):
-        self.model = GradientBoostingClassifier(
-            n_estimators=100,
-            learning_rate=0.1,
-            max_depth=3,
-            random_state=42
+    def __init__(self, backend: str = DEFAULT_BACKEND, n_jobs: Optional[int] = None):
+        self.backend = backend
+        self.n_jobs = n_jobs
+        self.model = build_estimator(
+            backend, 'classification', 'boosting',
+            params=dict(n_estimators=100, learning_rate=0.1, max_depth=3, random_state=42),
+            n_jobs=n_jobs
         )
         self.scaler = StandardScaler()
+        self.transform = None
+        self.compiled = None
+        # Latest timestamp the model has been trained on; update() fits only newer rows
+        self.timestamp_column = 'timestamp'
+        self.watermark = None
         self.feature_columns = [
             'user_age',
             'user_region_encoded',
@@ -30,43 +40,96 @@ class CTRModel:
             'content_engagement_score'
         ]
         
-    def _prepare_features(self, data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
-        """Prepare features for training or prediction"""
+    def _prepare_features(self, data: pd.DataFrame, fit: bool = False) -> np.ndarray:
+        """Prepare features for training (fit=True) or prediction"""
         # Ensure all required features are present
         missing_cols = set(self.feature_columns) - set(data.columns)
         if missing_cols:
             raise ValueError(f"Missing required features: {missing_cols}")
             
-        # Extract features
-        X = data[self.feature_columns].values
+        # Extract features into a fresh float32 matrix
+        X = data[self.feature_columns].to_numpy(dtype=np.float32, copy=True)
         
-        # Scale features
-        X = self.scaler.fit_transform(X)
+        # Fit the scaler only when training; prediction reuses its coefficients
+        if fit:
+            self.scaler.fit(X)
+            self.transform = AffineTransform.from_scaler(self.scaler)
+        elif self.transform is None:
+            raise ValueError("Model has not been trained or loaded")
         
-        return X
+        # Scale features in place
+        return self.transform.transform(X, out=X)
         
     def train(self, data: pd.DataFrame):
         """Train the CTR prediction model"""
         logger.info("Training CTR model...")
         
         # Prepare features
-        X = self._prepare_features(data)
+        X = self._prepare_features(data, fit=True)
         y = data['click'].values
         
         # Train model
-        self.model.fit(X, y)
+        with thread_limit(self.backend, self.n_jobs):
+            self.model.fit(X, y)
+        self.watermark = self._latest_timestamp(data)
+        self.compile()
         
         logger.info("CTR model training completed")
         
+    def update(self, new_data: pd.DataFrame, n_estimators: int = 10) -> int:
+        """Add trees fitted on rows newer than the watermark, keeping the existing scaler.
+
+        Returns the number of rows used; the model is unchanged when there are none.
+        """
+        if self.transform is None:
+            raise ValueError("Model has not been trained or loaded")
+        if not hasattr(self.model, 'n_features_in_'):
+            raise ValueError("Updating needs the fitted estimator; load the model with load_estimator=True")
+        
+        # Keep only rows since the last training run
+        if self.watermark is not None and self.timestamp_column in new_data.columns:
+            new_data = new_data[pd.to_datetime(new_data[self.timestamp_column]) > self.watermark]
+        if new_data.empty:
+            logger.info("No new rows since the last training run")
+            return 0
+        
+        logger.info(f"Updating CTR model with {len(new_data)} new rows...")
+        X = self._prepare_features(new_data)
+        y = new_data['click'].values
+        
+        with thread_limit(self.backend, self.n_jobs):
+            self.model = extend_estimator(self.backend, self.model, X, y, n_estimators)
+        latest = self._latest_timestamp(new_data)
+        if latest is not None:
+            self.watermark = latest
+        self.compile()
+        
+        return len(new_data)
+        
+    def _latest_timestamp(self, data: pd.DataFrame):
+        if self.timestamp_column not in data.columns or data.empty:
+            return None
+        return pd.to_datetime(data[self.timestamp_column]).max()
+        
     def predict(self, data: pd.DataFrame) -> np.ndarray:
         """Make CTR predictions"""
         # Prepare features
         X = self._prepare_features(data)
         
         # Make predictions
-        predictions = self.model.predict_proba(X)[:, 1]
+        return self._score(X)
+        
+    def predict_matrix(self, X: np.ndarray) -> np.ndarray:
+        """Score a float32 matrix whose columns follow feature_columns; X is scaled in place"""
+        if self.transform is None:
+            raise ValueError("Model has not been trained or loaded")
+        return self._score(self.transform.transform(X, out=X))
         
-        return predictions
+    def _score(self, X: np.ndarray) -> np.ndarray:
+        """Score an already scaled feature matrix"""
+        if self.compiled is not None:
+            return self.compiled.predict(X)
+        return self.model.predict_proba(X)[:, 1]
         
     def evaluate(self, data: pd.DataFrame) -> Dict[str, float]:
         """Evaluate model performance"""
@@ -85,26 +148,56 @@ class CTRModel:
         return metrics
         
     def save(self, path: str):
-        """Save model to disk"""
-        model_data = {
-            'model': self.model,
-            'scaler': self.scaler,
-            'feature_columns': self.feature_columns
+        """Save the model as an artifact directory (manifest plus .npy arrays)"""
+        if self.compiled is None:
+            self.compile()
+        meta = {
+            'model': type(self).__name__,
+            'feature_columns': self.feature_columns,
+            'backend': self.backend,
+            'watermark': self.watermark
         }
-        joblib.dump(model_data, path)
+        save_model_artifact(path, meta, self.transform, self.compiled, scaler=self.scaler, estimator=self.model)
         logger.info(f"Model saved to {path}")
         
-    def load(self, path: str):
-        """Load model from disk"""
-        model_data = joblib.load(path)
-        self.model = model_data['model']
-        self.scaler = model_data['scaler']
-        self.feature_columns = model_data['feature_columns']
+    def load(self, path: str, load_estimator: bool = False):
+        """Load a model artifact; the estimator is only needed to keep training or for importances"""
+        artifact = load_model_artifact(path, load_estimator=load_estimator)
+        meta = artifact['meta']
+        self.feature_columns = meta['feature_columns']
+        self.backend = meta.get('backend', 'sklearn')
+        self.watermark = pd.Timestamp(meta['watermark']) if meta.get('watermark') else None
+        self.transform = artifact['transform']
+        self.compiled = artifact['ensemble']
+        restore_scaler(self.scaler, artifact['arrays'])
+        if artifact['estimator'] is not None:
+            self.model = artifact['estimator']
         logger.info(f"Model loaded from {path}")
         
+    def compile(self):
+        """Compile the fitted model into flat arrays for fast batch inference"""
+        self.compiled = compile_ensemble(self.model)
+        return self.compiled
+        
+    def export_compiled(self, path: str):
+        """Save the compiled tree arrays to disk"""
+        if self.compiled is None:
+            self.compile()
+        self.compiled.save(path)
+        
+    def export_quantized(self, path: str, data: pd.DataFrame) -> Dict[str, float]:
+        """Save a quantized copy of the compiled trees and report its error on ``data``"""
+        if self.compiled is None:
+            self.compile()
+        quantized = QuantizedEnsemble.from_ensemble(self.compiled)
+        quantized.save(path)
+        report = quantization_report(self.compiled, quantized, self._prepare_features(data))
+        logger.info(f"Quantized model report: {report}")
+        return report
+        
     def get_feature_importance(self) -> pd.DataFrame:
         """Get feature importance scores"""
-        importance = self.model.feature_importances_
+        importance = feature_importances(self.model)
         return pd.DataFrame({
             'feature': self.feature_columns,
             'importance': importance
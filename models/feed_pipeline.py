@@ -0,0 +1,108 @@
+import os
+import time
+import logging
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from content_interaction import ContentInteractionModel
+from feed_ranking import FeedRankingModel, top_k_indices
+from ctr_model import CTRModel
+
+logger = logging.getLogger(__name__)
+
+class FeedScoringPipeline:
+    """Scores feed candidates with the CTR, engagement and ranking models in one pass.
+
+    The union of the three models' input features is extracted once into a
+    contiguous float32 block. Each stage gathers its own columns from the
+    block, and the CTR and engagement predictions are written back into the
+    block as the ranking model's predicted_ctr and predicted_engagement.
+    """
+
+    STAGE_OUTPUTS = {
+        'ctr': 'predicted_ctr',
+        'engagement': 'predicted_engagement',
+        'ranking': 'ranking_score'
+    }
+
+    def __init__(self, ctr_model: CTRModel, content_model: ContentInteractionModel,
+                 feed_model: FeedRankingModel):
+        self.stages = [
+            ('ctr', ctr_model),
+            ('engagement', content_model),
+            ('ranking', feed_model)
+        ]
+
+        # Columns of the shared block: every stage's inputs plus the stage outputs
+        self.columns: List[str] = []
+        for _, model in self.stages:
+            self.columns.extend(col for col in model.feature_columns if col not in self.columns)
+        self.columns.extend(col for col in self.STAGE_OUTPUTS.values() if col not in self.columns)
+        self._positions = {col: i for i, col in enumerate(self.columns)}
+
+        # Features supplied by the candidates rather than by an earlier stage
+        produced = set(self.STAGE_OUTPUTS.values())
+        self.input_columns = [col for col in self.columns if col not in produced]
+        self._input_positions = np.array([self._positions[col] for col in self.input_columns])
+        self.last_timings: Dict[str, float] = {}
+
+    @classmethod
+    def load(cls, model_dir: str = "models/saved") -> 'FeedScoringPipeline':
+        """Load the three trained models saved by ModelTrainer"""
+        ctr_model = CTRModel()
+        ctr_model.load(os.path.join(model_dir, "ctr_model"))
+        content_model = ContentInteractionModel()
+        content_model.load(os.path.join(model_dir, "content_model"))
+        feed_model = FeedRankingModel()
+        feed_model.load(os.path.join(model_dir, "feed_model"))
+        return cls(ctr_model, content_model, feed_model)
+
+    def build_block(self, candidates: pd.DataFrame) -> np.ndarray:
+        """Extract the shared feature block for a candidate set"""
+        missing_cols = set(self.input_columns) - set(candidates.columns)
+        if missing_cols:
+            raise ValueError(f"Missing required features: {missing_cols}")
+
+        block = np.empty((len(candidates), len(self.columns)), dtype=np.float32)
+        block[:, self._input_positions] = candidates[self.input_columns].to_numpy(dtype=np.float32)
+        return block
+
+    def score(self, candidates: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Run every stage over the candidates.
+
+        Returns the predicted_ctr, predicted_engagement and ranking_score
+        arrays; per-stage timings in milliseconds are kept in ``last_timings``.
+        """
+        timings = {}
+        start = time.perf_counter()
+        block = self.build_block(candidates)
+        timings['features'] = (time.perf_counter() - start) * 1000
+
+        outputs = {}
+        for stage, model in self.stages:
+            start = time.perf_counter()
+            # Gather this model's columns into a fresh contiguous matrix it may scale in place
+            columns = [self._positions[col] for col in model.feature_columns]
+            scores = model.predict_matrix(block.take(columns, axis=1))
+            output = self.STAGE_OUTPUTS[stage]
+            block[:, self._positions[output]] = scores
+            outputs[output] = scores
+            timings[stage] = (time.perf_counter() - start) * 1000
+
+        timings['total'] = sum(timings.values())
+        self.last_timings = timings
+        logger.debug(f"Scored {len(candidates)} candidates: " +
+                     ", ".join(f"{stage}={ms:.2f}ms" for stage, ms in timings.items()))
+        return outputs
+
+    def rank(self, candidates: pd.DataFrame, k: int = None) -> pd.DataFrame:
+        """Score the candidates and return the top k rows with their predictions"""
+        outputs = self.score(candidates)
+        top = top_k_indices(outputs['ranking_score'], k)
+
+        ranked = candidates.iloc[top].copy()
+        for column, values in outputs.items():
+            ranked[column] = values[top]
+        return ranked
@@ -1,22 +1,44 @@
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.preprocessing import StandardScaler
-import joblib
 import logging
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Iterable, Tuple, List, Optional
+
+from backends import DEFAULT_BACKEND, build_estimator, feature_importances, thread_limit
+from common.affine import AffineTransform
+from common.artifact import load_model_artifact, restore_scaler, save_model_artifact
+from common.quantize import QuantizedEnsemble, quantization_report
+from common.tree_ensemble import compile_ensemble
 
 logger = logging.getLogger(__name__)
 
+def top_k_indices(scores: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """Indices of the k highest scores (all by default), best first, ties in input order"""
+    n_items = len(scores)
+    k = n_items if k is None else max(min(k, n_items), 0)
+    # Select the top k without sorting the whole batch; of the items tied
+    # with the k-th score, the earliest ones are kept
+    if 0 < k < n_items:
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        better = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[:k - len(better)]
+        top = np.sort(np.concatenate([better, tied]))
+    else:
+        top = np.arange(k)
+    return top[np.argsort(-scores[top], kind='stable')]
+
 class FeedRankingModel:
-    def __init__(self):
-        self.model = GradientBoostingRegressor(
-            n_estimators=100,
-            learning_rate=0.1,
-            max_depth=3,
-            random_state=42
+    def __init__(self, backend: str = DEFAULT_BACKEND, n_jobs: Optional[int] = None):
+        self.backend = backend
+        self.n_jobs = n_jobs
+        self.model = build_estimator(
+            backend, 'regression', 'boosting',
+            params=dict(n_estimators=100, learning_rate=0.1, max_depth=3, random_state=42),
+            n_jobs=n_jobs
         )
         self.scaler = StandardScaler()
+        self.transform = None
+        self.compiled = None
         self.feature_columns = [
             'user_age',
             'user_region_encoded',
@@ -38,31 +60,38 @@ class FeedRankingModel:
             'content_diversity_score'
         ]
         
-    def _prepare_features(self, data: pd.DataFrame) -> np.ndarray:
-        """Prepare features for training or prediction"""
+    def _prepare_features(self, data: pd.DataFrame, fit: bool = False) -> np.ndarray:
+        """Prepare features for training (fit=True) or prediction"""
         # Ensure all required features are present
         missing_cols = set(self.feature_columns) - set(data.columns)
         if missing_cols:
             raise ValueError(f"Missing required features: {missing_cols}")
             
-        # Extract features
-        X = data[self.feature_columns].values
+        # Extract features into a fresh float32 matrix
+        X = data[self.feature_columns].to_numpy(dtype=np.float32, copy=True)
         
-        # Scale features
-        X = self.scaler.fit_transform(X)
+        # Fit the scaler only when training; prediction reuses its coefficients
+        if fit:
+            self.scaler.fit(X)
+            self.transform = AffineTransform.from_scaler(self.scaler)
+        elif self.transform is None:
+            raise ValueError("Model has not been trained or loaded")
         
-        return X
+        # Scale features in place
+        return self.transform.transform(X, out=X)
         
     def train(self, data: pd.DataFrame):
         """Train the feed ranking model"""
         logger.info("Training feed ranking model...")
         
         # Prepare features
-        X = self._prepare_features(data)
+        X = self._prepare_features(data, fit=True)
         y = data['ranking_score'].values
         
         # Train model
-        self.model.fit(X, y)
+        with thread_limit(self.backend, self.n_jobs):
+            self.model.fit(X, y)
+        self.compile()
         
         logger.info("Feed ranking model training completed")
         
@@ -72,33 +101,71 @@ class FeedRankingModel:
         X = self._prepare_features(data)
         
         # Make predictions
-        predictions = self.model.predict(X)
-        
-        return predictions
-        
-    def rank_items(self, items: List[Dict[str, Any]], user_context: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Rank a list of items for a given user context"""
-        # Convert items and user context to DataFrame
-        items_df = pd.DataFrame(items)
-        user_df = pd.DataFrame([user_context])
-        
-        # Merge user context with items
-        data = pd.concat([user_df] * len(items), ignore_index=True)
-        data = pd.concat([data, items_df], axis=1)
-        
-        # Make predictions
-        scores = self.predict(data)
+        return self._score(X)
+        
+    def predict_matrix(self, X: np.ndarray) -> np.ndarray:
+        """Score a float32 matrix whose columns follow feature_columns; X is scaled in place"""
+        if self.transform is None:
+            raise ValueError("Model has not been trained or loaded")
+        return self._score(self.transform.transform(X, out=X))
+        
+    def _score(self, X: np.ndarray) -> np.ndarray:
+        """Score an already scaled feature matrix"""
+        if self.compiled is not None:
+            return self.compiled.predict(X)
+        return self.model.predict(X)
+        
+    def pack_items(self, items: List[Dict[str, Any]], user_columns: Iterable[str] = ()) -> np.ndarray:
+        """Pack candidate items into a float32 feature matrix for rank_top_k.
+
+        Columns named in ``user_columns`` are left empty to be filled from the
+        user context at ranking time; every other feature must be on the items.
+        """
+        user_columns = set(user_columns)
+        item_columns = [col for col in self.feature_columns if col not in user_columns]
+        missing_cols = {col for col in item_columns if not any(col in item for item in items)}
+        if missing_cols:
+            raise ValueError(f"Missing required features: {missing_cols}")
         
-        # Add scores to items
-        ranked_items = []
-        for item, score in zip(items, scores):
-            item['ranking_score'] = score
-            ranked_items.append(item)
-            
-        # Sort by ranking score
-        ranked_items.sort(key=lambda x: x['ranking_score'], reverse=True)
+        X = np.full((len(items), len(self.feature_columns)), np.nan, dtype=np.float32)
+        for j, col in enumerate(self.feature_columns):
+            if col not in user_columns:
+                X[:, j] = [item.get(col, np.nan) for item in items]
+        return X
         
-        return ranked_items
+    def rank_top_k(self, item_matrix: np.ndarray, user_context: Dict[str, Any],
+                   k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Score a packed item matrix for one user and return (indices, scores) of the top k.
+
+        User features are broadcast over every row of a copy of ``item_matrix``,
+        so the packed matrix can be reused across users and requests.
+        """
+        if item_matrix.shape[0] == 0:
+            return np.arange(0), np.empty(0, dtype=np.float32)
+        
+        # Broadcast the user vector into the user columns
+        X = np.array(item_matrix, dtype=np.float32)
+        for j, col in enumerate(self.feature_columns):
+            if col in user_context:
+                X[:, j] = user_context[col]
+        
+        # Score the batch once
+        scores = self.predict_matrix(X)
+        top = top_k_indices(scores, k)
+        return top, scores[top]
+        
+    def rank_items(self, items: List[Dict[str, Any]], user_context: Dict[str, Any],
+                   k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Rank a list of items for a given user context.
+
+        Returns copies of the top ``k`` items (all by default) with a
+        ``ranking_score`` key; the input dicts are left untouched.
+        """
+        if len(items) == 0:
+            return []
+        X = self.pack_items(items, user_context.keys())
+        indices, scores = self.rank_top_k(X, user_context, k)
+        return [{**items[i], 'ranking_score': float(score)} for i, score in zip(indices, scores)]
         
     def evaluate(self, data: pd.DataFrame) -> Dict[str, float]:
         """Evaluate model performance"""
@@ -119,26 +186,54 @@ class FeedRankingModel:
         return metrics
         
     def save(self, path: str):
-        """Save model to disk"""
-        model_data = {
-            'model': self.model,
-            'scaler': self.scaler,
-            'feature_columns': self.feature_columns
+        """Save the model as an artifact directory (manifest plus .npy arrays)"""
+        if self.compiled is None:
+            self.compile()
+        meta = {
+            'model': type(self).__name__,
+            'feature_columns': self.feature_columns,
+            'backend': self.backend
         }
-        joblib.dump(model_data, path)
+        save_model_artifact(path, meta, self.transform, self.compiled, scaler=self.scaler, estimator=self.model)
         logger.info(f"Model saved to {path}")
         
-    def load(self, path: str):
-        """Load model from disk"""
-        model_data = joblib.load(path)
-        self.model = model_data['model']
-        self.scaler = model_data['scaler']
-        self.feature_columns = model_data['feature_columns']
+    def load(self, path: str, load_estimator: bool = False):
+        """Load a model artifact; the estimator is only needed to keep training or for importances"""
+        artifact = load_model_artifact(path, load_estimator=load_estimator)
+        meta = artifact['meta']
+        self.feature_columns = meta['feature_columns']
+        self.backend = meta.get('backend', 'sklearn')
+        self.transform = artifact['transform']
+        self.compiled = artifact['ensemble']
+        restore_scaler(self.scaler, artifact['arrays'])
+        if artifact['estimator'] is not None:
+            self.model = artifact['estimator']
         logger.info(f"Model loaded from {path}")
         
+    def compile(self):
+        """Compile the fitted model into flat arrays for fast batch inference"""
+        self.compiled = compile_ensemble(self.model)
+        return self.compiled
+        
+    def export_compiled(self, path: str):
+        """Save the compiled tree arrays to disk"""
+        if self.compiled is None:
+            self.compile()
+        self.compiled.save(path)
+        
+    def export_quantized(self, path: str, data: pd.DataFrame) -> Dict[str, float]:
+        """Save a quantized copy of the compiled trees and report its error on ``data``"""
+        if self.compiled is None:
+            self.compile()
+        quantized = QuantizedEnsemble.from_ensemble(self.compiled)
+        quantized.save(path)
+        report = quantization_report(self.compiled, quantized, self._prepare_features(data))
+        logger.info(f"Quantized model report: {report}")
+        return report
+        
     def get_feature_importance(self) -> pd.DataFrame:
         """Get feature importance scores"""
-        importance = self.model.feature_importances_
+        importance = feature_importances(self.model)
         return pd.DataFrame({
             'feature': self.feature_columns,
             'importance': importance
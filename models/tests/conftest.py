@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules import the shared package as ``common``, from the models directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
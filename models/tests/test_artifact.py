@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common.artifact import ESTIMATOR_FILE, load_artifact, save_artifact
+from content_interaction import ContentInteractionModel
+
+
+def training_frame(model, n=300, start='2024-01-01'):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.random((n, len(model.feature_columns))), columns=model.feature_columns)
+    data['engagement_score'] = data['user_engagement_score'] * 2 + rng.normal(scale=0.1, size=n)
+    data['timestamp'] = pd.date_range(start, periods=n, freq='h')
+    return data
+
+
+@pytest.fixture(scope='module')
+def trained():
+    model = ContentInteractionModel()
+    model.model.set_params(n_estimators=10)
+    data = training_frame(model)
+    model.train(data)
+    return model, data
+
+
+def test_round_trip_without_estimator(trained, tmp_path):
+    model, data = trained
+    model.save(str(tmp_path))
+    assert not any(name.startswith('.tmp-') for name in os.listdir(tmp_path))
+
+    loaded = ContentInteractionModel()
+    loaded.load(str(tmp_path))
+    np.testing.assert_allclose(loaded.predict(data), model.predict(data), rtol=1e-6)
+    assert loaded.watermark == pd.Timestamp(data['timestamp'].max())
+    assert isinstance(loaded.watermark, pd.Timestamp)
+    # Arrays are memory-mapped and the estimator is left on disk
+    assert isinstance(loaded.compiled.value, np.memmap)
+    with pytest.raises(ValueError, match='load_estimator=True'):
+        loaded.get_feature_importance()
+    with pytest.raises(ValueError, match='load_estimator=True'):
+        loaded.update(data)
+
+
+def test_round_trip_with_estimator(trained, tmp_path):
+    model, data = trained
+    model.save(str(tmp_path))
+    assert os.path.exists(tmp_path / ESTIMATOR_FILE)
+
+    loaded = ContentInteractionModel()
+    loaded.load(str(tmp_path), load_estimator=True)
+    assert len(loaded.get_feature_importance()) == len(model.feature_columns)
+    newer = training_frame(model, n=50, start=str(loaded.watermark + pd.Timedelta(hours=1)))
+    assert loaded.update(newer, n_estimators=2) == 50
+
+
+def test_save_replaces_previous_arrays(tmp_path):
+    save_artifact(str(tmp_path), {'ids': np.arange(3)}, {'watermark': pd.Timestamp('2024-01-01')})
+    old_meta, old_arrays = load_artifact(str(tmp_path))
+    save_artifact(str(tmp_path), {'ids': np.arange(5)}, {'watermark': pd.Timestamp('2024-02-01')})
+    meta, arrays = load_artifact(str(tmp_path))
+
+    assert pd.Timestamp(meta['watermark']) == pd.Timestamp('2024-02-01')
+    assert arrays['ids'].tolist() == list(range(5))
+    # A reader holding the previous version keeps its arrays
+    assert old_arrays['ids'].tolist() == list(range(3))
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.npy')]) == 1
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from common.categorical import CategoricalEncoder
+
+
+def test_float_column_with_missing_values_matches_int_requests():
+    encoder = CategoricalEncoder().fit(pd.Series([1, 2, None, 10], dtype='float64'))
+    assert encoder.vocabulary.tolist() == ['1', '2', '10']
+    assert encoder.code(2) == 1
+    assert encoder.code(2.0) == 1
+    assert encoder.code(np.int16(10)) == 2
+
+
+def test_missing_and_unseen_values_get_unknown_code():
+    encoder = CategoricalEncoder().fit([1, 2, None, 10])
+    assert encoder.code(None) == encoder.unknown_code
+    assert encoder.code(np.nan) == encoder.unknown_code
+    assert encoder.code(3) == encoder.unknown_code
+    codes = encoder.codes(pd.Series([2, np.nan, 10.0, 3]))
+    assert codes.tolist() == [1, 3, 2, 3]
+
+
+def test_codes_match_label_encoder_for_numbers():
+    values = [10, 2, 1, 2, 33]
+    encoder = CategoricalEncoder().fit(values)
+    assert encoder.codes(values).tolist() == LabelEncoder().fit_transform(values).tolist()
+
+
+def test_single_values_batches_and_categoricals_agree():
+    encoder = CategoricalEncoder().fit(['b', 'a', 'c'])
+    values = ['c', 'x', None, 'a']
+    singles = [encoder.code(value) for value in values]
+    assert encoder.codes(values).tolist() == singles
+    assert encoder.codes(pd.Series(values, dtype='category')).tolist() == singles
+    dense = encoder.transform(values)
+    assert dense.argmax(axis=1).tolist() == singles
+    assert (encoder.transform_sparse(values).toarray() == dense).all()
+
+
+def test_vocabulary_passed_in_keeps_its_order():
+    encoder = CategoricalEncoder(np.array(['z', 'a']))
+    assert encoder.code('z') == 0
+    assert encoder.column_names('col') == ['col_z', 'col_a', 'col_unknown']
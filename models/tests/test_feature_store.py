@@ -0,0 +1,73 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from common.feature_store import CONTENT_FEATURE_COLUMNS, CONTENT_FEATURES_QUERY, FeatureStore
+
+# The content query in sqlite: no ::text casts, named parameters as :since,
+# and GREATEST / NOW() registered as functions
+SQLITE_CONTENT_QUERY = CONTENT_FEATURES_QUERY.replace('::text', '').replace('%(since)s', ':since')
+
+
+class Database:
+    def __init__(self):
+        self.now = '2024-01-01 00:00:00'
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.create_function('NOW', 0, lambda: self.now)
+        self.conn.create_function('GREATEST', -1, lambda *values: max(v for v in values if v is not None))
+        self.conn.executescript("""
+            CREATE TABLE posts (id TEXT, created_at TEXT);
+            CREATE TABLE post_engagements (post_id TEXT, engagement_type TEXT, created_at TEXT);
+            CREATE TABLE content_flags (content_id TEXT, flag_score REAL, created_at TEXT, expires_at TEXT);
+        """)
+
+    def execute(self, sql, *params):
+        self.conn.execute(sql, params)
+
+
+@pytest.fixture
+def db():
+    db = Database()
+    db.execute("INSERT INTO posts VALUES ('p1', '2024-01-01 00:00:00'), ('p2', '2024-01-01 00:00:00')")
+    db.execute("INSERT INTO post_engagements VALUES ('p1', 'like', '2024-01-01 01:00:00')")
+    db.execute("INSERT INTO content_flags VALUES ('p1', 0.9, '2024-01-01 02:00:00', '2024-01-01 12:00:00')")
+    db.execute("INSERT INTO content_flags VALUES ('p2', 0.5, '2024-01-01 03:00:00', NULL)")
+    yield db
+    db.conn.close()
+
+
+def test_expired_flags_are_dropped_on_refresh(db):
+    store = FeatureStore(CONTENT_FEATURE_COLUMNS)
+    db.now = '2024-01-01 11:00:00'
+    assert store.refresh(db.conn, SQLITE_CONTENT_QUERY) == 2
+    np.testing.assert_allclose(store.gather(['p1', 'p2'], ['flag_score', 'likes']), [[0.9, 1], [0.5, 0]], rtol=1e-6)
+
+    # Nothing changed before the flag expires
+    assert store.refresh(db.conn, SQLITE_CONTENT_QUERY) == 0
+
+    db.now = '2024-01-01 13:00:00'
+    assert store.refresh(db.conn, SQLITE_CONTENT_QUERY) == 1
+    assert store.get('p1')['flag_score'] == 0
+    assert store.get('p1')['likes'] == 1
+    assert store.get('p2')['flag_score'] == 0.5
+    assert str(store.watermark) == '2024-01-01 12:00:00'
+    assert store.refresh(db.conn, SQLITE_CONTENT_QUERY) == 0
+
+
+def test_snapshot_round_trip(db, tmp_path):
+    db.now = '2024-01-01 11:00:00'
+    store = FeatureStore(CONTENT_FEATURE_COLUMNS)
+    store.refresh(db.conn, SQLITE_CONTENT_QUERY)
+    store.save(str(tmp_path))
+
+    loaded = FeatureStore.load(str(tmp_path))
+    assert loaded.watermark == store.watermark
+    np.testing.assert_array_equal(loaded.gather(['p2', 'missing', 'p1']), store.gather(['p2', 'missing', 'p1']))
+    assert np.isnan(loaded.gather(['missing'])).all()
+
+    # The first write after a memory-mapped load copies the columns
+    db.now = '2024-01-01 13:00:00'
+    assert loaded.refresh(db.conn, SQLITE_CONTENT_QUERY) == 1
+    assert loaded.get('p1')['flag_score'] == 0
+    assert FeatureStore.load(str(tmp_path)).get('p1')['flag_score'] == pytest.approx(0.9)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from feed_ranking import FeedRankingModel, top_k_indices
+
+
+def full_sort(scores, k):
+    return np.argsort(-scores, kind='stable')[:max(k, 0)]
+
+
+def test_ties_keep_input_order():
+    scores = np.array([1.0, 3.0, 2.0, 3.0, 2.0, 2.0, 3.0])
+    np.testing.assert_array_equal(top_k_indices(scores, 2), [1, 3])
+    np.testing.assert_array_equal(top_k_indices(scores, 4), [1, 3, 6, 2])
+    np.testing.assert_array_equal(top_k_indices(scores, 5), [1, 3, 6, 2, 4])
+
+
+def test_matches_a_stable_full_sort():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        scores = rng.integers(0, 5, size=rng.integers(1, 40)).astype(np.float32)
+        for k in range(len(scores) + 2):
+            np.testing.assert_array_equal(top_k_indices(scores, k), full_sort(scores, k))
+
+
+@pytest.mark.parametrize('k, expected', [(None, [1, 0, 2]), (3, [1, 0, 2]), (10, [1, 0, 2]), (0, []), (-1, [])])
+def test_k_bounds(k, expected):
+    scores = np.array([2.0, 5.0, 1.0])
+    np.testing.assert_array_equal(top_k_indices(scores, k), expected)
+
+
+def test_empty_scores():
+    assert len(top_k_indices(np.empty(0), 5)) == 0
+    assert len(top_k_indices(np.empty(0))) == 0
+
+
+@pytest.fixture(scope='module')
+def model():
+    model = FeedRankingModel()
+    model.model.set_params(n_estimators=10)
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.random((300, len(model.feature_columns))), columns=model.feature_columns)
+    data['ranking_score'] = data['content_quality_score'] + rng.normal(scale=0.1, size=len(data))
+    model.train(data)
+    return model
+
+
+def test_rank_items_returns_scored_copies(model):
+    rng = np.random.default_rng(1)
+    user = {'user_age': 0.3, 'user_region_encoded': 0.5}
+    items = [{col: float(rng.random()) for col in model.feature_columns if col not in user} for _ in range(20)]
+
+    ranked = model.rank_items(items, user, k=5)
+    assert len(ranked) == 5
+    assert all('ranking_score' not in item for item in items)
+    scores = [item['ranking_score'] for item in ranked]
+    assert scores == sorted(scores, reverse=True)
+
+    frame = pd.DataFrame([{**item, **user} for item in items])[model.feature_columns]
+    expected = np.sort(model.predict(frame))[::-1][:5]
+    np.testing.assert_allclose(scores, expected, rtol=1e-6)
+
+
+def test_rank_items_without_candidates(model):
+    assert model.rank_items([], {'user_age': 0.3}, k=5) == []
@@ -0,0 +1,80 @@
+import struct
+
+import numpy as np
+import pytest
+
+from common.packed_batch import (
+    PackedFormatError,
+    align_columns,
+    decode_matrix,
+    decode_scores,
+    encode_matrix,
+    encode_scores
+)
+
+NAMES = ['ad_id', 'user_id', 'feed_position']
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64, np.int32])
+def test_round_trip(dtype):
+    X = np.arange(12, dtype=dtype).reshape(4, 3)
+    names, decoded = decode_matrix(encode_matrix(X, NAMES))
+    assert names == NAMES
+    assert decoded.dtype == X.dtype
+    np.testing.assert_array_equal(decoded, X)
+    assert not decoded.flags.writeable
+
+
+def test_empty_matrix_round_trip():
+    names, decoded = decode_matrix(encode_matrix(np.empty((0, 3), dtype=np.float32), NAMES))
+    assert names == NAMES and decoded.shape == (0, 3)
+
+
+def test_scores_round_trip():
+    scores = np.array([0.1, 0.5, 0.9])
+    np.testing.assert_array_equal(decode_scores(encode_scores(scores)), scores.astype(np.float32))
+
+
+def test_align_columns_reorders_by_name():
+    X = np.arange(6, dtype=np.float32).reshape(2, 3)
+    aligned = align_columns(NAMES, X, ['feed_position', 'ad_id', 'user_id'])
+    np.testing.assert_array_equal(aligned, X[:, [2, 0, 1]])
+    assert align_columns(NAMES, X, NAMES) is X
+    assert align_columns(NAMES, X, None) is X
+
+
+def test_align_columns_rejects_missing_model_column():
+    X = np.zeros((2, 3), dtype=np.float32)
+    with pytest.raises(PackedFormatError, match='Missing required features'):
+        align_columns(NAMES, X, NAMES + ['hour'])
+
+
+def test_truncated_body():
+    body = encode_matrix(np.ones((4, 3), dtype=np.float32), NAMES)
+    with pytest.raises(PackedFormatError, match='Payload size'):
+        decode_matrix(body[:-4])
+    with pytest.raises(PackedFormatError, match='shorter than the packed header'):
+        decode_matrix(body[:10])
+
+
+def test_bad_magic_and_version():
+    body = bytearray(encode_matrix(np.ones((1, 3), dtype=np.float32), NAMES))
+    with pytest.raises(PackedFormatError, match='magic'):
+        decode_matrix(b'XXXX' + bytes(body[4:]))
+    body[4] = 2
+    with pytest.raises(PackedFormatError, match='version'):
+        decode_matrix(bytes(body))
+
+
+def test_header_does_not_match_schema_or_payload():
+    body = bytearray(encode_matrix(np.ones((2, 3), dtype=np.float32), NAMES))
+    # Header claims four columns for a three-name schema
+    struct.pack_into('<I', body, 12, 4)
+    with pytest.raises(PackedFormatError, match='Schema does not name every column'):
+        decode_matrix(bytes(body))
+
+    body = bytearray(encode_matrix(np.ones((2, 3), dtype=np.float32), NAMES))
+    # Header claims three rows for a two-row payload
+    struct.pack_into('<I', body, 8, 3)
+    with pytest.raises(PackedFormatError, match='Payload size'):
+        decode_matrix(bytes(body))
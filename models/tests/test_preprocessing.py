@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_preprocessing import DataPreprocessor
+from utils.quantile_sketch import QuantileSketch
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+
+
+def rank_error(sketch, values):
+    ordered = np.sort(values)
+    ranks = np.searchsorted(ordered, sketch.quantiles(QUANTILES)) / len(ordered)
+    return np.abs(ranks - QUANTILES).max()
+
+
+@pytest.mark.parametrize('capacity', [256, 4096])
+def test_sketch_rank_error(capacity):
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(size=200_000)
+    sketch = QuantileSketch(capacity=capacity)
+    for chunk in np.array_split(values, 50):
+        sketch.update(chunk)
+    assert not sketch.is_exact
+    assert sketch.count == len(values)
+    assert sketch.min == values.min() and sketch.max == values.max()
+    assert rank_error(sketch, values) < 4 / capacity + 0.002
+
+
+def test_merged_sketches_keep_the_bound():
+    rng = np.random.default_rng(1)
+    left, right = rng.normal(size=100_000), rng.normal(loc=1.0, size=100_000)
+    merged = QuantileSketch(capacity=512).update(left).merge(QuantileSketch(capacity=512, seed=1).update(right))
+    assert rank_error(merged, np.concatenate([left, right])) < 0.01
+
+
+def test_small_inputs_are_exact():
+    values = np.random.default_rng(2).normal(size=1000)
+    sketch = QuantileSketch().update(np.append(values, np.nan))
+    assert sketch.is_exact and sketch.missing == 1
+    assert sketch.median() == pytest.approx(np.median(values))
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 3000
+    data = pd.DataFrame({
+        'timestamp': (pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 10 ** 7, n), unit='s')).astype(str),
+        'likes': rng.poisson(3, n).astype(float),
+        'score': rng.lognormal(size=n),
+        'clicks': rng.integers(0, 9, n),
+        'age': rng.integers(18, 90, n),
+        'user_region': rng.choice(['us', 'eu', None], n)
+    })
+    data.loc[rng.random(n) < 0.05, 'likes'] = np.nan
+    # Outliers for the IQR filter
+    data.loc[:20, 'score'] = 1000.0
+    data.loc[7, 'timestamp'] = None
+    path = tmp_path / 'interactions.csv'
+    data.to_csv(path, index=False)
+    return str(path)
+
+
+def test_streaming_matches_in_memory(csv_path):
+    preprocessor = DataPreprocessor()
+    train, test = preprocessor.load_and_preprocess(csv_path)
+    in_memory_report = preprocessor.outlier_report
+    streamed_train, streamed_test = preprocessor.load_and_preprocess(csv_path, chunksize=500)
+
+    assert len(streamed_train) == len(train) and len(streamed_test) == len(test)
+    assert len(train) + len(test) < 3000
+    pd.testing.assert_frame_equal(streamed_train, train.reset_index(drop=True), check_categorical=False)
+    pd.testing.assert_frame_equal(streamed_test, test.reset_index(drop=True), check_categorical=False)
+    pd.testing.assert_frame_equal(preprocessor.outlier_report, in_memory_report)
+
+
+def test_streaming_writes_sorted_parts(csv_path, tmp_path):
+    parts = DataPreprocessor().preprocess_to_parquet(csv_path, str(tmp_path / 'out'), chunksize=700)
+    train = pd.concat(pd.read_parquet(path) for path in parts['train'])
+    test = pd.concat(pd.read_parquet(path) for path in parts['test'])
+    assert train['timestamp'].is_monotonic_increasing
+    assert train['timestamp'].max() <= test['timestamp'].dropna().min()
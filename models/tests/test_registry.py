@@ -0,0 +1,112 @@
+import itertools
+import json
+import os
+import time
+
+import pytest
+
+from common.registry import METADATA_FILE, ROUTING_FILE, ModelRegistry, ServingModel
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path / 'registry'))
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    source = tmp_path / 'artifacts'
+    source.mkdir()
+    (source / 'model.npz').write_bytes(b'weights')
+    return str(source)
+
+
+_ticks = itertools.count(1)
+
+
+def route(registry, name, **routing):
+    """set_routing, moving the file's mtime on so back-to-back changes are always seen"""
+    registry.set_routing(name, **routing)
+    mtime = time.time_ns() + next(_ticks) * 1_000_000_000
+    os.utime(os.path.join(registry.root, name, ROUTING_FILE), ns=(mtime, mtime))
+
+
+def serving(registry, unloaded=None):
+    def loader(version_dir, metadata):
+        return metadata['version']
+    unloader = unloaded.append if unloaded is not None else None
+    model = ServingModel(registry, 'ctr', loader, unloader=unloader)
+    model.refresh()
+    return model
+
+
+def test_publish_copies_artifacts_and_numbers_versions(registry, artifacts):
+    assert registry.list_versions('ctr') == []
+    first = registry.publish('ctr', artifacts, ['a', 'b'], metrics={'auc': 0.7})
+    second = registry.publish('ctr', artifacts, ['a', 'b'])
+    assert (first, second) == ('v0001', 'v0002')
+    assert registry.list_versions('ctr') == ['v0001', 'v0002']
+
+    metadata = registry.get_metadata('ctr', first)
+    assert metadata['feature_schema'] == ['a', 'b'] and metadata['metrics'] == {'auc': 0.7}
+    assert set(os.listdir(registry.version_dir('ctr', first))) == {'model.npz', METADATA_FILE}
+    assert not any(entry.startswith('.') for entry in os.listdir(os.path.join(registry.root, 'ctr')))
+
+
+def test_versions_sort_by_number(registry, artifacts):
+    model_dir = os.path.join(registry.root, 'ctr')
+    for version in ('v9998', 'v9999'):
+        os.makedirs(os.path.join(model_dir, version))
+        with open(os.path.join(model_dir, version, METADATA_FILE), 'w') as f:
+            json.dump({'version': version}, f)
+    os.makedirs(os.path.join(model_dir, 'vnext'))
+
+    assert registry.publish('ctr', artifacts, ['a']) == 'v10000'
+    assert registry.publish('ctr', artifacts, ['a']) == 'v10001'
+    assert registry.list_versions('ctr') == ['v9998', 'v9999', 'v10000', 'v10001']
+    assert registry.get_routing('ctr')['stable'] == 'v10001'
+
+
+def test_promote_and_roll_back(registry, artifacts):
+    for _ in range(3):
+        registry.publish('ctr', artifacts, ['a'])
+    unloaded = []
+    model = serving(registry, unloaded)
+    assert model.select('user-1') == ('v0003', 'v0003')
+
+    # Roll back by pinning an older version, then release the pin
+    route(registry, 'ctr', stable='v0003', pinned='v0001')
+    assert model.refresh()
+    assert model.select('user-1')[0] == 'v0001'
+    assert unloaded == ['v0003']
+
+    route(registry, 'ctr', stable='v0002')
+    assert model.refresh()
+    assert model.select('user-1')[0] == 'v0002'
+    assert unloaded == ['v0003', 'v0001']
+    assert not model.refresh()
+
+    with pytest.raises(ValueError):
+        registry.set_routing('ctr', stable='v0009')
+    with pytest.raises(ValueError):
+        registry.set_routing('ctr', stable='v0001', canary='v0002', canary_percent=150)
+
+
+def test_canary_routing(registry, artifacts):
+    registry.publish('ctr', artifacts, ['a'])
+    registry.publish('ctr', artifacts, ['a'])
+    route(registry, 'ctr', stable='v0001', canary='v0002', canary_percent=20)
+    model = serving(registry)
+
+    keys = [f"user-{i}" for i in range(5000)]
+    versions = [model.select(key)[0] for key in keys]
+    share = versions.count('v0002') / len(keys)
+    assert 0.17 < share < 0.23
+    # Each key stays in its bucket, and requests without a key go to stable
+    assert [model.select(key)[0] for key in keys[:100]] == versions[:100]
+    assert model.select()[0] == 'v0001'
+
+    # A pin overrides the canary
+    route(registry, 'ctr', stable='v0001', canary='v0002', canary_percent=20, pinned='v0001')
+    assert model.refresh()
+    assert {model.select(key)[0] for key in keys} == {'v0001'}
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from common.schema import enforce_schema, integer_type, memory_report, schema_dtypes
+
+
+def test_values_that_fit_are_narrowed():
+    data = enforce_schema(pd.DataFrame({'age': [18, 65], 'likes': [0, 10], 'user_region': ['us', 'eu']}))
+    assert data.dtypes.astype(str).tolist() == ['int8', 'int32', 'category']
+
+
+def test_out_of_range_values_keep_a_wider_type():
+    data = enforce_schema(pd.DataFrame({
+        'age': [25, 200],
+        'follower_count': [10, 3_000_000_000],
+        'likes': [-40_000, 5]
+    }))
+    assert data['age'].dtype == np.int16
+    assert data['age'].tolist() == [25, 200]
+    assert data['follower_count'].dtype == np.int64
+    assert data['follower_count'].tolist() == [10, 3_000_000_000]
+    assert data['likes'].dtype == np.int32
+
+
+def test_missing_or_fractional_integers_are_float32():
+    data = enforce_schema(pd.DataFrame({'likes': [1.0, np.nan], 'comments': [1.5, 2.0]}))
+    assert data['likes'].dtype == np.float32
+    assert data['comments'].dtype == np.float32
+
+
+def test_integer_type():
+    assert integer_type('int8', 0, 127) == 'int8'
+    assert integer_type('int8', -129, 0) == 'int16'
+    assert integer_type('int16', 0, 2 ** 40) == 'int64'
+
+
+def test_schema_dtypes_and_memory_report():
+    assert schema_dtypes(['age', 'unknown_column']) == {'age': 'int8'}
+    report = memory_report(pd.DataFrame({'age': np.arange(100, dtype=np.int64) % 90}), rows=1000)
+    total = report.iloc[-1]
+    assert total['bytes_before'] == 8000
+    assert total['bytes_after'] == 1000
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor
+
+from common.shared_weights import attach_or_publish, release_shared
+from common.tree_ensemble import TreeEnsemble, compile_ensemble
+
+
+@pytest.fixture
+def source(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.random((200, 4))
+    model = GradientBoostingRegressor(n_estimators=5, max_depth=2, random_state=0).fit(X, X[:, 0])
+    path = str(tmp_path / 'model.npz')
+    compile_ensemble(model).save(path)
+    return path, X
+
+
+def test_publish_attach_release_leaves_the_directory_clean(source, tmp_path):
+    path, X = source
+    shared_dir = tmp_path / 'shm'
+    shared_dir.mkdir()
+    loads = []
+
+    def loader(p):
+        loads.append(p)
+        return TreeEnsemble.load(p)
+
+    first = attach_or_publish('ctr', path, loader, shared_dir=str(shared_dir))
+    second = attach_or_publish('ctr', path, loader, shared_dir=str(shared_dir))
+    assert loads == [path]
+    assert isinstance(second.value, np.memmap)
+    np.testing.assert_array_equal(first.predict(X), TreeEnsemble.load(path).predict(X))
+    assert sorted(os.listdir(shared_dir)) == ['ctr.weights', 'ctr.weights.lock']
+
+    assert release_shared('ctr', shared_dir=str(shared_dir))
+    assert os.listdir(shared_dir) == []
+    # Mappings taken before the release keep working
+    np.testing.assert_array_equal(second.predict(X), first.predict(X))
+
+
+def test_release_without_weights(tmp_path):
+    assert not release_shared('missing', shared_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == []
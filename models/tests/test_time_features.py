@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from common.time_features import NAT, day_of_week, epoch_seconds, hour_of_day, is_weekend
+
+
+def test_aware_values_keep_their_own_wall_clock():
+    zone = timezone(timedelta(hours=2))
+    aware = datetime(2024, 3, 2, 23, 30, tzinfo=zone)
+    naive = aware.replace(tzinfo=None)
+    assert epoch_seconds(aware) == epoch_seconds(naive)
+    assert epoch_seconds(pd.Timestamp(aware)) == epoch_seconds(naive)
+
+    column = pd.Series(pd.to_datetime([aware, None]))
+    seconds = epoch_seconds(column)
+    assert seconds[0] == epoch_seconds(naive) and seconds[1] == NAT
+    assert hour_of_day(seconds)[0] == 23
+    assert day_of_week(seconds)[0] == 5
+    assert is_weekend(seconds).tolist() == [1, 0]
+
+
+def test_scalar_and_column_agree():
+    times = pd.Series(pd.date_range('2023-12-30 22:00', periods=50, freq='7h', tz='America/New_York'))
+    column = epoch_seconds(times)
+    scalars = np.array([epoch_seconds(t.to_pydatetime()) for t in times])
+    np.testing.assert_array_equal(column, scalars)
+    np.testing.assert_array_equal(hour_of_day(column), times.dt.hour)
+    np.testing.assert_array_equal(day_of_week(column), times.dt.dayofweek)
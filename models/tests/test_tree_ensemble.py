@@ -0,0 +1,106 @@
+import lightgbm
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import (
+    GradientBoostingClassifier,
+    GradientBoostingRegressor,
+    HistGradientBoostingClassifier,
+    HistGradientBoostingRegressor,
+    RandomForestClassifier,
+    RandomForestRegressor
+)
+
+from common.tree_ensemble import TreeEnsemble, compile_ensemble
+
+N_FEATURES = 5
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, N_FEATURES)).astype(np.float32)
+    y_reg = X[:, 0] * 2 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=len(X))
+    y_clf = (y_reg > 0).astype(int)
+    X_missing = X.copy()
+    X_missing[rng.random(X.shape) < 0.1] = np.nan
+    return X, y_reg, y_clf, X_missing
+
+
+def expected(model, X):
+    return model.predict_proba(X)[:, 1] if hasattr(model, 'predict_proba') else model.predict(X)
+
+
+@pytest.mark.parametrize('model', [
+    GradientBoostingClassifier(n_estimators=20, max_depth=3, random_state=0),
+    GradientBoostingClassifier(n_estimators=20, max_depth=3, loss='exponential', random_state=0),
+    GradientBoostingRegressor(n_estimators=20, max_depth=3, random_state=0),
+    RandomForestClassifier(n_estimators=10, max_depth=5, random_state=0),
+    RandomForestRegressor(n_estimators=10, max_depth=5, random_state=0),
+], ids=['gb-log-loss', 'gb-exponential', 'gb-regressor', 'rf-classifier', 'rf-regressor'])
+def test_sklearn_parity(data, model):
+    X, y_reg, y_clf, _ = data
+    model.fit(X, y_clf if hasattr(model, 'predict_proba') else y_reg)
+    np.testing.assert_allclose(compile_ensemble(model).predict(X), expected(model, X), rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize('model', [
+    HistGradientBoostingClassifier(max_iter=20, random_state=0),
+    HistGradientBoostingRegressor(max_iter=20, random_state=0),
+], ids=['hist-classifier', 'hist-regressor'])
+def test_hist_gradient_boosting_parity_with_missing_values(data, model):
+    X, y_reg, y_clf, X_missing = data
+    model.fit(X_missing, y_clf if hasattr(model, 'predict_proba') else y_reg)
+    X_eval = X_missing.astype(np.float64)
+    np.testing.assert_allclose(compile_ensemble(model).predict(X_eval), expected(model, X_eval),
+                               rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize('params', [
+    dict(boosting_type='gbdt'),
+    dict(boosting_type='rf', bagging_fraction=0.8, bagging_freq=1, feature_fraction=0.8),
+], ids=['gbdt', 'rf'])
+@pytest.mark.parametrize('estimator', [lightgbm.LGBMClassifier, lightgbm.LGBMRegressor],
+                         ids=['classifier', 'regressor'])
+def test_lightgbm_parity(data, estimator, params):
+    X, y_reg, y_clf, X_missing = data
+    model = estimator(n_estimators=20, num_leaves=15, random_state=0, verbose=-1, **params)
+    model.fit(X_missing, y_clf if estimator is lightgbm.LGBMClassifier else y_reg)
+    np.testing.assert_allclose(compile_ensemble(model).predict(X_missing), expected(model, X_missing),
+                               rtol=1e-6, atol=1e-9)
+
+
+def test_save_load_round_trip(data, tmp_path):
+    X, _, y_clf, _ = data
+    ensemble = compile_ensemble(GradientBoostingClassifier(n_estimators=5, random_state=0).fit(X, y_clf))
+    path = str(tmp_path / 'model.npz')
+    ensemble.save(path)
+    np.testing.assert_array_equal(TreeEnsemble.load(path).predict(X), ensemble.predict(X))
+
+
+def test_categorical_splits_are_rejected(data):
+    X, y_reg, _, _ = data
+    frame = pd.DataFrame(X[:, :2], columns=['a', 'b'])
+    frame['category'] = pd.Categorical(np.arange(len(frame)) % 4)
+    # The target depends on the category so both libraries split on it
+    y = y_reg + frame['category'].cat.codes.to_numpy() * 3
+
+    hist = HistGradientBoostingRegressor(max_iter=5, categorical_features=[2]).fit(frame.to_numpy(), y)
+    with pytest.raises(ValueError, match='Categorical HistGradientBoosting splits'):
+        compile_ensemble(hist)
+
+    booster = lightgbm.LGBMRegressor(n_estimators=5, min_child_samples=5, verbose=-1)
+    booster.fit(frame, y)
+    with pytest.raises(ValueError, match='Categorical LightGBM splits'):
+        compile_ensemble(booster)
+
+
+def test_unsupported_models_are_rejected(data):
+    X, y_reg, _, _ = data
+    poisson = HistGradientBoostingRegressor(max_iter=5, loss='poisson').fit(X, np.abs(y_reg))
+    with pytest.raises(ValueError, match='loss'):
+        compile_ensemble(poisson)
+
+    multiclass = GradientBoostingClassifier(n_estimators=5).fit(X, np.arange(len(X)) % 3)
+    with pytest.raises(ValueError, match='binary classification'):
+        compile_ensemble(multiclass)
@@ -1,14 +1,18 @@
 import os
+import sys
 import logging
+import tempfile
 from datetime import datetime
 from typing import Dict, Any
 
 from content_interaction import ContentInteractionModel
 from feed_ranking import FeedRankingModel
 from ctr_model import CTRModel
+from backends import DEFAULT_BACKEND
 from utils.feature_engineering import FeatureEngineer
 from utils.data_preprocessing import DataPreprocessor
 from utils.evaluation import ModelEvaluator
+from common.registry import ModelRegistry
 
 # Configure logging
 logging.basicConfig(
@@ -25,13 +29,30 @@ class ModelTrainer:
         self.evaluator = ModelEvaluator()
         
         # Initialize models
-        self.ctr_model = CTRModel()
-        self.content_model = ContentInteractionModel()
-        self.feed_model = FeedRankingModel()
+        backend = config.get("backend", DEFAULT_BACKEND)
+        n_jobs = config.get("n_jobs")
+        self.ctr_model = CTRModel(backend=backend, n_jobs=n_jobs)
+        self.content_model = ContentInteractionModel(backend=backend, n_jobs=n_jobs)
+        self.feed_model = FeedRankingModel(backend=backend, n_jobs=n_jobs)
         
         # Create model directory if it doesn't exist
         os.makedirs("models/saved", exist_ok=True)
         
+        # Optionally publish every trained model as a new registry version
+        self.registry = ModelRegistry(config["registry_path"]) if config.get("registry_path") else None
+        
+    def publish_model(self, name: str, model, metrics: Dict[str, float], trained_at: datetime):
+        """Publish a trained model's artifacts to the model registry"""
+        if self.registry is None:
+            return None
+        with tempfile.TemporaryDirectory() as staging:
+            model.save(staging)
+            model.export_compiled(os.path.join(staging, "model.npz"))
+            return self.registry.publish(
+                name, staging, model.feature_columns,
+                metrics=metrics, trained_at=trained_at
+            )
+        
     def prepare_data(self):
         """Prepare and preprocess data for all models"""
         logger.info("Starting data preparation...")
@@ -53,6 +74,7 @@ class ModelTrainer:
         ctr_features = self.feature_engineer.prepare_ctr_features(features)
         
         # Train model
+        trained_at = datetime.now()
         self.ctr_model.train(ctr_features)
         
         # Evaluate model
@@ -60,7 +82,10 @@ class ModelTrainer:
         logger.info(f"CTR Model Metrics: {metrics}")
         
         # Save model
-        self.ctr_model.save("models/saved/ctr_model.pkl")
+        self.ctr_model.save("models/saved/ctr_model")
+        self.ctr_model.export_compiled("models/saved/ctr_model.npz")
+        self.ctr_model.export_quantized("models/saved/ctr_model.q.npz", ctr_features)
+        self.publish_model("ctr_model", self.ctr_model, metrics, trained_at)
         
     def train_content_model(self, features):
         """Train the content interaction model"""
@@ -70,6 +95,7 @@ class ModelTrainer:
         content_features = self.feature_engineer.prepare_content_features(features)
         
         # Train model
+        trained_at = datetime.now()
         self.content_model.train(content_features)
         
         # Evaluate model
@@ -77,7 +103,10 @@ class ModelTrainer:
         logger.info(f"Content Model Metrics: {metrics}")
         
         # Save model
-        self.content_model.save("models/saved/content_model.pkl")
+        self.content_model.save("models/saved/content_model")
+        self.content_model.export_compiled("models/saved/content_model.npz")
+        self.content_model.export_quantized("models/saved/content_model.q.npz", content_features)
+        self.publish_model("content_model", self.content_model, metrics, trained_at)
         
     def train_feed_model(self, features):
         """Train the feed ranking model"""
@@ -87,6 +116,7 @@ class ModelTrainer:
         feed_features = self.feature_engineer.prepare_feed_features(features)
         
         # Train model
+        trained_at = datetime.now()
         self.feed_model.train(feed_features)
         
         # Evaluate model
@@ -94,7 +124,10 @@ class ModelTrainer:
         logger.info(f"Feed Model Metrics: {metrics}")
         
         # Save model
-        self.feed_model.save("models/saved/feed_model.pkl")
+        self.feed_model.save("models/saved/feed_model")
+        self.feed_model.export_compiled("models/saved/feed_model.npz")
+        self.feed_model.export_quantized("models/saved/feed_model.q.npz", feed_features)
+        self.publish_model("feed_model", self.feed_model, metrics, trained_at)
         
     def train_all(self):
         """Train all models"""
@@ -109,6 +142,31 @@ class ModelTrainer:
         self.train_feed_model(features)
         
         logger.info("Model training completed successfully!")
+        
+    def update_models(self):
+        """Extend the saved CTR and content models with rows newer than their watermarks"""
+        logger.info("Starting incremental model update...")
+        
+        features = self.prepare_data()
+        updates = [
+            ("ctr_model", self.ctr_model, self.feature_engineer.prepare_ctr_features),
+            ("content_model", self.content_model, self.feature_engineer.prepare_content_features),
+        ]
+        for name, model, prepare in updates:
+            model.load(f"models/saved/{name}", load_estimator=True)
+            model_features = prepare(features)
+            
+            trained_at = datetime.now()
+            if model.update(model_features) == 0:
+                continue
+            
+            metrics = model.evaluate(model_features)
+            logger.info(f"{name} metrics after update: {metrics}")
+            model.save(f"models/saved/{name}")
+            model.export_compiled(f"models/saved/{name}.npz")
+            self.publish_model(name, model, metrics, trained_at)
+        
+        logger.info("Incremental update completed")
 
 def main():
     # Configuration
@@ -118,13 +176,19 @@ def main():
         "random_state": 42,
         "test_size": 0.2,
         "validation_size": 0.1,
+        "registry_path": os.getenv("MODEL_REGISTRY_DIR"),
+        "backend": os.getenv("MODEL_BACKEND", "sklearn"),
+        "n_jobs": int(os.getenv("MODEL_N_JOBS")) if os.getenv("MODEL_N_JOBS") else None,
     }
     
     # Initialize trainer
     trainer = ModelTrainer(config)
     
-    # Train all models
-    trainer.train_all()
+    # Train all models, or only extend the existing ones with new rows
+    if "--update" in sys.argv[1:]:
+        trainer.update_models()
+    else:
+        trainer.train_all()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
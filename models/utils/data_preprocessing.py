@@ -1,22 +1,57 @@
+import os
+import shutil
+import tempfile
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 from sklearn.model_selection import train_test_split
 import logging
 
+from common.schema import CATEGORICAL_COLUMNS, enforce_schema, integer_type, schema_dtypes
+from common.time_features import civil_date, day_of_week, epoch_seconds, hour_of_day, is_weekend
+from .quantile_sketch import QuantileSketch
+
 logger = logging.getLogger(__name__)
 
+TIMESTAMP_COLUMN = 'timestamp'
+TIME_FEATURES = ['hour', 'day', 'month', 'year', 'dayofweek', 'is_weekend']
+# Rows read to infer column types before streaming a file
+SAMPLE_ROWS = 10000
+IQR_MULTIPLIER = 1.5
+
+def _iqr_bounds(q1: float, q3: float) -> Tuple[float, float]:
+    iqr = q3 - q1
+    return q1 - IQR_MULTIPLIER * iqr, q3 + IQR_MULTIPLIER * iqr
+
 class DataPreprocessor:
     def __init__(self, test_size: float = 0.2, random_state: int = 42):
         self.test_size = test_size
         self.random_state = random_state
+        # Bounds and rows removed per column by the last outlier removal
+        self.outlier_report: Optional[pd.DataFrame] = None
         
-    def load_and_preprocess(self, data_path: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
-        """Load and preprocess data from file"""
+    def load_and_preprocess(self, data_path: str, chunksize: Optional[int] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Load and preprocess data from file.
+        
+        With ``chunksize`` the file is streamed through ``preprocess_to_parquet``
+        and only the preprocessed train and test sets are held in memory.
+        """
         logger.info(f"Loading data from {data_path}")
         
-        # Load data
-        data = pd.read_csv(data_path)
+        if chunksize:
+            with tempfile.TemporaryDirectory() as output_dir:
+                parts = self.preprocess_to_parquet(data_path, output_dir, chunksize)
+                # Parts hold numerics in their final types; categoricals were
+                # written as strings
+                train_data, test_data = (
+                    enforce_schema(pd.concat([pd.read_parquet(path) for path in parts[split]], ignore_index=True),
+                                   schema_dtypes(CATEGORICAL_COLUMNS))
+                    for split in ('train', 'test')
+                )
+            return train_data, test_data
+        
+        # Load data, cast to the shared column schema
+        data = enforce_schema(pd.read_csv(data_path))
         
         # Basic preprocessing
         data = self._basic_preprocessing(data)
@@ -52,38 +87,61 @@ class DataPreprocessor:
             data[col] = data[col].fillna(data[col].median())
             
         # For categorical columns, fill with mode
-        categorical_cols = data.select_dtypes(include=['object']).columns
+        categorical_cols = data.select_dtypes(include=['object', 'category']).columns
         for col in categorical_cols:
             data[col] = data[col].fillna(data[col].mode()[0])
             
-        return data
+        # Integer columns are integers again once filled
+        return enforce_schema(data)
         
     def _remove_outliers(self, data: pd.DataFrame) -> pd.DataFrame:
-        """Remove outliers using IQR method"""
+        """Remove outliers using IQR method, with every column's bounds applied as one mask"""
         numerical_cols = data.select_dtypes(include=[np.number]).columns
         
-        for col in numerical_cols:
-            Q1 = data[col].quantile(0.25)
-            Q3 = data[col].quantile(0.75)
-            IQR = Q3 - Q1
-            
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            
-            data = data[(data[col] >= lower_bound) & (data[col] <= upper_bound)]
-            
-        return data
+        # Quartiles of every column at once, on the unfiltered data
+        quartiles = data[numerical_cols].quantile([0.25, 0.75])
+        bounds = {col: _iqr_bounds(*quartiles[col]) for col in numerical_cols}
+        
+        mask, removed = self._outlier_mask(data, bounds)
+        self.outlier_report = self._outlier_report(bounds, removed, len(data), int(mask.sum()))
+        
+        return data[mask]
+        
+    def _outlier_mask(self, data: pd.DataFrame, bounds: Dict[str, Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows inside every column's bounds, and the number of rows outside each column's bounds"""
+        if not bounds:
+            return np.ones(len(data), dtype=bool), np.zeros(0, dtype=np.int64)
+        lower, upper = np.array(list(bounds.values()), dtype=np.float64).T
+        values = data[list(bounds)].to_numpy(dtype=np.float64, na_value=np.nan)
+        inside = (values >= lower) & (values <= upper)
+        return inside.all(axis=1), (~inside).sum(axis=0)
+        
+    def _outlier_report(self, bounds: Dict[str, Tuple[float, float]], removed: np.ndarray,
+                        rows: int, kept: int) -> pd.DataFrame:
+        """Per-column bounds and rows outside them; a row can be counted for several columns"""
+        report = pd.DataFrame({
+            'column': list(bounds),
+            'lower_bound': [lower for lower, _ in bounds.values()],
+            'upper_bound': [upper for _, upper in bounds.values()],
+            'removed': removed
+        })
+        logger.info(f"Removed {rows - kept} of {rows} rows as outliers")
+        for row in report[report['removed'] > 0].itertuples():
+            logger.info(f"  {row.column}: {row.removed} rows outside [{row.lower_bound:.4g}, {row.upper_bound:.4g}]")
+        return report
         
     def _add_time_features(self, data: pd.DataFrame) -> pd.DataFrame:
         """Add time-based features"""
-        data['hour'] = data['timestamp'].dt.hour
-        data['day'] = data['timestamp'].dt.day
-        data['month'] = data['timestamp'].dt.month
-        data['year'] = data['timestamp'].dt.year
-        data['dayofweek'] = data['timestamp'].dt.dayofweek
-        data['is_weekend'] = data['dayofweek'].isin([5, 6]).astype(int)
+        seconds = epoch_seconds(data['timestamp'])
+        year, month, day = civil_date(seconds)
+        data['hour'] = hour_of_day(seconds)
+        data['day'] = day
+        data['month'] = month
+        data['year'] = year
+        data['dayofweek'] = day_of_week(seconds)
+        data['is_weekend'] = is_weekend(seconds)
         
-        return data
+        return enforce_schema(data, schema_dtypes(TIME_FEATURES))
         
     def _split_data(self, data: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """Split data into train and test sets"""
@@ -101,6 +159,181 @@ class DataPreprocessor:
         
         return train_data, test_data
         
+    def preprocess_to_parquet(self, data_path: str, output_dir: str, chunksize: int = 500000,
+                              dtypes: Optional[Dict[str, str]] = None) -> Dict[str, List[str]]:
+        """Preprocess a CSV larger than memory into chronologically sorted Parquet parts.
+        
+        The first pass reads the file in chunks and sketches every column:
+        medians and IQR bounds of numeric columns, modes of the others and
+        timestamp quantiles. The second pass fills, filters and adds time
+        features chunk by chunk, spilling rows into timestamp ranges of about
+        ``chunksize`` rows each; each range is then sorted on its own. Returns
+        the part paths under ``output_dir/train`` and ``output_dir/test`` in
+        chronological order.
+        
+        Unlike the in-memory path, medians and quartiles are approximate once
+        a column exceeds the sketch capacity.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        logger.info(f"Preprocessing {data_path} out of core in chunks of {chunksize} rows")
+        
+        # First pass: column statistics
+        stats = self._scan_columns(data_path, chunksize, dtypes)
+        logger.info(f"Scanned {stats['rows']} rows")
+        
+        # Second pass: preprocess chunks and spill them into timestamp ranges
+        n_ranges = max(1, -(-stats['rows'] // chunksize))
+        edges = stats['timestamp'].quantiles(np.linspace(0, 1, n_ranges + 1)[1:-1])
+        spill_dir = os.path.join(output_dir, '.ranges')
+        os.makedirs(spill_dir, exist_ok=True)
+        writers, counts, schema = {}, np.zeros(n_ranges, dtype=np.int64), None
+        missing_kept = 0
+        try:
+            for chunk in pd.read_csv(data_path, dtype=stats['dtypes'], chunksize=chunksize):
+                chunk = self._preprocess_chunk(chunk, stats)
+                missing_kept += int(chunk[TIMESTAMP_COLUMN].isna().sum())
+                if schema is None:
+                    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                ranges = self._timestamp_ranges(chunk[TIMESTAMP_COLUMN], edges)
+                for i in np.unique(ranges):
+                    if i not in writers:
+                        writers[i] = pq.ParquetWriter(os.path.join(spill_dir, f"range-{i:05d}.parquet"), schema)
+                    piece = chunk[ranges == i]
+                    writers[i].write_table(pa.Table.from_pandas(piece, schema=schema, preserve_index=False))
+                    counts[i] += len(piece)
+        finally:
+            for writer in writers.values():
+                writer.close()
+        kept = int(counts.sum())
+        self.outlier_report = self._outlier_report(stats['bounds'], stats['removed'], stats['rows'], kept)
+        
+        # Sort each range and split chronologically into train and test parts
+        split_idx = int(kept * (1 - self.test_size))
+        parts = {'train': [], 'test': []}
+        for split in parts:
+            os.makedirs(os.path.join(output_dir, split), exist_ok=True)
+        offset = 0
+        for i in sorted(writers):
+            path = os.path.join(spill_dir, f"range-{i:05d}.parquet")
+            data = pd.read_parquet(path).sort_values(TIMESTAMP_COLUMN, kind='stable')
+            os.remove(path)
+            if not missing_kept:
+                # The rows without a timestamp were all filtered out, so the
+                # time features get the integer types the in-memory path gives them
+                data = enforce_schema(data, schema_dtypes(TIME_FEATURES))
+            cut = min(max(split_idx - offset, 0), len(data))
+            for split, piece in (('train', data.iloc[:cut]), ('test', data.iloc[cut:])):
+                if len(piece):
+                    part = os.path.join(output_dir, split, f"part-{len(parts[split]):05d}.parquet")
+                    piece.to_parquet(part, index=False)
+                    parts[split].append(part)
+            offset += len(data)
+        shutil.rmtree(spill_dir, ignore_errors=True)
+        
+        logger.info(f"Wrote {len(parts['train'])} train and {len(parts['test'])} test parts to {output_dir}")
+        return parts
+        
+    def _scan_columns(self, data_path: str, chunksize: int, dtypes: Optional[Dict[str, str]]) -> Dict[str, Any]:
+        """First pass: sketch each column with a fixed dtype map"""
+        # Column kinds come from a sample; numerics are read as float64 so
+        # missing values in later chunks cannot change a column's type
+        sample = pd.read_csv(data_path, nrows=SAMPLE_ROWS, dtype=dtypes)
+        sample = sample.drop(columns=[TIMESTAMP_COLUMN])
+        numeric = sample.select_dtypes(include=[np.number]).columns.tolist()
+        categorical = sample.select_dtypes(include=['object']).columns.tolist()
+        read_dtypes = {col: str(dtype) for col, dtype in sample.dtypes.items()}
+        read_dtypes.update({col: 'float64' for col in numeric})
+        read_dtypes[TIMESTAMP_COLUMN] = 'object'
+        
+        sketches = {col: QuantileSketch() for col in numeric}
+        integral = dict.fromkeys(numeric, True)
+        value_counts = {col: pd.Series(dtype=np.int64) for col in categorical}
+        timestamps = QuantileSketch()
+        rows = missing_timestamps = 0
+        for chunk in pd.read_csv(data_path, dtype=read_dtypes, chunksize=chunksize):
+            rows += len(chunk)
+            for col in numeric:
+                values = chunk[col].to_numpy()
+                sketches[col].update(values)
+                integral[col] = integral[col] and bool(np.all(np.nan_to_num(values) % 1 == 0))
+            for col in categorical:
+                value_counts[col] = value_counts[col].add(chunk[col].value_counts(), fill_value=0)
+            times = pd.to_datetime(chunk[TIMESTAMP_COLUMN])
+            missing_timestamps += int(times.isna().sum())
+            timestamps.update(times.dropna().to_numpy(dtype='datetime64[ns]').astype(np.int64))
+        
+        # Quartiles are taken after the median fill, as in the in-memory path
+        medians, bounds = {}, {}
+        for col, sketch in sketches.items():
+            medians[col] = sketch.median()
+            for start in range(0, sketch.missing, chunksize):
+                sketch.update(np.full(min(chunksize, sketch.missing - start), medians[col]))
+            bounds[col] = _iqr_bounds(*sketch.quantiles([0.25, 0.75]))
+        # Ties resolve to the first value in sorted order, like Series.mode
+        modes = {col: counts.sort_index().idxmax() for col, counts in value_counts.items() if len(counts)}
+        
+        # Complete integer columns go back to int64, as read_csv would infer them
+        for col in numeric:
+            if integral[col] and sketches[col].missing == 0 and col not in (dtypes or {}):
+                read_dtypes[col] = 'int64'
+        
+        # Storage types are fixed for the whole file so every chunk shares one
+        # Parquet schema: integer columns whose fill leaves fractions, and time
+        # features of missing timestamps, are float32 in every chunk.
+        # Categoricals stay strings since their category sets differ by chunk
+        schema = {col: dtype for col, dtype in schema_dtypes(numeric + TIME_FEATURES).items()
+                  if dtype != 'category'}
+        for col, dtype in schema.items():
+            if not np.issubdtype(np.dtype(dtype), np.integer):
+                continue
+            if col in TIME_FEATURES:
+                # is_weekend is 0 for a missing timestamp
+                filled_integral = missing_timestamps == 0 or col == 'is_weekend'
+            else:
+                filled_integral = integral[col] and (sketches[col].missing == 0 or float(medians[col]).is_integer())
+            if not filled_integral:
+                schema[col] = 'float32'
+            elif col in sketches and sketches[col].count:
+                # Widen columns whose values do not fit the schema type
+                schema[col] = integer_type(dtype, sketches[col].min, sketches[col].max)
+        
+        return {
+            'rows': rows,
+            'dtypes': read_dtypes,
+            'medians': medians,
+            'modes': modes,
+            'bounds': bounds,
+            'removed': np.zeros(len(bounds), dtype=np.int64),
+            'schema': schema,
+            'timestamp': timestamps
+        }
+        
+    def _preprocess_chunk(self, chunk: pd.DataFrame, stats: Dict[str, Any]) -> pd.DataFrame:
+        """Second pass: fill, filter and add time features to one chunk"""
+        chunk[TIMESTAMP_COLUMN] = pd.to_datetime(chunk[TIMESTAMP_COLUMN])
+        
+        # Handle missing values
+        for col, value in {**stats['medians'], **stats['modes']}.items():
+            chunk[col] = chunk[col].fillna(value)
+        
+        # Remove outliers with every column's bounds at once
+        mask, removed = self._outlier_mask(chunk, stats['bounds'])
+        stats['removed'] += removed
+        chunk = chunk[mask].copy()
+        
+        # Add time-based features
+        chunk = self._add_time_features(chunk)
+        return enforce_schema(chunk, stats['schema'])
+        
+    def _timestamp_ranges(self, timestamps: pd.Series, edges: np.ndarray) -> np.ndarray:
+        """Index of the timestamp range each row falls in; missing timestamps sort last"""
+        values = timestamps.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        ranges = np.searchsorted(edges, values, side='right')
+        ranges[timestamps.isna().to_numpy()] = len(edges)
+        return ranges
+        
     def prepare_training_data(self, data: pd.DataFrame, target_col: str) -> Tuple[np.ndarray, np.ndarray]:
         """Prepare data for model training"""
         # Separate features and target
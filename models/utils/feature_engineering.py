@@ -1,28 +1,135 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from sklearn.preprocessing import LabelEncoder
 import logging
 
+from common.categorical import CategoricalEncoder
+from common.interest_store import InterestStore
+from common.schema import enforce_schema
+from common.time_features import day_of_week, epoch_seconds, hour_of_day
+from .feature_graph import FeatureGraph
+
 logger = logging.getLogger(__name__)
 
+ENGAGEMENT_COLUMNS = ['likes', 'comments', 'shares', 'bookmarks']
+
+def _weighted_engagement(likes, comments, shares, bookmarks):
+    return (likes * 1.0 + comments * 2.0 + shares * 3.0 + bookmarks * 4.0) / 4.0
+
+def _epoch_seconds(timestamp):
+    """Wall-clock epoch seconds, parsed once for every time feature"""
+    return epoch_seconds(pd.to_datetime(timestamp))
+
+def _codes(values):
+    return pd.factorize(values)[0]
+
+def _user_topic_pairs(user_codes, topic_codes):
+    """One code per (user, topic) pair, -1 where either is missing"""
+    n_topics = topic_codes.max() + 1 if len(topic_codes) else 0
+    pairs = user_codes.astype(np.int64) * n_topics + topic_codes
+    pairs[(user_codes < 0) | (topic_codes < 0)] = -1
+    return pairs
+
+def _min_max(values):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (values - np.nanmin(values)) / (np.nanmax(values) - np.nanmin(values))
+
+def _map_codes(scores, codes):
+    result = np.full(len(codes), np.nan)
+    known = codes >= 0
+    result[known] = scores[codes[known]]
+    return result
+
+def _user_interest_score(pairs, topic_codes, engagement):
+    """Topic average of per-(user, topic) mean engagement, min-max scaled"""
+    n_topics = topic_codes.max() + 1 if len(topic_codes) else 0
+    if n_topics == 0:
+        return np.full(len(topic_codes), np.nan)
+    engagement = np.asarray(engagement, dtype=np.float64)
+    valid = (pairs >= 0) & ~np.isnan(engagement)
+    pair_ids, pair_index = np.unique(pairs[valid], return_inverse=True)
+    pair_mean = np.bincount(pair_index, weights=engagement[valid]) / np.bincount(pair_index)
+    pair_topic = pair_ids % n_topics
+    with np.errstate(invalid='ignore', divide='ignore'):
+        topic_mean = (np.bincount(pair_topic, weights=pair_mean, minlength=n_topics) /
+                      np.bincount(pair_topic, minlength=n_topics))
+    return _map_codes(_min_max(topic_mean), topic_codes)
+
+def _content_diversity_score(pairs, user_codes, topic_codes):
+    """Distinct topics per user, min-max scaled"""
+    n_users = user_codes.max() + 1 if len(user_codes) else 0
+    if n_users == 0:
+        return np.full(len(user_codes), np.nan)
+    n_topics = topic_codes.max() + 1
+    user_of_pair = np.unique(pairs[pairs >= 0]) // max(n_topics, 1)
+    topic_counts = np.bincount(user_of_pair, minlength=n_users).astype(np.float64)
+    return _map_codes(_min_max(topic_counts), user_codes)
+
+def build_feature_graph(interest_store: Optional[InterestStore] = None) -> FeatureGraph:
+    """Derived features added by FeatureEngineer.
+
+    With an ``interest_store`` the interest and diversity scores are looked
+    up from its running aggregates instead of being grouped from the frame.
+    """
+    graph = FeatureGraph()
+    graph.add('user_engagement_score', ENGAGEMENT_COLUMNS, _weighted_engagement)
+    graph.add('content_engagement_score',
+              ['content_likes', 'content_comments', 'content_shares', 'content_bookmarks'],
+              _weighted_engagement)
+    graph.add('user_satisfaction_score', ['user_satisfaction'], lambda satisfaction: satisfaction / 5.0)
+    graph.add('content_quality_score', ['content_engagement_score', 'user_satisfaction_score'],
+              lambda engagement, satisfaction: engagement * 0.7 + satisfaction * 0.3)
+    
+    if interest_store is not None:
+        graph.add('user_interest_score', ['content_topic'], interest_store.interest_scores)
+        graph.add('content_diversity_score', ['user_id'], interest_store.diversity_scores)
+    else:
+        # Shared inputs of the per-user and per-topic aggregates
+        graph.add('user_codes', ['user_id'], _codes, output=False)
+        graph.add('topic_codes', ['content_topic'], _codes, output=False)
+        graph.add('user_topic_pairs', ['user_codes', 'topic_codes'], _user_topic_pairs, output=False)
+        graph.add('user_interest_score', ['user_topic_pairs', 'topic_codes', 'user_engagement_score'],
+                  _user_interest_score)
+        graph.add('content_diversity_score', ['user_topic_pairs', 'user_codes', 'topic_codes'],
+                  _content_diversity_score)
+    
+    # Time-based features
+    graph.add('timestamp_seconds', ['timestamp'], _epoch_seconds, output=False)
+    graph.add('hour_of_day', ['timestamp_seconds'], hour_of_day)
+    graph.add('day_of_week', ['timestamp_seconds'], day_of_week)
+    return graph
+
+# Categorical source column -> (encoder attribute, encoded column)
+ENCODED_COLUMNS = {
+    'user_region': ('region_encoder', 'user_region_encoded'),
+    'user_device': ('device_encoder', 'user_device_encoded'),
+    'content_type': ('content_type_encoder', 'content_type_encoded'),
+    'content_topic': ('topic_encoder', 'content_topic_encoded')
+}
+
 class FeatureEngineer:
-    def __init__(self):
-        self.label_encoders = {}
-        self.region_encoder = LabelEncoder()
-        self.device_encoder = LabelEncoder()
-        self.content_type_encoder = LabelEncoder()
-        self.topic_encoder = LabelEncoder()
+    def __init__(self, interest_store: Optional[InterestStore] = None):
+        self.region_encoder = CategoricalEncoder()
+        self.device_encoder = CategoricalEncoder()
+        self.content_type_encoder = CategoricalEncoder()
+        self.topic_encoder = CategoricalEncoder()
+        self.interest_store = interest_store
+        self.graph = build_feature_graph(interest_store)
         
     def fit_transform(self, data: pd.DataFrame) -> pd.DataFrame:
         """Fit encoders and transform data"""
         logger.info("Fitting feature encoders...")
+        data = enforce_schema(data)
         
         # Encode categorical features
-        data['user_region_encoded'] = self.region_encoder.fit_transform(data['user_region'])
-        data['user_device_encoded'] = self.device_encoder.fit_transform(data['user_device'])
-        data['content_type_encoded'] = self.content_type_encoder.fit_transform(data['content_type'])
-        data['content_topic_encoded'] = self.topic_encoder.fit_transform(data['content_topic'])
+        for column, (encoder, _) in ENCODED_COLUMNS.items():
+            getattr(self, encoder).fit(data[column])
+        data = self._encode_categoricals(data)
+        
+        # Seed the interest store with the training interactions
+        if self.interest_store is not None:
+            self.update_interest_store(data)
         
         # Calculate derived features
         data = self._calculate_derived_features(data)
@@ -30,93 +137,51 @@ class FeatureEngineer:
         return data
         
     def transform(self, data: pd.DataFrame) -> pd.DataFrame:
-        """Transform data using fitted encoders"""
+        """Transform data using fitted encoders; unseen categories get each encoder's unknown code"""
+        data = enforce_schema(data)
+        
         # Encode categorical features
-        data['user_region_encoded'] = self.region_encoder.transform(data['user_region'])
-        data['user_device_encoded'] = self.device_encoder.transform(data['user_device'])
-        data['content_type_encoded'] = self.content_type_encoder.transform(data['content_type'])
-        data['content_topic_encoded'] = self.topic_encoder.transform(data['content_topic'])
+        data = self._encode_categoricals(data)
         
         # Calculate derived features
         data = self._calculate_derived_features(data)
         
         return data
         
-    def _calculate_derived_features(self, data: pd.DataFrame) -> pd.DataFrame:
-        """Calculate derived features"""
-        # User engagement score
-        data['user_engagement_score'] = (
-            data['likes'] * 1.0 +
-            data['comments'] * 2.0 +
-            data['shares'] * 3.0 +
-            data['bookmarks'] * 4.0
-        ) / 4.0
-        
-        # Content engagement score
-        data['content_engagement_score'] = (
-            data['content_likes'] * 1.0 +
-            data['content_comments'] * 2.0 +
-            data['content_shares'] * 3.0 +
-            data['content_bookmarks'] * 4.0
-        ) / 4.0
-        
-        # User satisfaction score (normalized)
-        data['user_satisfaction_score'] = data['user_satisfaction'] / 5.0
-        
-        # Content quality score
-        data['content_quality_score'] = (
-            data['content_engagement_score'] * 0.7 +
-            data['user_satisfaction_score'] * 0.3
-        )
-        
-        # User interest score (based on historical engagement with similar content)
-        data['user_interest_score'] = self._calculate_user_interest_score(data)
-        
-        # Content diversity score
-        data['content_diversity_score'] = self._calculate_content_diversity_score(data)
-        
-        # Time-based features
-        data['hour_of_day'] = pd.to_datetime(data['timestamp']).dt.hour
-        data['day_of_week'] = pd.to_datetime(data['timestamp']).dt.dayofweek
-        
+    def _encode_categoricals(self, data: pd.DataFrame) -> pd.DataFrame:
+        for column, (encoder, encoded) in ENCODED_COLUMNS.items():
+            data[encoded] = getattr(self, encoder).codes(data[column])
         return data
         
-    def _calculate_user_interest_score(self, data: pd.DataFrame) -> pd.Series:
-        """Calculate user interest score based on historical engagement"""
-        # Group by user and content topic
-        user_topic_engagement = data.groupby(['user_id', 'content_topic']).agg({
-            'user_engagement_score': 'mean'
-        }).reset_index()
+    def encode_value(self, column: str, value) -> int:
+        """Code of a single categorical value, for single-row serving"""
+        return getattr(self, ENCODED_COLUMNS[column][0]).code(value)
         
-        # Calculate average engagement per topic
-        topic_avg_engagement = user_topic_engagement.groupby('content_topic')['user_engagement_score'].mean()
-        
-        # Normalize scores
-        topic_avg_engagement = (topic_avg_engagement - topic_avg_engagement.min()) / (topic_avg_engagement.max() - topic_avg_engagement.min())
-        
-        # Map scores back to original data
-        return data['content_topic'].map(topic_avg_engagement)
-        
-    def _calculate_content_diversity_score(self, data: pd.DataFrame) -> pd.Series:
-        """Calculate content diversity score"""
-        # Group by user and calculate topic diversity
-        user_topics = data.groupby('user_id')['content_topic'].nunique()
-        
-        # Normalize scores
-        user_topics = (user_topics - user_topics.min()) / (user_topics.max() - user_topics.min())
+    def _calculate_derived_features(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Calculate derived features in one pass over the feature graph"""
+        data = self.graph.transform(data)
+        logger.debug(f"Derived feature timings:\n{self.graph.last_report.to_string(index=False)}")
+        return enforce_schema(data)
+        
+    def update_interest_store(self, interactions: pd.DataFrame) -> int:
+        """Apply interactions newer than the store's watermark to the interest store"""
+        new = interactions
+        if self.interest_store.watermark is not None and 'timestamp' in interactions.columns:
+            new = interactions[pd.to_datetime(interactions['timestamp']) > self.interest_store.watermark]
+        engagement = _weighted_engagement(*(new[col].to_numpy() for col in ENGAGEMENT_COLUMNS))
+        return self.interest_store.update(
+            new['user_id'], new['content_topic'], engagement,
+            new['timestamp'] if 'timestamp' in new.columns else None
+        )
         
-        # Map scores back to original data
-        return data['user_id'].map(user_topics)
+    def derived_feature_report(self) -> pd.DataFrame:
+        """Per-feature time (ms) and output size (bytes) of the last derived-feature pass"""
+        return self.graph.last_report
         
     def save(self, path: str):
         """Save encoders to disk"""
         import joblib
-        encoders = {
-            'region_encoder': self.region_encoder,
-            'device_encoder': self.device_encoder,
-            'content_type_encoder': self.content_type_encoder,
-            'topic_encoder': self.topic_encoder
-        }
+        encoders = {encoder: getattr(self, encoder) for encoder, _ in ENCODED_COLUMNS.values()}
         joblib.dump(encoders, path)
         logger.info(f"Feature encoders saved to {path}")
         
@@ -124,8 +189,10 @@ class FeatureEngineer:
         """Load encoders from disk"""
         import joblib
         encoders = joblib.load(path)
-        self.region_encoder = encoders['region_encoder']
-        self.device_encoder = encoders['device_encoder']
-        self.content_type_encoder = encoders['content_type_encoder']
-        self.topic_encoder = encoders['topic_encoder']
-        logger.info(f"Feature encoders loaded from {path}") 
\ No newline at end of file
+        for encoder, _ in ENCODED_COLUMNS.values():
+            loaded = encoders[encoder]
+            # Files written before the switch hold fitted LabelEncoders
+            if isinstance(loaded, LabelEncoder):
+                loaded = CategoricalEncoder(loaded.classes_)
+            setattr(self, encoder, loaded)
+        logger.info(f"Feature encoders loaded from {path}")
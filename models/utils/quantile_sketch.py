@@ -0,0 +1,105 @@
+import logging
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch (a KLL-style compactor stack).
+
+    Values are buffered at level 0; when a level holds more than
+    ``capacity`` values it is sorted and every other value moves up a level,
+    where each one stands for twice as many inputs. Memory stays around
+    ``capacity * log2(n / capacity)`` values and the rank error is on the
+    order of ``1 / capacity``. Until the first compaction the sketch holds
+    every value and its quantiles are exact. NaNs are counted but not
+    sketched.
+    """
+
+    def __init__(self, capacity: int = 4096, seed: Optional[int] = 0):
+        self.capacity = capacity
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.count = 0
+        self.missing = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def is_exact(self) -> bool:
+        return len(self.levels) == 1
+
+    def update(self, values) -> 'QuantileSketch':
+        """Add a batch of values"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        nan = np.isnan(values)
+        if nan.any():
+            self.missing += int(nan.sum())
+            values = values[~nan]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compact()
+        return self
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Fold another sketch into this one"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, values in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], values])
+        self.count += other.count
+        self.missing += other.missing
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compact()
+        return self
+
+    def _compact(self):
+        level = 0
+        while level < len(self.levels):
+            values = self.levels[level]
+            if len(values) > self.capacity:
+                values = np.sort(values)
+                # An odd value out stays behind so no weight is lost
+                keep = values[-1:] if len(values) % 2 else values[:0]
+                paired = values[:len(values) - len(keep)]
+                promoted = paired[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantiles(self, q: Sequence[float]) -> np.ndarray:
+        """Values at the given quantiles, interpolated like ``np.quantile`` while exact"""
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+        if self.is_exact:
+            return np.quantile(self.levels[0], q)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(v), 2.0 ** level) for level, v in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, ranks = values[order], np.cumsum(weights[order])
+        positions = np.searchsorted(ranks, q * ranks[-1], side='left')
+        result = values[np.minimum(positions, len(values) - 1)]
+        # The extremes are tracked exactly
+        result[q <= 0] = self.min
+        result[q >= 1] = self.max
+        return result
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self.levels)